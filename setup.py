@@ -37,4 +37,8 @@ setuptools.setup(
           # ^^^ Not sure if this is needed on readthedocs.org
           # 'something else?',
           ],
+    extras_require={
+        # optional C-accelerated xml parser, see pyuppaal.xmlio
+        "lxml": ["lxml>=4.6"],
+    },
 )
\ No newline at end of file
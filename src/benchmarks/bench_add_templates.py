@@ -0,0 +1,65 @@
+"""Benchmark of adding many templates to a large model.
+
+Compares the previous `UModel.add_template` (duplicate check over a list of names, and `max_location_id`
+over all locations for the `init_ref` of each new template) with the indexed one.
+
+Usage:
+    python bench_add_templates.py [num_templates] [num_locations_per_template] [num_added_templates]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pyuppaal.nta import Template, Location, Edge
+from bench_write_xml_tree import build_model
+
+
+def new_template(name: str, init_ref: int) -> Template:
+    locations = [Location(init_ref + i, (i * 100, 0)) for i in range(3)]
+    edges = [Edge(init_ref + i, init_ref + i + 1, (i * 100, 0), ((i + 1) * 100, 0)) for i in range(2)]
+    return Template(name, locations, init_ref, edges)
+
+
+def add_templates_scan(umodel, num_added: int) -> None:
+    """The previous implementation, scanning all templates and locations for each new template.
+    """
+    templates = umodel.templates
+    for i in range(num_added):
+        name = f'Added{i}'
+        if name in [t.name for t in templates]:
+            raise ValueError(name)
+        max_location_id = -1
+        for template in templates:
+            for location in template.locations:
+                max_location_id = max(max_location_id, location.location_id)
+        templates.append(new_template(name, max_location_id + 1))
+
+
+def add_templates_indexed(umodel, num_added: int) -> None:
+    for i in range(num_added):
+        umodel.add_template(new_template(f'Added{i}', umodel.allocate_location_ids(3)))
+
+
+def main(num_templates: int = 100, num_locations: int = 500, num_added: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old_model = build_model(os.path.join(tmp_dir, 'old.xml'), num_templates, num_locations)
+        new_model = build_model(os.path.join(tmp_dir, 'new.xml'), num_templates, num_locations)
+
+        start = time.perf_counter()
+        add_templates_scan(old_model, num_added)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        add_templates_indexed(new_model, num_added)
+        new_time = time.perf_counter() - start
+
+        assert old_model.xml == new_model.xml, 'models differ'
+        print(f'{num_templates} templates x {num_locations} locations, {num_added} added templates')
+        print(f'scan:     {old_time * 1000:8.1f} ms')
+        print(f'indexed:  {new_time * 1000:8.1f} ms')
+        print(f'speedup:  {old_time / new_time:8.1f} x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:4]])
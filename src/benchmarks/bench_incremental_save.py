@@ -0,0 +1,51 @@
+"""Benchmark of saving a large model repeatedly after editing one template.
+
+Compares serializing the whole element tree on every save (the previous `UModel.write_xml_tree`)
+with `UModel.save`, which only serializes the modified template and reuses the cached xml of the others,
+and checks that both write the same file.
+
+Usage:
+    python bench_incremental_save.py [num_templates] [num_locations_per_template] [num_edits]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pyuppaal import xmlio
+from bench_write_xml_tree import build_model
+
+
+def main(num_templates: int = 200, num_locations: int = 50, num_edits: int = 20) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        umodel = build_model(os.path.join(tmp_dir, 'model.xml'), num_templates, num_locations)
+        old_path = os.path.join(tmp_dir, 'old.xml')
+        templates = umodel.templates
+        # the first save serializes all templates
+        umodel.save()
+
+        old_time = 0.0
+        new_time = 0.0
+        for i in range(num_edits):
+            templates[i % num_templates].locations[0].name = f'edited{i}'
+
+            start = time.perf_counter()
+            with open(old_path, 'w', encoding='utf-8') as f:
+                xmlio.write_pretty(umodel.Element, f, 4)
+            old_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            umodel.save()
+            new_time += time.perf_counter() - start
+
+        with open(old_path, 'rb') as f_old, open(umodel.model_path, 'rb') as f_new:
+            assert f_old.read() == f_new.read(), 'outputs differ'
+        print(f'{num_templates} templates x {num_locations} locations, {num_edits} edits, '
+              f'{os.path.getsize(umodel.model_path) / 1024:.0f} KiB')
+        print(f'full tree:    {old_time / num_edits * 1000:8.1f} ms / save')
+        print(f'incremental:  {new_time / num_edits * 1000:8.1f} ms / save')
+        print(f'speedup:      {old_time / new_time:8.1f} x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:4]])
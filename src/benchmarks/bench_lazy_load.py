@@ -0,0 +1,51 @@
+"""Benchmark of loading a large model, replacing its query and saving it, with `UModel(lazy=False)` and `UModel(lazy=True)`.
+
+Usage:
+    python bench_lazy_load.py [num_templates] [num_locations_per_template]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pyuppaal import UModel
+from bench_write_xml_tree import build_model
+
+
+def swap_query(model_path: str, lazy: bool) -> UModel:
+    umodel = UModel(model_path, autosave=False, lazy=lazy)
+    umodel.queries = 'E<> P0.L1'
+    umodel.save_as(os.path.splitext(model_path)[0] + f'_lazy_{lazy}.xml', indent=0)
+    return umodel
+
+
+def measure(model_path: str, lazy: bool):
+    start = time.perf_counter()
+    swap_query(model_path, lazy)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    umodel = swap_query(model_path, lazy)
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, memory, umodel
+
+
+def main(num_templates: int = 50, num_locations: int = 1000) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, 'model.xml')
+        build_model(model_path, num_templates, num_locations).save()
+
+        eager_time, eager_memory, eager_model = measure(model_path, lazy=False)
+        lazy_time, lazy_memory, lazy_model = measure(model_path, lazy=True)
+        assert lazy_model.templates[0].name == eager_model.templates[0].name
+
+        print(f'{num_templates} templates x {num_locations} locations, {os.path.getsize(model_path) / 1024:.0f} KiB')
+        print(f'eager:    {eager_time * 1000:8.1f} ms, peak {eager_memory / 2 ** 20:6.1f} MiB')
+        print(f'lazy:     {lazy_time * 1000:8.1f} ms, peak {lazy_memory / 2 ** 20:6.1f} MiB')
+        print(f'speedup:  {eager_time / lazy_time:8.1f} x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
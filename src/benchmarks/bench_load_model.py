@@ -0,0 +1,85 @@
+"""Benchmark of loading a synthetic model with many templates.
+
+Compares the previous loader (parse the whole xml tree, then convert the templates) with the streaming loader of
+`UModel`, which parses the children of `<nta>` one by one, and with `UModel(lazy=True)`. The xml backend (lxml or stdlib)
+is printed, see `pyuppaal.xmlio`.
+
+Usage:
+    python bench_load_model.py [num_templates] [num_locations_per_template]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from pyuppaal import UModel, xmlio
+from pyuppaal.nta import Template
+
+
+def write_model(model_path: str, num_templates: int, num_locations: int) -> None:
+    """Write a model with `num_templates` ring templates directly as text, as a code generator would.
+    """
+    with open(model_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<nta>\n')
+        f.write('\t<declaration>' + '\n'.join(f'chan a{j};' for j in range(num_locations)) + '</declaration>\n')
+        for i in range(num_templates):
+            first_id = i * num_locations
+            f.write(f'\t<template>\n\t\t<name>P{i}</name>\n\t\t<declaration>clock x;</declaration>\n')
+            for j in range(num_locations):
+                f.write(f'\t\t<location id="id{first_id + j}" x="{j * 100}" y="0">\n'
+                        f'\t\t\t<name x="{j * 100}" y="-20">L{j}</name>\n'
+                        f'\t\t\t<label kind="invariant" x="{j * 100}" y="20">x &lt;= {j + 1}</label>\n\t\t</location>\n')
+            f.write(f'\t\t<init ref="id{first_id}"/>\n')
+            for j in range(num_locations):
+                f.write(f'\t\t<transition>\n\t\t\t<source ref="id{first_id + j}"/>\n'
+                        f'\t\t\t<target ref="id{first_id + (j + 1) % num_locations}"/>\n'
+                        f'\t\t\t<label kind="guard" x="{j * 100 + 50}" y="-10">x &gt;= {j}</label>\n'
+                        f'\t\t\t<label kind="synchronisation" x="{j * 100 + 50}" y="0">a{j}!</label>\n'
+                        f'\t\t\t<label kind="assignment" x="{j * 100 + 50}" y="10">x = 0</label>\n\t\t</transition>\n')
+            f.write('\t</template>\n')
+        f.write(f"\t<system>system {', '.join(f'P{i}' for i in range(num_templates))};</system>\n")
+        f.write('\t<queries>\n\t\t<query>\n\t\t\t<formula>A[] not deadlock</formula>\n\t\t</query>\n\t</queries>\n</nta>\n')
+
+
+def load_whole_tree(model_path: str):
+    """The previous loader of `UModel`.
+    """
+    element_tree = ET.ElementTree(file=model_path)
+    return [Template.from_xml(t) for t in element_tree.findall('./template')]
+
+
+def measure(func):
+    start = time.perf_counter()
+    func()
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    res = func()
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, memory, res
+
+
+def main(num_templates: int = 10000, num_locations: int = 10) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, 'model.xml')
+        write_model(model_path, num_templates, num_locations)
+        print(f'{num_templates} templates x {num_locations} locations, {os.path.getsize(model_path) / 2 ** 20:.1f} MiB, '
+              f'{xmlio.BACKEND} backend')
+
+        results = [
+            ('whole tree', measure(lambda: load_whole_tree(model_path))),
+            ('streaming', measure(lambda: UModel(model_path, autosave=False))),
+            ('lazy', measure(lambda: UModel(model_path, autosave=False, lazy=True))),
+            # only the xml parser, e.g., to compare `PYUPPAAL_XML_BACKEND=lxml` with `stdlib`
+            ('parse only', measure(lambda: sum(1 for _ in xmlio.iter_children(model_path)))),
+        ]
+        assert len(results[1][1][2].templates) == len(results[0][1][2]) == num_templates
+        for name, (duration, memory, _) in results:
+            print(f'{name:<12}{duration * 1000:8.1f} ms, peak {memory / 2 ** 20:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
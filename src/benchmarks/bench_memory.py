@@ -0,0 +1,55 @@
+"""Memory benchmark of `Location` and `Edge`, in bytes per instance.
+
+Measures the instances created by `Location.from_xml`/`Edge.from_xml` and by the constructors (as `Monitors` does),
+with all optional labels set and with only the required attributes.
+
+Usage:
+    python bench_memory.py [num_instances]
+"""
+import sys
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from pyuppaal.nta import Location, Edge
+
+LOCATION_XML = ET.fromstring("""<location id="id1" x="0" y="0">
+    <name x="-10" y="-34">location_name</name>
+    <label kind="invariant" x="-10" y="17">x &lt;= 10</label>
+    <label kind="comments" x="-10" y="59">comments</label>
+    <committed/>
+</location>""")
+EDGE_XML = ET.fromstring("""<transition>
+    <source ref="id1"/>
+    <target ref="id2"/>
+    <label kind="guard" x="18" y="-34">x &gt;= 1</label>
+    <label kind="synchronisation" x="18" y="-17">a?</label>
+    <label kind="assignment" x="18" y="0">x = 0</label>
+    <nail x="51" y="42"/>
+</transition>""")
+
+
+def bytes_per_instance(create, num_instances: int) -> float:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    instances = [create(i) for i in range(num_instances)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    # the list itself is not part of the instances
+    size -= sys.getsizeof(instances)
+    return size / num_instances
+
+
+def main(num_instances: int = 100000) -> None:
+    cases = [
+        ('Location.from_xml', lambda i: Location.from_xml(LOCATION_XML)),
+        ('Location(id, pos)', lambda i: Location(i, (i, i))),
+        ('Edge.from_xml', lambda i: Edge.from_xml(EDGE_XML)),
+        ('Edge(src, dst, pos)', lambda i: Edge(i, i + 1, (i, i), (i + 1, i))),
+    ]
+    print(f'{num_instances} instances each')
+    for name, create in cases:
+        print(f'{name:<22}{bytes_per_instance(create, num_instances):8.0f} bytes / instance')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,55 @@
+"""Benchmark of serializing templates whose xml is not cached, e.g., after the monitors are added to a model.
+
+Compares the previous path (build `Template.Element`, then serialize it with `xmlio.tostring_element`)
+with `Template.tostring`, which writes the text directly, and checks that both give the same xml.
+
+Usage:
+    python bench_text_emission.py [num_templates] [num_locations_per_template]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pyuppaal import xmlio
+from bench_write_xml_tree import build_model
+
+
+def serialize_element(templates, indent: int) -> list:
+    """The previous implementation of `Template.tostring`.
+    """
+    return [xmlio.tostring_element(template.Element, indent, level=1) for template in templates]
+
+
+def serialize_text(templates, indent: int) -> list:
+    res = []
+    for template in templates:
+        # 清空缓存, 测量完整的序列化
+        template._on_change()
+        res.append(template.tostring(indent))
+    return res
+
+
+def timeit(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_templates: int = 20, num_locations: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        templates = build_model(os.path.join(tmp_dir, 'model.xml'), num_templates, num_locations).templates
+        print(f'{num_templates} templates x {num_locations} locations')
+        for indent in (0, 4):
+            assert serialize_element(templates, indent) == serialize_text(templates, indent), 'outputs differ'
+            old_time = timeit(lambda: serialize_element(templates, indent))
+            new_time = timeit(lambda: serialize_text(templates, indent))
+            print(f'indent {indent}: element {old_time * 1000:8.1f} ms, text {new_time * 1000:8.1f} ms, '
+                  f'speedup {old_time / new_time:5.1f} x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
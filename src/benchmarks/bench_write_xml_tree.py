@@ -0,0 +1,84 @@
+"""Benchmark of `UModel.write_xml_tree` with indentation.
+
+Compares the previous path (write the tree to a temporary file, parse it with `xml.dom.minidom` and call `toprettyxml`)
+with the one-pass serializer in `pyuppaal.xmlio`, and checks that both write the same file.
+
+Usage:
+    python bench_write_xml_tree.py [num_templates] [num_locations_per_template]
+"""
+import os
+import sys
+import tempfile
+import time
+import xml.dom.minidom
+
+from pyuppaal import UModel
+from pyuppaal.nta import Template, Location, Edge
+
+
+def build_model(model_path: str, num_templates: int, num_locations: int) -> UModel:
+    """Build a model with `num_templates` ring templates, each with `num_locations` locations and edges.
+    """
+    umodel = UModel.new(model_path)
+    umodel.autosave = False
+    templates = []
+    location_id = 0
+    for i in range(num_templates):
+        locations = []
+        edges = []
+        for j in range(num_locations):
+            locations.append(Location(location_id + j, (j * 100, i * 100), name=f'L{j}', name_pos=(j * 100, i * 100 - 20),
+                                      invariant=f'x <= {j + 1}', invariant_pos=(j * 100, i * 100 + 20)))
+            edges.append(Edge(location_id + j, location_id + (j + 1) % num_locations, (j * 100, i * 100), ((j + 1) * 100, i * 100),
+                              guard=f'x >= {j} && y < {j} + 1', guard_pos=(j * 100 + 50, i * 100 - 10),
+                              sync=f'a{j}!', sync_pos=(j * 100 + 50, i * 100),
+                              update='x = 0', update_pos=(j * 100 + 50, i * 100 + 10)))
+        templates.append(Template(f'P{i}', locations, location_id, edges, declaration='clock x, y;'))
+        location_id += num_locations
+    umodel.templates = templates
+    umodel.declaration = '\n'.join(f'chan a{j};' for j in range(num_locations))
+    umodel.system = f"system {', '.join(template.name for template in templates)};"
+    umodel.queries = ['A[] not deadlock']
+    return umodel
+
+
+def write_minidom(umodel: UModel, path: str, indent: int) -> None:
+    """The previous implementation of `UModel.write_xml_tree`.
+    """
+    with tempfile.NamedTemporaryFile(suffix="-unformatted.xml", mode="w", delete=False) as tmp_file:
+        umodel.ElementTree.write(tmp_file.name, encoding="utf-8", xml_declaration=True)
+    dom = xml.dom.minidom.parse(tmp_file.name)
+    xml_str = dom.toprettyxml(indent=indent*" ")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(xml_str)
+    os.remove(tmp_file.name)
+
+
+def timeit(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_templates: int = 20, num_locations: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        umodel = build_model(os.path.join(tmp_dir, 'model.xml'), num_templates, num_locations)
+        old_path = os.path.join(tmp_dir, 'old.xml')
+        new_path = os.path.join(tmp_dir, 'new.xml')
+
+        old_time = timeit(lambda: write_minidom(umodel, old_path, 4))
+        new_time = timeit(lambda: umodel.write_xml_tree(new_path, 4))
+
+        with open(old_path, 'rb') as f_old, open(new_path, 'rb') as f_new:
+            assert f_old.read() == f_new.read(), 'outputs differ'
+        print(f'{num_templates} templates x {num_locations} locations, {os.path.getsize(new_path) / 1024:.0f} KiB')
+        print(f'minidom:  {old_time * 1000:8.1f} ms')
+        print(f'xmlio:    {new_time * 1000:8.1f} ms')
+        print(f'speedup:  {old_time / new_time:8.1f} x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -4,6 +4,7 @@ python. It can also help to analyze counter-examples in .xml format
 
 from .verifyta import Verifyta
 from .umodel import UModel
+from .results import VerificationResult, QueryResult
 from .tracer import ClockZone, Transition, SimTrace, GlobalVar
 from .build_cg import Mermaid
 from .pyuppaal import *
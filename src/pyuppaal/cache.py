@@ -0,0 +1,393 @@
+"""cache
+On-disk caches shared by the processes on one machine.
+
+The cache directory can be set by the environment variable `PYUPPAAL_CACHE_DIR`,
+and defaults to `~/.cache/pyuppaal`.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+def get_cache_dir() -> str:
+    """Get the root directory of the on-disk caches of pyuppaal.
+
+    Returns:
+        str: `$PYUPPAAL_CACHE_DIR` if set, else `~/.cache/pyuppaal`.
+    """
+    cache_dir = os.environ.get('PYUPPAAL_CACHE_DIR')
+    if not cache_dir:
+        cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'pyuppaal')
+    return cache_dir
+
+
+def load_json(path: str) -> dict:
+    """Load a json cache file, and return an empty dict if it does not exist or is broken.
+
+    Args:
+        path (str): path to the json file.
+
+    Returns:
+        dict: the content of the json file.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            res = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return res if isinstance(res, dict) else {}
+
+
+def dump_json(path: str, content: dict) -> bool:
+    """Atomically write `content` to a json cache file, so that concurrent readers never see a partial file.
+
+    Args:
+        path (str): path to the json file.
+        content (dict): the content to write.
+
+    Returns:
+        bool: `True` when succeed, `False` if the cache directory is not writable.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(content, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock of `path` between processes, the lock file is created if not exists.
+
+    Args:
+        path (str): path to the lock file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def canonicalize(xml: str) -> str:
+    """Canonical form of an xml string as in `model_hash`, so that formatting, attribute order and comments do not change it.
+
+    Args:
+        xml (str): the xml string.
+
+    Returns:
+        str: the canonical xml, or `xml` itself if it can not be parsed.
+    """
+    try:
+        return ET.canonicalize(xml_data=xml, strip_text=True)
+    except ET.ParseError:
+        return xml
+
+
+def model_hash(model_path: str) -> str:
+    """Hash of the canonical form of a `.xml` model, so that formatting, attribute order and comments do not change the hash.
+
+    Args:
+        model_path (str): path to the `.xml` model.
+
+    Returns:
+        str: sha256 hex digest.
+    """
+    try:
+        content = ET.canonicalize(from_file=model_path, strip_text=True).encode('utf-8')
+    except ET.ParseError:
+        with open(model_path, 'rb') as f:
+            content = f.read()
+    return hashlib.sha256(content).hexdigest()
+
+
+class VerifyCache:
+    """Content-addressed cache of verification results, shared by the processes on one machine.
+
+    An entry is keyed by the canonical model (including its queries), the verify options and the version of `verifyta`,
+    and stores the terminal output together with the trace files.
+    The least recently used entries are evicted when the size of the cache exceeds `max_size`.
+
+    Examples:
+        >>> Verifyta().enable_cache(max_size=256 * 1024 * 1024)
+        >>> Verifyta().verify('demo.xml')  # run verifyta
+        >>> Verifyta().verify('demo.xml')  # load from cache
+    """
+    # 输出中的trace路径会被替换成这个占位符，读取时再替换回新的trace路径
+    __TRACE_PREFIX = '<pyuppaal:trace_prefix>'
+    __RESULT_FILE = 'result.json'
+
+    def __init__(self, cache_dir: str = None, max_size: int = 1 << 30):
+        """
+        Args:
+            cache_dir (str, optional): directory of the cache. Defaults to None, using `verify` in `get_cache_dir()`.
+            max_size (int, optional): maximum size of the cache in bytes. Defaults to 1 GiB.
+        """
+        self.cache_dir: str = cache_dir if cache_dir is not None else os.path.join(get_cache_dir(), 'verify')
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __lock(self):
+        return file_lock(os.path.join(self.cache_dir, '.lock'))
+
+    def __entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    @staticmethod
+    def key(model_path: str, verify_options: List[str], version: str) -> str:
+        """Key of a verification.
+
+        Args:
+            model_path (str): path to the `.xml` model.
+            verify_options (List[str]): verify options without the trace file prefix, e.g., `['-f', '-t', '1']`.
+            version (str): version of `verifyta`.
+
+        Returns:
+            str: sha256 hex digest.
+        """
+        content = json.dumps([model_hash(model_path), verify_options, version])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, trace_prefix: str) -> str | None:
+        """Get the terminal output of a cached verification, and restore its trace files with `trace_prefix`.
+
+        Args:
+            key (str): key of the verification.
+            trace_prefix (str): prefix of the trace files passed to `verifyta`.
+
+        Returns:
+            str | None: the terminal output, or None if not cached.
+        """
+        entry_dir = self.__entry_dir(key)
+        try:
+            with self.__lock():
+                result_path = os.path.join(entry_dir, self.__RESULT_FILE)
+                content = load_json(result_path)
+                if 'output' not in content:
+                    self.misses += 1
+                    return None
+                for i, suffix in enumerate(content['traces']):
+                    shutil.copyfile(os.path.join(entry_dir, f'trace{i}'), trace_prefix + suffix)
+                # mark as recently used
+                os.utime(result_path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content['output'].replace(self.__TRACE_PREFIX, trace_prefix)
+
+    def put(self, key: str, output: str, trace_prefix: str, trace_paths: List[str]) -> bool:
+        """Store the terminal output and the trace files of a verification.
+
+        Args:
+            key (str): key of the verification.
+            output (str): terminal output of `verifyta`.
+            trace_prefix (str): prefix of the trace files passed to `verifyta`.
+            trace_paths (List[str]): the trace files written by the verification, which start with `trace_prefix`.
+
+        Returns:
+            bool: `True` if stored, `False` if the trace files are not found or the cache is not writable.
+        """
+        if any(not path.startswith(trace_prefix) or not os.path.exists(path) for path in trace_paths):
+            return False
+
+        entry_dir = self.__entry_dir(key)
+        tmp_dir = f'{entry_dir}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.makedirs(tmp_dir)
+            for i, path in enumerate(trace_paths):
+                shutil.copyfile(path, os.path.join(tmp_dir, f'trace{i}'))
+            content = {'output': output.replace(trace_prefix, self.__TRACE_PREFIX),
+                       'traces': [path[len(trace_prefix):] for path in trace_paths],
+                       'time': time.time()}
+            with open(os.path.join(tmp_dir, self.__RESULT_FILE), 'w', encoding='utf-8') as f:
+                json.dump(content, f)
+            with self.__lock():
+                if os.path.exists(entry_dir):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+                self.__evict()
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+        return True
+
+    def __evict(self) -> None:
+        """Remove the least recently used entries until the cache is not larger than `max_size`, the lock must be held.
+        """
+        entries = []
+        total_size = 0
+        for sub_dir in os.scandir(self.cache_dir):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    last_used = os.stat(os.path.join(entry.path, self.__RESULT_FILE)).st_mtime
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry.path))
+                total_size += size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+
+    def clear(self) -> None:
+        """Remove all entries.
+        """
+        with self.__lock():
+            for sub_dir in os.scandir(self.cache_dir):
+                if sub_dir.is_dir():
+                    shutil.rmtree(sub_dir.path, ignore_errors=True)
+
+
+class CompileCache:
+    """Cache of the `.if` files compiled from `.xml` models, keyed by the content of the model and the version of `verifyta`.
+
+    The `.if` file is copied out of the cache on a hit, so the callers can remove it as usual.
+    The least recently used files are evicted when there are more than `max_entries` files.
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = 64):
+        """
+        Args:
+            cache_dir (str, optional): directory of the cache. Defaults to None, using `if` in `get_cache_dir()`.
+            max_entries (int, optional): maximum number of cached `.if` files. Defaults to 64.
+        """
+        self.cache_dir: str = cache_dir if cache_dir is not None else os.path.join(get_cache_dir(), 'if')
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __lock(self):
+        return file_lock(os.path.join(self.cache_dir, '.lock'))
+
+    @staticmethod
+    def key(model_path: str, version: str) -> str:
+        """Key of a compilation. The raw bytes of the model are hashed, because the `.if` file refers to the lines of the model.
+        The queries are excluded, since they are not compiled into the `.if` file and are placed at the end of the model,
+        so that models that only differ in queries share one `.if` file.
+
+        Args:
+            model_path (str): path to the `.xml` model.
+            version (str): version of `verifyta`.
+
+        Returns:
+            str: sha256 hex digest.
+        """
+        with open(model_path, 'rb') as f:
+            content = f.read()
+        start, end = content.find(b'<queries>'), content.rfind(b'</queries>')
+        if start != -1 and end != -1:
+            content = content[:start] + content[end + len(b'</queries>'):]
+        sha = hashlib.sha256(version.encode('utf-8'))
+        sha.update(content)
+        return sha.hexdigest()
+
+    def get(self, key: str, if_path: str) -> bool:
+        """Copy the cached `.if` file to `if_path`.
+
+        Args:
+            key (str): key of the compilation.
+            if_path (str): target `.if` path.
+
+        Returns:
+            bool: `True` if cached.
+        """
+        cached_path = os.path.join(self.cache_dir, key + '.if')
+        try:
+            with self.__lock():
+                shutil.copyfile(cached_path, if_path)
+                # mark as recently used
+                os.utime(cached_path)
+        except OSError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key: str, if_path: str) -> bool:
+        """Store a copy of the compiled `.if` file.
+
+        Args:
+            key (str): key of the compilation.
+            if_path (str): the compiled `.if` file.
+
+        Returns:
+            bool: `True` if stored, `False` if the cache is not writable.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            os.close(fd)
+        except OSError:
+            return False
+        try:
+            shutil.copyfile(if_path, tmp_path)
+            with self.__lock():
+                os.replace(tmp_path, os.path.join(self.cache_dir, key + '.if'))
+                self.__evict()
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def __evict(self) -> None:
+        """Remove the least recently used `.if` files until at most `max_entries` are left, the lock must be held.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.if'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
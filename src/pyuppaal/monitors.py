@@ -1,4 +1,4 @@
-from typing import List, Tuple, Union
+from typing import Dict, List, Tuple, Union
 
 from .nta import Template, Location, Edge
 
@@ -225,6 +225,196 @@ class Monitors:
 
         return res
 
+    @staticmethod
+    def obs_after_fault_trie_monitor(name: str, suffixes: List[List[str]], sigma_o: List[str], sigma_un: List[str], fault: str, init_ref: int) -> Template:
+        """ obs_after_fault_trie_monitor
+        `obs_after_fault_monitor` of many suffixes in one template, which encodes the suffixes as a prefix trie.
+        Location `pass_i` is reachable iff `suffixes[i]` can be observed right after the `fault`,
+        so that all suffixes can be checked by one verification with the queries `E<> name.pass_i`.
+
+        Args:
+            name (str): the name of returend `Template`.
+            suffixes (List[List[str]]): distinct suffix sequences.
+            sigma_o (List[str]): the set of observable events.
+            sigma_un (List[str]): the set of unobservable events.
+            fault (str): fault name.
+            init_ref (int): the initial location id of the returned `Template`. You can set `init_ref` by `UModel.max_location_id + 1`.
+
+        Raises:
+            ValueError: if `suffixes` is empty or has duplicate suffixes.
+
+        Returns:
+            Template: monitor template
+        """
+        if len(suffixes) == 0:
+            raise ValueError("suffixes should not be empty.")
+
+        # ==============================
+        # 构造 locations
+        # 1. init location, 吸收故障之前的所有 event
+        # 2. trie 的节点, 根节点为 fault location, suffixes[i] 对应的节点为 pass_i
+        # 3. 一个共用的 fail location
+        current_location_id = init_ref
+        init_location = Location(location_id=current_location_id, location_pos=(0, 0), is_initial=True)
+        current_location_id += 1
+        fail_location = Location(location_id=current_location_id, location_pos=(0, 200), name='fail', name_pos=(-15, 210))
+        current_location_id += 1
+
+        # {prefix: location}, children in the order of insertion
+        nodes = {(): Location(location_id=current_location_id, location_pos=(200, 0))}
+        current_location_id += 1
+        children: Dict[Tuple[str, ...], List[Tuple[str, ...]]] = {(): []}
+        # number of nodes of each depth, used for the positions
+        depth_count: Dict[int, int] = {}
+        for i, suffix in enumerate(suffixes):
+            suffix = tuple(suffix)
+            for depth in range(1, len(suffix) + 1):
+                prefix = suffix[:depth]
+                if prefix in nodes:
+                    continue
+                row = depth_count.get(depth, 0)
+                depth_count[depth] = row + 1
+                nodes[prefix] = Location(location_id=current_location_id, location_pos=(200*(depth+1), 150*row))
+                current_location_id += 1
+                children[prefix] = []
+                children[suffix[:depth-1]].append(prefix)
+            node = nodes[suffix]
+            if node.name is not None:
+                raise ValueError(f"Duplicate suffix {list(suffix)} at index {i}.")
+            node.name = f'pass_{i}'
+
+        # ==============================
+        # 构造edges
+        edges: List[Edge] = []
+        # 构造初始location的吸收边，需要吸收所有的event
+        all_events = sigma_o + sigma_un
+        for i, event in enumerate(all_events):
+            absorb_edge = Edge(source_location_id=init_ref, target_location_id=init_ref,
+                               source_location_pos=init_location.location_pos, target_location_pos=init_location.location_pos,
+                               sync=f'{event}?',  sync_pos=(init_location.location_pos[0]-20, init_location.location_pos[1]+20*(i+1)))
+            edges.append(absorb_edge)
+
+        # 添加fault edge
+        root = nodes[()]
+        fault_edge = Edge(source_location_id=init_location.location_id, target_location_id=root.location_id,
+                          source_location_pos=init_location.location_pos, target_location_pos=root.location_pos,
+                          sync=f'{fault}?', sync_pos=(init_location.location_pos[0]+30, init_location.location_pos[1]-20))
+        edges.append(fault_edge)
+
+        # 添加trie edges 以及 fail edges, 叶子节点不需要fail
+        for prefix, node in nodes.items():
+            if not children[prefix]:
+                continue
+            next_events = [child[-1] for child in children[prefix]]
+            for child in children[prefix]:
+                child_location = nodes[child]
+                edges.append(Edge(source_location_id=node.location_id, target_location_id=child_location.location_id,
+                                  source_location_pos=node.location_pos, target_location_pos=child_location.location_pos,
+                                  sync=f'{child[-1]}?', sync_pos=(child_location.location_pos[0]-100, child_location.location_pos[1]-20)))
+            for j, fail_event in enumerate(sigma_o):
+                if fail_event not in next_events:
+                    edges.append(Edge(source_location_id=node.location_id, target_location_id=fail_location.location_id,
+                                      source_location_pos=node.location_pos, target_location_pos=fail_location.location_pos,
+                                      sync=f'{fail_event}?', sync_pos=(node.location_pos[0]+30, node.location_pos[1]+20*(j+1))))
+
+        # 合并
+        res = Template(name=name,
+                       locations=[init_location] + list(nodes.values()) + [fail_location],
+                       init_ref=init_ref,
+                       edges=edges)
+        return res
+
+    @staticmethod
+    def twin_plant_monitor(name: str, n: int, sigma_o: List[str], twin_sigma_o: List[str], fault: str, init_ref: int) -> Template:
+        """ twin_plant_monitor
+        Compares the first `n` observations after the `fault` of the faulty copy of the plant,
+        with `n` consecutive observations of the fault-free copy (see `UModel.twin_plant`).
+        Location `pass` is reachable iff both copies produce the same `n` observations.
+
+        Args:
+            name (str): the name of returend `Template`.
+            n (int): the number of compared observations, should be positive.
+            sigma_o (List[str]): the set of observable events of the faulty copy.
+            twin_sigma_o (List[str]): the observable events of the fault-free copy, in the same order as `sigma_o`.
+            fault (str): fault name.
+            init_ref (int): the initial location id of the returned `Template`. You can set `init_ref` by `UModel.max_location_id + 1`.
+
+        Raises:
+            ValueError: if `n` is not positive, or `sigma_o` and `twin_sigma_o` have different lengths.
+
+        Returns:
+            Template: monitor template
+        """
+        if n < 1:
+            raise ValueError(f"n should be positive, got {n}.")
+        if len(sigma_o) != len(twin_sigma_o):
+            raise ValueError(f"sigma_o and twin_sigma_o should have the same length, got {len(sigma_o)} and {len(twin_sigma_o)}.")
+
+        # 两个副本的观测分别记录在 f_obs, n_obs 中, 不要求两个副本交替观测
+        # f_len, n_len 为 -1 表示对应的观测窗口还没有开始
+        declaration = f"""const int N = {n};
+int f_obs[N];
+int n_obs[N];
+int f_len = -1;
+int n_len = -1;
+
+bool match_f(int e) {{
+    return f_len >= n_len || n_obs[f_len] == e;
+}}
+
+bool match_n(int e) {{
+    int i = n_len < 0 ? 0 : n_len;
+    return i >= f_len || f_obs[i] == e;
+}}
+
+void observe_f(int e) {{
+    f_obs[f_len] = e;
+    f_len++;
+}}
+
+void observe_n(int e) {{
+    if (n_len < 0) n_len = 0;
+    n_obs[n_len] = e;
+    n_len++;
+}}"""
+
+        watch_location = Location(location_id=init_ref, location_pos=(0, 0), name='watch', name_pos=(-20, -30))
+        pass_location = Location(location_id=init_ref+1, location_pos=(300, 0), name='pass', name_pos=(290, -30))
+        fail_location = Location(location_id=init_ref+2, location_pos=(0, 300), name='fail', name_pos=(-10, 310))
+
+        edges: List[Edge] = []
+
+        def add_edge(target: Location, sync: str, guard: str, update: str = None) -> None:
+            # 自环与 fail 边的标签依次向下排列
+            offset = 20 * (len(edges) + 1)
+            edges.append(Edge(source_location_id=watch_location.location_id, target_location_id=target.location_id,
+                              source_location_pos=watch_location.location_pos, target_location_pos=target.location_pos,
+                              sync=sync, sync_pos=(-200, offset), guard=guard, guard_pos=(-400, offset),
+                              update=update, update_pos=(-100, offset)))
+
+        # the window of the faulty copy starts at a fault, which may be skipped as `obs_after_fault_monitor` does
+        add_edge(watch_location, f'{fault}?', 'f_len == -1', 'f_len = 0')
+        add_edge(watch_location, f'{fault}?', 'f_len == -1')
+        for i, (event, twin_event) in enumerate(zip(sigma_o, twin_sigma_o)):
+            add_edge(watch_location, f'{event}?', f'f_len >= 0 && f_len < N && match_f({i})', f'observe_f({i})')
+            add_edge(fail_location, f'{event}?', f'f_len >= 0 && f_len < N && !match_f({i})')
+            # the window of the fault-free copy starts at any observation
+            add_edge(watch_location, f'{twin_event}?', 'n_len == -1')
+            add_edge(watch_location, f'{twin_event}?', f'n_len < N && match_n({i})', f'observe_n({i})')
+            add_edge(fail_location, f'{twin_event}?', f'n_len < N && !match_n({i})')
+
+        pass_edge = Edge(source_location_id=watch_location.location_id, target_location_id=pass_location.location_id,
+                         source_location_pos=watch_location.location_pos, target_location_pos=pass_location.location_pos,
+                         guard='f_len == N && n_len == N', guard_pos=(100, -20))
+        edges.append(pass_edge)
+
+        res = Template(name=name,
+                       locations=[watch_location, pass_location, fail_location],
+                       init_ref=init_ref,
+                       edges=edges,
+                       declaration=declaration)
+        return res
+
     @staticmethod
     def input_after_fault_monitor(
             name: str,
@@ -1,6 +1,11 @@
 # support return typing MyTree
 from __future__ import annotations
-from typing import List
+import json
+import os
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Tuple
+
+from .cache import dump_json, load_json
 
 
 class MyTree:
@@ -60,9 +65,9 @@ class MyTree:
         Returns:
             MyTree: _description_
         """
-        queue = [self]
+        queue = deque([self])
         while queue:
-            current_node = queue.pop(0)
+            current_node = queue.popleft()
             if not current_node.has_checked:
                 return current_node
             queue.extend(current_node.children)
@@ -72,6 +77,176 @@ class MyTree:
         return f"MyTree(depth:{self.depth}, has_checked: {self.has_checked}, is_valid: {self.is_valid}, observation_sequence: {self.observation_sequence})"
 
 
+class SearchStats:
+    """Statistics of a `SuffixSearch`.
+    """
+
+    def __init__(self):
+        # number of prefixes checked by the verifier
+        self.verifier_calls: int = 0
+        # number of verifier calls for prefixes shorter than `n`, which `fault_diagnosability` does not need
+        self.prefix_calls: int = 0
+        # number of prefixes whose validity is already in the memo
+        self.memo_hits: int = 0
+        # number of invalid prefixes whose extensions are never checked
+        self.pruned_prefixes: int = 0
+        # number of suffixes of length `n` that are never checked because of the pruned prefixes
+        self.pruned_suffixes: int = 0
+
+    @property
+    def saved_calls(self) -> int:
+        """Verifier calls saved by pruning, compared with checking each suffix of length `n` that the search has passed,
+        as `UModel.fault_diagnosability` does. It is `pruned_suffixes - prefix_calls`, and 0 if the prefix calls cost more
+        than the pruning saved, e.g., when no prefix is invalid.
+        """
+        return max(self.pruned_suffixes - self.prefix_calls, 0)
+
+    def __repr__(self) -> str:
+        return (f"SearchStats(verifier_calls: {self.verifier_calls}, prefix_calls: {self.prefix_calls}, memo_hits: {self.memo_hits}, "
+                f"pruned_prefixes: {self.pruned_prefixes}, pruned_suffixes: {self.pruned_suffixes}, saved_calls: {self.saved_calls})")
+
+
+class SuffixMemo:
+    """Verdicts of the observation suffixes, shared by the diagnosability checks of the same model and fault with different `n`,
+    and by later runs if saved to a json file.
+
+    The verdicts are keyed by `UModel.model_hash`, so the verdicts of a modified model are never reused,
+    and then by the fault, `sigma_o` and `sigma_un`, so the verdicts of different faults are kept apart. For each suffix, the memo keeps
+    whether it is valid (can happen after the fault, see `SuffixSearch`) and whether it identifies the fault.
+
+    Examples:
+        >>> with SuffixMemo('diagnosability_memo.json') as memo:
+        >>>     umodel.fault_diagnosability_increasing('f1', 5, sigma_o, sigma_un, memo=memo)
+        >>>     umodel.fault_diagnosability_increasing('f2', 5, sigma_o, sigma_un, memo=memo)
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str, optional): the json file, which is loaded if it exists, and written by `save`. Defaults to None, keeping the memo in memory.
+        """
+        self.path: str | None = path
+        # {model_hash: {key: {'valid': {suffix: bool}, 'identified': {suffix: bool}}}}
+        self.__tables: Dict[str, Dict[str, Dict[str, Dict[Tuple[str, ...], bool]]]] = {}
+        if path is not None:
+            data = load_json(path)
+            for model_hash, tables in data.items():
+                self.__tables[model_hash] = {
+                    key: {kind: {tuple(suffix.split(',')) if suffix else (): verdict for suffix, verdict in verdicts.items()}
+                          for kind, verdicts in table.items()}
+                    for key, table in tables.items()}
+
+    def __enter__(self) -> SuffixMemo:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.save()
+
+    def tables(self, model_hash: str, fault: str, sigma_o: List[str], sigma_un: List[str]) -> Tuple[Dict[Tuple[str, ...], bool], Dict[Tuple[str, ...], bool]]:
+        """The verdicts of the suffixes of `fault`, which are updated by the diagnosability checks.
+
+        Args:
+            model_hash (str): `UModel.model_hash`.
+            fault (str): fault name.
+            sigma_o (List[str]): the set of observable events.
+            sigma_un (List[str]): the set of unobservable events.
+
+        Returns:
+            Tuple[Dict[Tuple[str, ...], bool], Dict[Tuple[str, ...], bool]]: whether each suffix is valid, and whether each suffix identifies the fault.
+        """
+        key = json.dumps([fault, list(sigma_o), list(sigma_un)])
+        table = self.__tables.setdefault(model_hash, {}).setdefault(key, {'valid': {}, 'identified': {}})
+        return table['valid'], table['identified']
+
+    def save(self) -> bool:
+        """Write the memo to `path` atomically, if `path` is set.
+
+        Returns:
+            bool: `False` if `path` is set but not writable.
+        """
+        if self.path is None:
+            return True
+        data = {model_hash: {key: {kind: {','.join(suffix): verdict for suffix, verdict in verdicts.items()}
+                                   for kind, verdicts in table.items()}
+                             for key, table in tables.items()}
+                for model_hash, tables in self.__tables.items()}
+        return dump_json(os.path.abspath(self.path), data)
+
+
+class SuffixSearch:
+    """Search the valid observation suffixes of length `n` by growing prefixes from an explicit frontier.
+
+    A prefix is valid if it can be observed after the fault. If a prefix is invalid, none of its extensions is valid,
+    so its whole subtree is pruned. The validity of each prefix is checked at most once, and memoized.
+
+    Examples:
+        >>> search = SuffixSearch(['a', 'b'], 3, is_valid=lambda prefix: prefix[0] == 'a')
+        >>> list(search)
+        [['a', 'a', 'a'], ['a', 'a', 'b'], ['a', 'b', 'a'], ['a', 'b', 'b']]
+        >>> search.stats.pruned_suffixes
+        4
+    """
+
+    def __init__(self, sigma_o: List[str], n: int, is_valid: Callable[[List[str]], bool], strategy: str = 'dfs',
+                 memo: Dict[Tuple[str, ...], bool] = None):
+        """
+        Args:
+            sigma_o (List[str]): the set of observable events.
+            n (int): length of the suffixes.
+            is_valid (Callable[[List[str]], bool]): whether a prefix is valid, e.g., verified by `verifyta`.
+            strategy (str, optional): `'dfs'` yields the suffixes in the order of `itertools.product(sigma_o, repeat=n)`,
+                `'bfs'` checks all prefixes of a length before the longer ones. Defaults to 'dfs'.
+            memo (Dict[Tuple[str, ...], bool], optional): validity of the prefixes that are already checked, which is updated by the search.
+                Defaults to None, using an empty memo.
+
+        Raises:
+            ValueError: if `strategy` is neither `'dfs'` nor `'bfs'`.
+        """
+        if strategy not in ('dfs', 'bfs'):
+            raise ValueError(f"strategy should be 'dfs' or 'bfs', current strategy = {strategy}.")
+        self.sigma_o: List[str] = list(sigma_o)
+        self.n: int = n
+        self.is_valid: Callable[[List[str]], bool] = is_valid
+        self.strategy: str = strategy
+        self.memo: Dict[Tuple[str, ...], bool] = {} if memo is None else memo
+        self.stats: SearchStats = SearchStats()
+
+    def check(self, prefix: Tuple[str, ...]) -> bool:
+        """Validity of `prefix`, checked by `is_valid` only if it is not in the memo.
+        """
+        res = self.memo.get(prefix)
+        if res is not None:
+            self.stats.memo_hits += 1
+            return res
+        res = bool(self.is_valid(list(prefix)))
+        self.memo[prefix] = res
+        self.stats.verifier_calls += 1
+        if len(prefix) < self.n:
+            self.stats.prefix_calls += 1
+        return res
+
+    def __iter__(self) -> Iterator[List[str]]:
+        """Yield the valid suffixes of length `n`.
+        """
+        # 深度优先用栈 (pop), 广度优先用队列 (popleft), 取下一个前缀都是 O(1)
+        frontier: Deque[Tuple[str, ...]] = deque([()])
+        pop = frontier.pop if self.strategy == 'dfs' else frontier.popleft
+        while frontier:
+            prefix = pop()
+            # the empty prefix is always valid, unless it is the suffix to be checked (n = 0)
+            if (prefix or self.n == 0) and not self.check(prefix):
+                if len(prefix) < self.n:
+                    self.stats.pruned_prefixes += 1
+                    self.stats.pruned_suffixes += len(self.sigma_o) ** (self.n - len(prefix))
+                continue
+            if len(prefix) == self.n:
+                yield list(prefix)
+                continue
+            children = [prefix + (o,) for o in self.sigma_o]
+            # the leftmost child is on the top of the stack
+            frontier.extend(reversed(children) if self.strategy == 'dfs' else children)
+
+
 def test():
     sigma_o = ["a", "b", "c"]
     n = 3
@@ -92,6 +267,3 @@ def test():
                     return False
                 else:
                     node.grow()
-
-
-test()
@@ -4,12 +4,183 @@
 """
 from __future__ import annotations
 from dataclasses import dataclass
+import copy
+import inspect
+import re
 import xml.etree.ElementTree as ET
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+
+from . import xmlio
+
+
+class _Tracked:
+    """Base class that notifies the owner (e.g., the template of a location) when a public attribute is changed.
+    Lists in `_child_lists` are wrapped by `_ChildList`, so that modifying them also notifies.
+
+    `_owner` is a slot, so subclasses must set it to `None` before setting any public attribute.
+    """
+    __slots__ = ('_owner',)
+    _child_lists: Tuple[str, ...] = ()
+
+    def __setattr__(self, name: str, value) -> None:
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+            return
+        if name in self._child_lists and value is not None:
+            value = _ChildList(self, value)
+        object.__setattr__(self, name, value)
+        self._on_change()
+
+    def __copy__(self):
+        cls = type(self)
+        res = object.__new__(cls)
+        for name in _slot_names(cls):
+            object.__setattr__(res, name, getattr(self, name))
+        if hasattr(self, '__dict__'):
+            res.__dict__.update(self.__dict__)
+        # the copy does not belong to the owner of self
+        res._owner = None
+        return res
+
+    def __setstate__(self, state) -> None:
+        # used by pickle and copy.deepcopy, the state of a slotted object is `(dict or None, slots)`
+        dict_state, slot_state = state if isinstance(state, tuple) else (state, None)
+        object.__setattr__(self, '_owner', None)
+        for name, value in (slot_state or {}).items():
+            object.__setattr__(self, name, value)
+        if dict_state:
+            self.__dict__.update(dict_state)
+
+    def _on_change(self) -> None:
+        if self._owner is not None:
+            self._owner._on_change()
+
+    @classmethod
+    def _from_fields(cls, fields: Dict[str, object]):
+        """Create an instance with the attributes `fields` without calling `__init__`, which is much faster when parsing models.
+        """
+        res = object.__new__(cls)
+        res._owner = None
+        for name in cls._child_lists:
+            if fields.get(name) is not None:
+                fields[name] = _ChildList(res, fields[name])
+        for name, value in fields.items():
+            object.__setattr__(res, name, value)
+        return res
+
+
+_SLOT_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    """Names of the slots of `cls` and its base classes except `_owner`.
+    """
+    res = _SLOT_NAMES.get(cls)
+    if res is None:
+        res = tuple(name for klass in cls.__mro__ for name in klass.__dict__.get('__slots__', ()) if name != '_owner')
+        _SLOT_NAMES[cls] = res
+    return res
+
+
+def _init_defaults(cls) -> Dict[str, object]:
+    """Default arguments of `cls.__init__`, whose names are the same as the attributes.
+    """
+    return {name: param.default for name, param in inspect.signature(cls.__init__).parameters.items()
+            if param.default is not inspect.Parameter.empty}
+
+
+def _pos(elem: ET.Element) -> Tuple[int, int] | None:
+    """Position `(x, y)` of a xml element, `None` if not set.
+    """
+    x = elem.get('x')
+    if x is None:
+        return None
+    return int(x), int(elem.get('y'))
+
+
+class _ChildList(list):
+    """A list that notifies its owner when it is modified, and becomes the owner of the `_Tracked` items in it.
+    """
+    __slots__ = ('_owner',)
+
+    def __init__(self, owner: _Tracked, items=()):
+        super().__init__(items)
+        self._owner = owner
+        for item in self:
+            self.__adopt(item)
+
+    def __reduce_ex__(self, protocol):
+        # rebuild with the owner, so that the items are adopted again by pickle and copy.deepcopy
+        return _ChildList, (self._owner, list(self))
+
+    def __adopt(self, item) -> None:
+        if isinstance(item, _Tracked):
+            item._owner = self._owner
+
+    def __changed(self) -> None:
+        if self._owner is not None:
+            self._owner._on_change()
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        for item in (value if isinstance(index, slice) else [value]):
+            self.__adopt(item)
+        self.__changed()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self.__changed()
+
+    def __iadd__(self, items) -> _ChildList:
+        self.extend(items)
+        return self
+
+    def __imul__(self, n: int) -> _ChildList:
+        super().__imul__(n)
+        self.__changed()
+        return self
+
+    def append(self, item) -> None:
+        super().append(item)
+        self.__adopt(item)
+        self.__changed()
+
+    def extend(self, items) -> None:
+        items = list(items)
+        super().extend(items)
+        for item in items:
+            self.__adopt(item)
+        self.__changed()
+
+    def insert(self, index: int, item) -> None:
+        super().insert(index, item)
+        self.__adopt(item)
+        self.__changed()
+
+    def pop(self, index: int = -1):
+        res = super().pop(index)
+        self.__changed()
+        return res
+
+    def remove(self, item) -> None:
+        super().remove(item)
+        self.__changed()
+
+    def clear(self) -> None:
+        super().clear()
+        self.__changed()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self.__changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.__changed()
 
 
 @dataclass
-class Location:
+class Location(_Tracked):
     """
     Represents a location in a UPPAAL model.
 
@@ -26,6 +197,10 @@ class Location:
         >>>    invariant="x <= 5",
         >>>    is_initial=True)
     """
+    # 使用 __slots__ 而不是 __dict__, 减少大模型的内存占用
+    __slots__ = ('location_id', 'location_pos', 'name', 'name_pos', 'invariant', 'invariant_pos',
+                 'rate_of_exponential', 'rate_of_exp_pos', 'is_initial', 'is_urgent', 'is_committed', 'is_branchpoint',
+                 'comments', 'comments_pos', 'test_code_on_enter', 'test_code_on_exit')
 
     def __init__(self, location_id: int, location_pos: Tuple(int, int),
                  name: str = None, name_pos: Tuple(int, int) = None,
@@ -55,6 +230,7 @@ class Location:
             test_code_on_enter (str, optional): Test code to be executed upon entering this location. Defaults to None.
             test_code_on_exit (str, optional): Test code to be executed upon exiting this location. Defaults to None.
         """
+        self._owner = None
         # 界面隐含属性
         # location_id自动更新，用户不要修改
         self.location_id: int = location_id
@@ -111,30 +287,27 @@ class Location:
 
             # 添加名字
             if self.name is not None:
-                if self.name_pos is None:
-                    self.name_pos = (x-10, y-34)
-                elem = ET.Element('name', {'x': str(self.name_pos[0]),
-                                           'y': str(self.name_pos[1])})
+                name_pos = (x-10, y-34) if self.name_pos is None else self.name_pos
+                elem = ET.Element('name', {'x': str(name_pos[0]),
+                                           'y': str(name_pos[1])})
                 elem.text = self.name
                 res.append(elem)
 
             # 添加 inv
             if self.invariant is not None:
-                if self.invariant_pos is None:
-                    self.invariant_pos = (x-10, y+17)
+                invariant_pos = (x-10, y+17) if self.invariant_pos is None else self.invariant_pos
                 elem = ET.Element('label', {'kind': 'invariant',
-                                            'x': str(self.invariant_pos[0]),
-                                            'y': str(self.invariant_pos[1])})
+                                            'x': str(invariant_pos[0]),
+                                            'y': str(invariant_pos[1])})
                 elem.text = self.invariant
                 res.append(elem)
 
             # 添加 rate_of_exponential
             if self.rate_of_exponential is not None:
-                if self.rate_of_exp_pos is None:
-                    self.rate_of_exp_pos = (x-10, y+34)
+                rate_of_exp_pos = (x-10, y+34) if self.rate_of_exp_pos is None else self.rate_of_exp_pos
                 elem = ET.Element('label', {'kind': 'exponentialrate',
-                                            'x': str(self.rate_of_exp_pos[0]),
-                                            'y': str(self.rate_of_exp_pos[1])})
+                                            'x': str(rate_of_exp_pos[0]),
+                                            'y': str(rate_of_exp_pos[1])})
                 elem.text = str(self.rate_of_exponential)
                 res.append(elem)
 
@@ -154,11 +327,10 @@ class Location:
 
             # 添加 comments
             if self.comments is not None:
-                if self.comments_pos is None:
-                    self.comments_pos = (x-10, y+59)
+                comments_pos = (x-10, y+59) if self.comments_pos is None else self.comments_pos
                 elem = ET.Element('label', {'kind': 'comments',
-                                            'x': str(self.comments_pos[0]),
-                                            'y': str(self.comments_pos[1])})
+                                            'x': str(comments_pos[0]),
+                                            'y': str(comments_pos[1])})
                 elem.text = self.comments
                 res.append(elem)
 
@@ -171,6 +343,52 @@ class Location:
                 res.append(ET.Element('urgent'))
             return res
 
+    def tostring(self, indent: int = 0, level: int = 0) -> str:
+        """Serialized xml of `self` written directly as text, which is the same as `xmlio.tostring_element(self.Element, indent, level)`
+        without building the element.
+
+        Args:
+            indent (int, optional): number of spaces per indentation level, `0` for no indentation. Defaults to 0.
+            level (int, optional): indentation level of `self` in the document. Defaults to 0.
+
+        Returns:
+            str: the serialized xml.
+        """
+        prefix = level * indent * ' ' if indent else None
+        x, y = self.location_pos
+        start = f'id="id{self.location_id}" x="{x}" y="{y}"'
+        if self.is_branchpoint:
+            return xmlio.tostring_leaf('<branchpoint ' + start, 'branchpoint', ' ', prefix)
+
+        child = prefix + indent * ' ' if indent else None
+        children = []
+        # 默认位置与 Element 相同
+        if self.name is not None:
+            name_pos = (x-10, y-34) if self.name_pos is None else self.name_pos
+            children.append(xmlio.tostring_leaf(f'<name x="{name_pos[0]}" y="{name_pos[1]}"',
+                                                'name', self.name, child))
+        if self.invariant is not None:
+            invariant_pos = (x-10, y+17) if self.invariant_pos is None else self.invariant_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="invariant" x="{invariant_pos[0]}" y="{invariant_pos[1]}"',
+                                                'label', self.invariant, child))
+        if self.rate_of_exponential is not None:
+            rate_of_exp_pos = (x-10, y+34) if self.rate_of_exp_pos is None else self.rate_of_exp_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="exponentialrate" x="{rate_of_exp_pos[0]}" y="{rate_of_exp_pos[1]}"',
+                                                'label', str(self.rate_of_exponential), child))
+        if self.test_code_on_enter is not None:
+            children.append(xmlio.tostring_leaf('<label kind="testcodeEnter"', 'label', self.test_code_on_enter, child))
+        if self.test_code_on_exit is not None:
+            children.append(xmlio.tostring_leaf('<label kind="testcodeExit"', 'label', self.test_code_on_exit, child))
+        if self.comments is not None:
+            comments_pos = (x-10, y+59) if self.comments_pos is None else self.comments_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="comments" x="{comments_pos[0]}" y="{comments_pos[1]}"',
+                                                'label', self.comments, child))
+        if self.is_committed:
+            children.append(xmlio.tostring_leaf('<committed', 'committed', None, child))
+        if self.is_urgent:
+            children.append(xmlio.tostring_leaf('<urgent', 'urgent', None, child))
+        return xmlio.tostring_node('<location ' + start, 'location', children, prefix)
+
     @property
     def xml(self) -> str:
         """获取xml字符串
@@ -178,8 +396,7 @@ class Location:
         Returns:
             str: xml字符串
         """
-        element = self.Element
-        return ET.tostring(element, encoding="utf-8").decode("utf-8")
+        return self.tostring()
 
     @staticmethod
     def from_xml(location_xml: str | ET.Element) -> Location:
@@ -206,78 +423,63 @@ class Location:
         # root of location element
         root = location_xml
         if isinstance(location_xml, str):
-            root = ET.fromstring(location_xml)
+            root = xmlio.fromstring(location_xml)
 
+        fields = dict(_LOCATION_DEFAULTS)
+        fields['location_id'] = int(root.get("id")[2:])
+        fields['location_pos'] = (int(root.get("x")), int(root.get("y")))
         if root.tag == "branchpoint":
-            return Location(location_id=int(root.get("id")[2:]),
-                            location_pos=(int(root.get("x")), int(root.get("y"))),
-                            is_branchpoint=True)
-        elif root.tag == "location":
-            name_elem = root.find("name")
-            name: str = None
-            # (x, y)
-            name_pos = None
-            if name_elem is not None:
-                name = name_elem.text
-                name_pos = (int(name_elem.get("x")), int(name_elem.get("y")))
-
-            # 获取 location 的各种 label 对应的 text
-            invariant = None
-            invariant_pos = None
-            rate_of_exponential = None
-            rate_of_exp_pos = None
-            comments = None
-            comments_pos = None
-            test_code_on_enter = None
-            test_code_on_exit = None
-            for label_elem in root.iter("label"):
-                if label_elem.get('kind') == "invariant":
-                    invariant = label_elem.text
-                    invariant_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-                elif label_elem.get('kind') == "exponentialrate":
-                    rate_of_exponential = float(label_elem.text)
-                    rate_of_exp_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-                elif label_elem.get('kind') == "comments":
-                    comments = label_elem.text
-                    comments_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-                elif label_elem.get('kind') == "testcodeEnter":
-                    test_code_on_enter = label_elem.text
-                elif label_elem.get('kind') == "testcodeExit":
-                    test_code_on_exit = label_elem.text
-                else:
-                    pass
-            # 判断location类型(initial, urgent, committed)
-            # 注意, is_initial不是从location里表示, 而是在template里有initial_ref = location_id标识。
-            # 但是用户使用的时候, 为了符合用户操作界面的直觉，可以对location设置initial。
-            # is_initial = root.find("initial") is not None
-            # 在加载的时候，我们将从template加载is_initial, 这里默认设置成False
-            is_urgent = root.find("urgent") is not None
-            is_committed = root.find("committed") is not None
-
-            res = Location(location_id=int(root.get("id")[2:]),
-                           location_pos=(int(root.get("x")), int(root.get("y"))),
-                           name=name,
-                           name_pos=name_pos,
-                           invariant=invariant,
-                           invariant_pos=invariant_pos,
-                           rate_of_exponential=rate_of_exponential,
-                           rate_of_exp_pos=rate_of_exp_pos,
-                           # 在加载的时候，我们将从template加载is_initial, 这里默认设置成False
-                           is_initial=False,
-                           is_urgent=is_urgent,
-                           is_committed=is_committed,
-                           comments=comments,
-                           comments_pos=comments_pos,
-                           test_code_on_enter=test_code_on_enter,
-                           test_code_on_exit=test_code_on_exit)
-
-            return res
-        else:
+            fields['is_branchpoint'] = True
+            return Location._from_fields(fields)
+        if root.tag != "location":
             raise ValueError(f"can not parse: {root.tag}. Only support location, branchpoint.")
 
+        # 判断location类型(urgent, committed), 以及获取 location 的各种 label 对应的 text, 只遍历一次子元素
+        # 注意, is_initial不是从location里表示, 而是在template里有initial_ref = location_id标识。
+        # 在加载的时候，我们将从template加载is_initial, 这里默认设置成False
+        for elem in root:
+            tag = elem.tag
+            if tag == "label":
+                label = _LOCATION_LABELS.get(elem.get('kind'))
+                if label is not None:
+                    text_field, pos_field, convert = label
+                    fields[text_field] = elem.text if convert is None else convert(elem.text)
+                    if pos_field is not None:
+                        fields[pos_field] = _pos(elem)
+            elif tag == "name":
+                fields['name'] = elem.text
+                fields['name_pos'] = _pos(elem)
+            elif tag in _LOCATION_FLAGS:
+                fields[_LOCATION_FLAGS[tag]] = True
+        return Location._from_fields(fields)
+
+    def copy(self) -> Location:
+        """Make a copy of `self`, which is much faster than `copy.deepcopy` since all attributes are immutable.
+
+        Returns:
+            Location: the copied location.
+        """
+        return copy.copy(self)
+
+
+_LOCATION_DEFAULTS = _init_defaults(Location)
+# label kind: (text attribute, position attribute, text converter)
+_LOCATION_LABELS = {
+    "invariant": ("invariant", "invariant_pos", None),
+    "exponentialrate": ("rate_of_exponential", "rate_of_exp_pos", float),
+    "comments": ("comments", "comments_pos", None),
+    "testcodeEnter": ("test_code_on_enter", None, None),
+    "testcodeExit": ("test_code_on_exit", None, None),
+}
+# tag: flag attribute
+_LOCATION_FLAGS = {
+    "urgent": "is_urgent",
+    "committed": "is_committed",
+}
+
 
 @dataclass
-class Edge:
+class Edge(_Tracked):
     """In GUI, it names `Edge`, but in `xml`, it names `transition`.
     Represents a transition (edge) between two locations in a UPPAAL model.
 
@@ -302,6 +504,12 @@ class Edge:
         >>>     update="x=0")
     """
 
+    # 使用 __slots__ 而不是 __dict__, 减少大模型的内存占用
+    __slots__ = ('source_location_id', 'source_location_pos', 'target_location_id', 'target_location_pos',
+                 'select', 'select_pos', 'guard', 'guard_pos', 'sync', 'sync_pos', 'update', 'update_pos',
+                 'probability_weight', 'prob_weight_pos', 'comments', 'comments_pos', 'test_code', 'nails')
+    _child_lists = ('nails',)
+
     def __init__(self, source_location_id: int, target_location_id: int,
                  source_location_pos: Tuple(int, int),
                  target_location_pos: Tuple(int, int),
@@ -339,6 +547,7 @@ class Edge:
             ValueError: Raised if both probability_weight and guard are set, as an edge cannot be both a normal and a probability edge.
 
         """
+        self._owner = None
         # 界面隐含属性
         self.source_location_id: int = source_location_id
         self.source_location_pos: Tuple(int, int) = source_location_pos
@@ -374,6 +583,9 @@ class Edge:
         # 转折点 List[(x, y)]
         self.nails: List[Tuple(int, int)] = nails
 
+        self._check_probability()
+
+    def _check_probability(self) -> None:
         # 不能同时为normal edge和probability edge
         if not (self.probability_weight is None or self.guard is None):
             err_info = "An edge can not be both normal or probability. "
@@ -402,42 +614,38 @@ class Edge:
 
         # 构建并添加select
         if self.select is not None:
-            if self.select_pos is None:
-                self.select_pos = (x+18, y-51)
+            select_pos = (x+18, y-51) if self.select_pos is None else self.select_pos
 
             label_select = ET.Element('label', {'kind': 'select',
-                                                'x': str(self.select_pos[0]),
-                                                'y': str(self.select_pos[1])})
+                                                'x': str(select_pos[0]),
+                                                'y': str(select_pos[1])})
             label_select.text = self.select
             transition.append(label_select)
 
         # 构建并添加guard
         if self.guard is not None:
-            if self.guard_pos is None:
-                self.guard_pos = (x+18, y-34)
+            guard_pos = (x+18, y-34) if self.guard_pos is None else self.guard_pos
             label_guard = ET.Element('label', {'kind': 'guard',
-                                               'x': str(self.guard_pos[0]),
-                                               'y': str(self.guard_pos[1])})
+                                               'x': str(guard_pos[0]),
+                                               'y': str(guard_pos[1])})
             label_guard.text = self.guard
             transition.append(label_guard)
 
         # 构建并添加synchronisation
         if self.sync is not None:
-            if self.sync_pos is None:
-                self.sync_pos = (x+18, y-17)
+            sync_pos = (x+18, y-17) if self.sync_pos is None else self.sync_pos
             label_sync = ET.Element('label', {'kind': 'synchronisation',
-                                              'x': str(self.sync_pos[0]),
-                                              'y': str(self.sync_pos[1])})
+                                              'x': str(sync_pos[0]),
+                                              'y': str(sync_pos[1])})
             label_sync.text = self.sync
             transition.append(label_sync)
 
          # 构建并添加assignment: update
         if self.update is not None:
-            if self.update_pos is None:
-                self.update_pos = (x+18, y)
+            update_pos = (x+18, y) if self.update_pos is None else self.update_pos
             label_update = ET.Element('label', {'kind': 'assignment',
-                                                'x': str(self.update_pos[0]),
-                                                'y': str(self.update_pos[1])})
+                                                'x': str(update_pos[0]),
+                                                'y': str(update_pos[1])})
             label_update.text = self.update
             transition.append(label_update)
 
@@ -449,21 +657,19 @@ class Edge:
 
         # 构建并添加 comments
         if self.comments is not None:
-            if self.comments_pos is None:
-                self.comments_pos = (x+18, y+25)
+            comments_pos = (x+18, y+25) if self.comments_pos is None else self.comments_pos
             elem = ET.Element('label', {'kind': 'comments',
-                                        'x': str(self.comments_pos[0]),
-                                        'y': str(self.comments_pos[1])})
+                                        'x': str(comments_pos[0]),
+                                        'y': str(comments_pos[1])})
             elem.text = self.comments
             transition.append(elem)
 
         # 构建并添加probability
         if self.probability_weight is not None:
-            if self.prob_weight_pos is None:
-                self.prob_weight_pos = (x+18, y+44)
+            prob_weight_pos = (x+18, y+44) if self.prob_weight_pos is None else self.prob_weight_pos
             elem = ET.Element('label', {'kind': 'probability',
-                                        'x': str(self.prob_weight_pos[0]),
-                                        'y': str(self.prob_weight_pos[1])})
+                                        'x': str(prob_weight_pos[0]),
+                                        'y': str(prob_weight_pos[1])})
             elem.text = str(self.probability_weight)
             transition.append(elem)
 
@@ -475,6 +681,56 @@ class Edge:
                 transition.append(nail_element)
         return transition
 
+    def tostring(self, indent: int = 0, level: int = 0) -> str:
+        """Serialized xml of `self` written directly as text, which is the same as `xmlio.tostring_element(self.Element, indent, level)`
+        without building the element.
+
+        Args:
+            indent (int, optional): number of spaces per indentation level, `0` for no indentation. Defaults to 0.
+            level (int, optional): indentation level of `self` in the document. Defaults to 0.
+
+        Returns:
+            str: the serialized xml.
+        """
+        prefix = level * indent * ' ' if indent else None
+        child = prefix + indent * ' ' if indent else None
+        # 两头location的中点, 默认位置与 Element 相同
+        x = (self.source_location_pos[0] + self.target_location_pos[0]) // 2
+        y = (self.source_location_pos[1] + self.target_location_pos[1]) // 2
+
+        children = [xmlio.tostring_leaf(f'<source ref="id{self.source_location_id}"', 'source', None, child),
+                    xmlio.tostring_leaf(f'<target ref="id{self.target_location_id}"', 'target', None, child)]
+        if self.select is not None:
+            select_pos = (x+18, y-51) if self.select_pos is None else self.select_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="select" x="{select_pos[0]}" y="{select_pos[1]}"',
+                                                'label', self.select, child))
+        if self.guard is not None:
+            guard_pos = (x+18, y-34) if self.guard_pos is None else self.guard_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="guard" x="{guard_pos[0]}" y="{guard_pos[1]}"',
+                                                'label', self.guard, child))
+        if self.sync is not None:
+            sync_pos = (x+18, y-17) if self.sync_pos is None else self.sync_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="synchronisation" x="{sync_pos[0]}" y="{sync_pos[1]}"',
+                                                'label', self.sync, child))
+        if self.update is not None:
+            update_pos = (x+18, y) if self.update_pos is None else self.update_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="assignment" x="{update_pos[0]}" y="{update_pos[1]}"',
+                                                'label', self.update, child))
+        if self.test_code is not None:
+            children.append(xmlio.tostring_leaf('<label kind="testcode"', 'label', self.test_code, child))
+        if self.comments is not None:
+            comments_pos = (x+18, y+25) if self.comments_pos is None else self.comments_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="comments" x="{comments_pos[0]}" y="{comments_pos[1]}"',
+                                                'label', self.comments, child))
+        if self.probability_weight is not None:
+            prob_weight_pos = (x+18, y+44) if self.prob_weight_pos is None else self.prob_weight_pos
+            children.append(xmlio.tostring_leaf(f'<label kind="probability" x="{prob_weight_pos[0]}" y="{prob_weight_pos[1]}"',
+                                                'label', str(self.probability_weight), child))
+        if self.nails is not None:
+            for nail in self.nails:
+                children.append(xmlio.tostring_leaf(f'<nail x="{nail[0]}" y="{nail[1]}"', 'nail', None, child))
+        return xmlio.tostring_node('<transition', 'transition', children, prefix)
+
     @property
     def xml(self) -> str:
         """__summary__
@@ -497,8 +753,7 @@ class Edge:
                 </transition>
                 
         """
-        element = self.Element
-        return ET.tostring(element, encoding="utf-8").decode("utf-8")
+        return self.tostring()
 
     @staticmethod
     def from_xml(edge_xml: str | ET.Element) -> Edge:
@@ -527,74 +782,67 @@ class Edge:
         """
         root = edge_xml
         if isinstance(edge_xml, str):
-            root = ET.fromstring(edge_xml)
-
-        # 获取 edge 的各种 label 对应的 text
-        select = None
-        select_pos = None
-        guard = None
-        guard_pos = None
-        sync = None
-        sync_pos = None
-        update = None
-        update_pos = None
-        probability_weight = None
-        prob_weight_pos = None
-        comments = None
-        comments_pos = None
-        test_code = None
-        for label_elem in root.iter("label"):
-            if label_elem.get('kind') == "select":
-                select = label_elem.text
-                select_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-            elif label_elem.get('kind') == "guard":
-                guard = label_elem.text
-                guard_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-            elif label_elem.get('kind') == "synchronisation":
-                sync = label_elem.text
-                sync_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-            elif label_elem.get('kind') == "assignment":
-                update = label_elem.text
-                update_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-            elif label_elem.get('kind') == "probability":
-                probability_weight = label_elem.text
-                prob_weight_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-            elif label_elem.get('kind') == "testcode":
-                test_code = label_elem.text
-            elif label_elem.get('kind') == "comments":
-                comments = label_elem.text
-                comments_pos = (int(label_elem.get("x")), int(label_elem.get("y")))
-            else:
-                pass
-        # 获取nails
+            root = xmlio.fromstring(edge_xml)
+
+        fields = dict(_EDGE_DEFAULTS)
+        fields['source_location_pos'] = (-1, -1)
+        fields['target_location_pos'] = (-1, -1)
+        # 获取 edge 的各种 label 对应的 text 以及 nails, 只遍历一次子元素
         nails = []
-        for nail_elem in root.iter("nail"):
-            x = int(nail_elem.get("x"))
-            y = int(nail_elem.get("y"))
-            nails.append((x, y))
-
-        return Edge(source_location_id=int(root.find("source").get("ref")[2:]),
-                    target_location_id=int(root.find("target").get("ref")[2:]),
-                    source_location_pos=(-1, -1),
-                    target_location_pos=(-1, -1),
-                    select=select, select_pos=select_pos,
-                    guard=guard, guard_pos=guard_pos,
-                    sync=sync, sync_pos=sync_pos,
-                    update=update, update_pos=update_pos,
-                    probability_weight=probability_weight, prob_weight_pos=prob_weight_pos,
-                    comments=comments, comments_pos=comments_pos,
-                    test_code=test_code,
-                    nails=nails)
+        for elem in root:
+            tag = elem.tag
+            if tag == "label":
+                label = _EDGE_LABELS.get(elem.get('kind'))
+                if label is not None:
+                    text_field, pos_field = label
+                    fields[text_field] = elem.text
+                    if pos_field is not None:
+                        fields[pos_field] = _pos(elem)
+            elif tag == "nail":
+                nails.append((int(elem.get("x")), int(elem.get("y"))))
+            elif tag == "source":
+                fields['source_location_id'] = int(elem.get("ref")[2:])
+            elif tag == "target":
+                fields['target_location_id'] = int(elem.get("ref")[2:])
+        fields['nails'] = nails
+
+        res = Edge._from_fields(fields)
+        res._check_probability()
+        return res
+
+    def copy(self) -> Edge:
+        """Make a copy of `self`, which is much faster than `copy.deepcopy`.
+
+        Returns:
+            Edge: the copied edge.
+        """
+        res = copy.copy(self)
+        res.nails = list(self.nails)
+        return res
+
+
+_EDGE_DEFAULTS = _init_defaults(Edge)
+# label kind: (text attribute, position attribute)
+_EDGE_LABELS = {
+    "select": ("select", "select_pos"),
+    "guard": ("guard", "guard_pos"),
+    "synchronisation": ("sync", "sync_pos"),
+    "assignment": ("update", "update_pos"),
+    "probability": ("probability_weight", "prob_weight_pos"),
+    "testcode": ("test_code", None),
+    "comments": ("comments", "comments_pos"),
+}
 
 
 @dataclass
-class Template:
+class Template(_Tracked):
     """ Represents a template in a UPPAAL model, defining a set of locations (states), edges (transitions), and other properties.
 
     A template in UPPAAL is a reusable structure that can be instantiated multiple times within a model. It contains locations, edges, declarations, and other components necessary for modeling a component or a system.
 
     """
     # 别忘记新发现的 branch point
+    _child_lists = ('locations', 'edges')
 
     def __init__(self, name: str,
                  locations: List[Location],
@@ -638,6 +886,12 @@ class Template:
         # declaration: str = "", locations: List[Location] = [Location()],
         # transitions: List[Transition] = []
 
+        self._owner = None
+        # serialized xml of self, {indent: xml}, cleared when self, its locations or its edges are modified
+        self.__xml_cache: Dict[int, str] = {}
+        # index of locations and edges, built when needed and cleared when modified like `__xml_cache`
+        self.__index: _TemplateIndex | None = None
+
         # template 必须要有 name
         self.name: str = name
         # template 初始必有 location
@@ -706,8 +960,7 @@ class Template:
         Returns:
             str: A string representing the `Template` instance in UPPAAL `.xml` format.
         """
-        element = self.Element
-        return ET.tostring(element, encoding="utf-8").decode("utf-8")
+        return self.tostring()
 
     @staticmethod
     def from_xml(template_xml: str | ET.Element) -> Template:
@@ -729,50 +982,195 @@ class Template:
         """
         root = template_xml
         if isinstance(template_xml, str):
-            root = ET.fromstring(template_xml)
-
-        # find template's name
-        temp_name_elem = root.find("name")
-        name: str = None
-        if temp_name_elem is not None:
-            name = temp_name_elem.text
-
-        # params
-        params_elem = root.find("parameter")
-        params: str = None
-        if params_elem is not None:
-            params = params_elem.text
-
-        # declaration
-        declaration_elem = root.find("declaration")
-        declaration: str = None
-        if declaration_elem is not None:
-            declaration = declaration_elem.text
+            root = xmlio.fromstring(template_xml)
 
+        # name, parameter, declaration
+        texts = {"name": None, "parameter": None, "declaration": None}
         locations = []
+        # branchpoint 是特殊的location, 放在所有location之后
+        branch_points = []
+        init_ref: int = None
+        # edge 也叫 transition
         edges = []
-        # branch_points = []
+        # 只遍历一次子元素
+        for elem in root:
+            tag = elem.tag
+            if tag == "location":
+                locations.append(Location.from_xml(elem))
+            elif tag == "transition":
+                edges.append(Edge.from_xml(elem))
+            elif tag == "branchpoint":
+                branch_points.append(Location.from_xml(elem))
+            elif tag == "init":
+                init_ref = int(elem.get("ref")[2:])
+            elif tag in texts and texts[tag] is None:
+                texts[tag] = elem
+
+        name, params, declaration = (elem.text if elem is not None else None for elem in texts.values())
+        return Template(name, locations + branch_points, init_ref, edges, params, declaration)
+
+    def copy(self) -> Template:
+        """Make a copy of `self`, including its locations and edges, which is much faster than `copy.deepcopy`.
+
+        Returns:
+            Template: the copied template.
+        """
+        res = copy.copy(self)
+        res.locations = [location.copy() for location in self.locations]
+        res.edges = [edge.copy() for edge in self.edges] if self.edges is not None else None
+        # the copy has the same xml
+        res.__xml_cache = dict(self.__xml_cache)
+        return res
 
-        for l_elem in root.iter("location"):
-            locations.append(Location.from_xml(l_elem))
+    def tostring(self, indent: int = 0) -> str:
+        """Serialized xml of `self` as a child of `<nta>`, which is cached until `self`, its locations or its edges are modified.
 
-        for bp_elem in root.iter("branchpoint"):
-            # branchpoint 是特殊的location
-            locations.append(Location.from_xml(bp_elem))
+        Args:
+            indent (int, optional): number of spaces per indentation level, `0` for no indentation. Defaults to 0.
 
-        init_ref_elem = root.find("init")
-        init_ref: int = None
-        if init_ref_elem is not None:
-            init_ref = int(init_ref_elem.get("ref")[2:])
+        Returns:
+            str: the serialized xml.
+        """
+        res = self.__xml_cache.get(indent)
+        if res is None:
+            # 直接写出文本, 与 xmlio.tostring_element(self.Element, indent, level=1) 相同
+            prefix = indent * ' ' if indent else None
+            child = 2 * indent * ' ' if indent else None
+            children = [xmlio.tostring_leaf('<name', 'name', self.name, child)]
+            if self.params is not None:
+                children.append(xmlio.tostring_leaf('<parameter', 'parameter', self.params, child))
+            if self.declaration is not None:
+                children.append(xmlio.tostring_leaf('<declaration', 'declaration', self.declaration, child))
+            children.extend(location.tostring(indent, level=2) for location in self.locations)
+            children.append(xmlio.tostring_leaf(f'<init ref="id{self.init_ref}"', 'init', None, child))
+            if self.edges is not None:
+                children.extend(edge.tostring(indent, level=2) for edge in self.edges)
+            res = xmlio.tostring_node('<template', 'template', children, prefix)
+            self.__xml_cache[indent] = res
+        return res
+
+    @property
+    def _index(self) -> _TemplateIndex:
+        if self.__index is None:
+            self.__index = _TemplateIndex(self)
+        return self.__index
+
+    def get_location(self, location_id: int) -> Location | None:
+        """Get the location by its id.
+
+        Args:
+            location_id (int): id of the location.
+
+        Returns:
+            Location | None: the location, `None` if not found.
+        """
+        return self._index.locations.get(location_id)
+
+    def in_edges(self, location_id: int) -> List[Edge]:
+        """Edges whose target is the location `location_id`.
+
+        Args:
+            location_id (int): id of the location.
+
+        Returns:
+            List[Edge]: the edges, in the order of `self.edges`.
+        """
+        return list(self._index.in_edges.get(location_id, ()))
 
-        # edge_element, edge 也叫 transition
-        for e_elem in root.iter("transition"):
-            edges.append(Edge.from_xml(e_elem))
+    def out_edges(self, location_id: int) -> List[Edge]:
+        """Edges whose source is the location `location_id`.
 
-        temp_res = Template(name, locations, init_ref, edges,
-                            params, declaration)
+        Args:
+            location_id (int): id of the location.
+
+        Returns:
+            List[Edge]: the edges, in the order of `self.edges`.
+        """
+        return list(self._index.out_edges.get(location_id, ()))
+
+    @property
+    def max_location_id(self) -> int:
+        """The maximum id of the locations in `self`, `-1` if there is no location.
+        """
+        return self._index.max_location_id
+
+    def _on_change(self) -> None:
+        self.__xml_cache = {}
+        self.__index = None
+        super()._on_change()
+
+
+class _LazyTemplate:
+    """A `<template>` of a model loaded with `UModel(lazy=True)`, which is kept as its xml in the model file,
+    and is parsed to `Template` only when accessed.
+    """
+    _NAME_PATTERN = re.compile(r'<name\b[^>]*>.*?</name\s*>', re.S)
+    _ID_PATTERN = re.compile(r'<(?:location|branchpoint)\b[^>]*?\bid="id(\d+)"')
+
+    def __init__(self, xml: str):
+        """
+        Args:
+            xml (str): the `<template>` element in the model file.
+        """
+        self.__xml: str = xml
+        self.__name: str | None = None
+        self.__max_location_id: int | None = None
+
+    @property
+    def name(self) -> str:
+        if self.__name is None:
+            match = self._NAME_PATTERN.search(self.__xml)
+            self.__name = xmlio.fromstring(match.group(0)).text if match is not None else None
+        return self.__name
 
-        return temp_res
+    @property
+    def max_location_id(self) -> int:
+        """Same as `Template.max_location_id`, without parsing the locations.
+        """
+        if self.__max_location_id is None:
+            self.__max_location_id = max((int(i) for i in self._ID_PATTERN.findall(self.__xml)), default=-1)
+        return self.__max_location_id
+
+    @property
+    def Element(self) -> ET.Element:
+        return ET.fromstring(self.__xml)
+
+    def tostring(self, indent: int = 0) -> str:
+        """The xml in the model file, as `Template.tostring` but keeping the layout inside the template.
+        """
+        if indent == 0:
+            return self.__xml
+        return f'{indent * " "}{self.__xml}\n'
+
+    def materialize(self) -> Template:
+        """Parse the xml as `Template`.
+        """
+        return Template.from_xml(self.__xml)
+
+    def copy(self) -> _LazyTemplate:
+        # `self` is never modified, so it can be shared
+        return self
+
+
+class _TemplateIndex:
+    """Locations by id and edges by source/target location id of a `Template`.
+    """
+
+    def __init__(self, template: Template):
+        self.locations: Dict[int, Location] = {location.location_id: location for location in template.locations}
+        self.max_location_id: int = max(self.locations, default=-1)
+        self.in_edges: Dict[int, List[Edge]] = {}
+        self.out_edges: Dict[int, List[Edge]] = {}
+        in_edges, out_edges = self.in_edges, self.out_edges
+        for edge in template.edges or ():
+            if edge.source_location_id in out_edges:
+                out_edges[edge.source_location_id].append(edge)
+            else:
+                out_edges[edge.source_location_id] = [edge]
+            if edge.target_location_id in in_edges:
+                in_edges[edge.target_location_id].append(edge)
+            else:
+                in_edges[edge.target_location_id] = [edge]
 
     # @staticmethod
     # def input_template(name: str, signals: List[Tuple[str, str, str]], init_id: int) -> Template:
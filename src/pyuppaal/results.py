@@ -0,0 +1,185 @@
+"""results
+Structured results of `verifyta`, parsed from its terminal output.
+"""
+from __future__ import annotations
+import re
+from typing import List, Tuple
+
+SATISFIED = 'satisfied'
+NOT_SATISFIED = 'not satisfied'
+MAYBE_SATISFIED = 'maybe satisfied'
+UNKNOWN = 'unknown'
+
+_FORMULA_PATTERN = re.compile(r'Verifying formula (\d+)(?: at (.*))?')
+_TRACE_PATTERN = re.compile(r'Writing (?:example trace|witness trace|counter example) to (.*)')
+# the trace file of the i-th query is `prefix-i`, `prefix-i.xtr` or `prefix-i.xml`
+_TRACE_INDEX_PATTERN = re.compile(r'-(\d+)(?:\.xtr|\.xml)?$')
+# verifyta clears the progress line with ANSI escapes, e.g., `\x1b[2K -- Formula is satisfied.`
+_ANSI_PATTERN = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+_NUMBER_PATTERN = re.compile(r':\s*(\d+(?:\.\d+)?)\s*(\S*)')
+# 统计信息的前缀与QueryResult的属性名
+_STATISTICS = (('States stored', 'states_stored'),
+               ('States explored', 'states_explored'),
+               ('CPU user time used', 'cpu_time'),
+               ('Virtual memory used', 'virtual_memory'),
+               ('Resident memory used', 'resident_memory'))
+
+
+class QueryResult:
+    """The result of one query, statistics are available if `-u` is in the verify options.
+    """
+
+    def __init__(self, index: int, location: str = None):
+        """
+        Args:
+            index (int): 1-based index of the query in the model.
+            location (str, optional): where the query is in the model, e.g., `/nta/queries/query[1]/formula`. Defaults to None.
+        """
+        self.index: int = index
+        self.location: str | None = location
+        self.verdict: str = UNKNOWN
+        self.message: str = ''
+        self.trace_path: str | None = None
+        self.states_stored: int | None = None
+        self.states_explored: int | None = None
+        # ms
+        self.cpu_time: float | None = None
+        # KiB
+        self.virtual_memory: int | None = None
+        self.resident_memory: int | None = None
+
+    def __repr__(self) -> str:
+        return f'QueryResult(index={self.index}, verdict={self.verdict!r}, trace_path={self.trace_path!r})'
+
+    @property
+    def is_satisfied(self) -> bool:
+        """Whether the query is satisfied.
+        """
+        return self.verdict == SATISFIED
+
+
+class VerificationResult:
+    """The parsed result of one `verifyta` run.
+
+    It behaves like the raw terminal output for `in`, `find` and `str()`, so it can replace the string returned by `Verifyta().verify`.
+
+    Examples:
+        >>> res = Verifyta().verify('demo.xml', verify_options='-t 1 -u', parse_result=True)
+        >>> res.is_satisfied, res.queries[0].verdict, res.queries[0].states_explored
+        (True, 'satisfied', 12)
+    """
+
+    def __init__(self, raw: str):
+        """
+        Args:
+            raw (str): the terminal output of `verifyta`.
+        """
+        self.raw: str = raw
+        self.queries: List[QueryResult] = self.__parse(raw)
+
+    @staticmethod
+    def __parse(raw: str) -> List[QueryResult]:
+        """Parse the queries in a single pass over the lines of `raw`.
+
+        The trace files are assigned to the queries by their numbers, e.g., `demo-2.xtr` to the 2nd query,
+        since UPPAAL 4.x writes `Writing example trace to ...` to stderr, which is printed before all queries.
+        """
+        queries: List[QueryResult] = []
+        trace_paths: List[Tuple[QueryResult | None, str]] = []
+        current: QueryResult | None = None
+        for line in raw.splitlines():
+            line = _ANSI_PATTERN.sub('', line).strip().lstrip('-').strip()
+            if not line:
+                continue
+            if line.startswith('Verifying formula'):
+                match = _FORMULA_PATTERN.match(line)
+                if match:
+                    current = QueryResult(int(match.group(1)), match.group(2))
+                    queries.append(current)
+                continue
+            if line.startswith('Writing'):
+                match = _TRACE_PATTERN.match(line)
+                if match:
+                    trace_paths.append((current, match.group(1).strip()))
+                continue
+            if current is None:
+                continue
+            if line.startswith('Formula:'):
+                # the formula itself, printed by UPPAAL 5.x
+                continue
+            if line.startswith('Formula'):
+                current.message = line
+                if 'NOT satisfied' in line:
+                    current.verdict = NOT_SATISFIED
+                elif 'may be satisfied' in line or 'maybe satisfied' in line:
+                    current.verdict = MAYBE_SATISFIED
+                elif 'is satisfied' in line:
+                    current.verdict = SATISFIED
+            elif line.startswith('Pr('):
+                # statistical model checking
+                current.message = line
+            else:
+                for prefix, attr in _STATISTICS:
+                    if line.startswith(prefix):
+                        match = _NUMBER_PATTERN.search(line)
+                        if match:
+                            value = float(match.group(1))
+                            if match.group(2) in ('MB', 'MiB'):
+                                value *= 1024
+                            setattr(current, attr, value if attr == 'cpu_time' else int(value))
+                        break
+
+        query_by_index = {query.index: query for query in queries}
+        for query, trace_path in trace_paths:
+            match = _TRACE_INDEX_PATTERN.search(trace_path)
+            if match is not None and int(match.group(1)) in query_by_index:
+                query = query_by_index[int(match.group(1))]
+            if query is not None:
+                query.trace_path = trace_path
+        return queries
+
+    def __str__(self) -> str:
+        return self.raw
+
+    def __repr__(self) -> str:
+        return f'VerificationResult(queries={self.queries})'
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.raw
+
+    def find(self, sub: str, *args) -> int:
+        """Same as `str.find` on the raw output.
+        """
+        return self.raw.find(sub, *args)
+
+    @property
+    def verdicts(self) -> List[str]:
+        """Verdicts of all queries, in the order of the queries.
+        """
+        return [query.verdict for query in self.queries]
+
+    @property
+    def is_satisfied(self) -> bool:
+        """Whether all queries are satisfied, `False` if no query is verified.
+        """
+        return len(self.queries) > 0 and all(query.is_satisfied for query in self.queries)
+
+    @property
+    def trace_paths(self) -> List[str | None]:
+        """Trace file paths of all queries, `None` if the query has no trace.
+        """
+        return [query.trace_path for query in self.queries]
+
+    @property
+    def states_explored(self) -> int | None:
+        """Total states explored of all queries, `None` if not reported (verify with `-u`).
+        """
+        values = [query.states_explored for query in self.queries if query.states_explored is not None]
+        return sum(values) if values else None
+
+    @property
+    def cpu_time(self) -> float | None:
+        """Total CPU time in ms of all queries, `None` if not reported (verify with `-u`).
+        """
+        values = [query.cpu_time for query in self.queries if query.cpu_time is not None]
+        return sum(values) if values else None
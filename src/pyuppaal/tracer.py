@@ -4,11 +4,12 @@
 # 这一行的import能够指定class的method返回自身类
 # 参考链接：https://www.nuomiphp.com/eplan/11188.html
 from __future__ import annotations
-from typing import Dict, Generator, List
+from typing import Dict, List
 import xml.etree.ElementTree as ET
 
 from .verifyta import Verifyta
 from .utap import utap_parser
+from . import xmlio
 
 
 class SimTrace:
@@ -282,17 +283,15 @@ class SimTrace:
             ValueError: When the `.xml` file is invalid.
         """
         self.__parse_raw()
-        element_tree_root: ET.Element | None = ET.ElementTree(
-            file=model_path).getroot()
-        if element_tree_root is None:
-            # When the `.xml` file is invalid.
-            raise ValueError("Invalid UPPAAL template file")
-
-        # Get template parameters from .xml file
-        templates: Generator[ET.Element, None,
-                             None] = element_tree_root.iterfind("template")
+        # Get template parameters and system from .xml file, parsing the templates one by one
         param_map: Dict[str, List[str]] = dict()
-        for template in templates:
+        system_element: ET.Element | None = None
+        for template in xmlio.iter_children(model_path):
+            if template.tag == "system":
+                system_element = template
+                continue
+            if template.tag != "template":
+                continue
             name_element: ET.Element | None = template.find("name")
             if name_element is None:
                 # When the `.xml` file is invalid.
@@ -310,7 +309,6 @@ class SimTrace:
                 param_map[name] = []
 
         # Get system components defination
-        system_element: ET.Element | None = element_tree_root.find("system")
         if system_element is None:
             # When the `.xml` file is invalid.
             raise ValueError("Invalid UPPAAL template file")
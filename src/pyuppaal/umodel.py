@@ -2,41 +2,67 @@
 """
 # support return typing UModel
 from __future__ import annotations
+import hashlib
+import io
 import os
+import re
+import asyncio
 import xml.etree.ElementTree as ET
-from typing import List
-from itertools import product
+from typing import Dict, Iterator, List, TextIO, Tuple
+from itertools import islice, product
+from concurrent.futures import ThreadPoolExecutor, CancelledError, Future, FIRST_COMPLETED, wait
+from contextlib import contextmanager
 import uuid
 # from copy import deepcopy
-from tempfile import NamedTemporaryFile
-import xml.dom.minidom
 # from anytree import PostOrderIter, NodeMixin
 
 # from pyuppaal.iTools.new_factory import Template, Location, Edge
-from .verifyta import Verifyta
+from .verifyta import Verifyta, VerifytaProcessGroup
+from .results import VerificationResult, QueryResult, NOT_SATISFIED
 from .build_cg import build_cg, Mermaid
 from .tracer import SimTrace
-from .nta import Template
+from .nta import Template, _ChildList, _LazyTemplate
 from .monitors import Monitors
 from .utap import utap_parser
-from .mytree import MyTree
+from .mytree import SearchStats, SuffixMemo, SuffixSearch
+from .cache import canonicalize
+from . import xmlio
 
 
 class UModel:
     """Load UPPAAL model for analysis, editing, verification and other operations. If you want to modify the model, you should `from pyuppaal.nta import Template, Location, Edge`.
     """
 
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, autosave: bool = True, read_only: bool = False, lazy: bool = False):
         """_summary_
 
         Args:
             model_path (str): model path. Defaults to None.
+            autosave (bool, optional): whether to save the model to `model_path` when it is loaded and after each edit.
+                If `False`, the model is only parsed, and edits stay in memory until `save()` or a verification. Defaults to True.
+            read_only (bool, optional): never write to `model_path`, which implies `autosave=False`.
+                `save()` and verifications after edits raise ValueError, while `save_as` and `copy_as` to other paths are allowed. Defaults to False.
+            lazy (bool, optional): keep each template as its xml element, and parse it to `Template` when it is accessed by `templates` or `get_template`.
+                Unaccessed templates are written back as they are in the file, so loading, editing `queries` or `system` and verifying a large model
+                does not parse its templates. Defaults to False.
         """
         self.__declaration: str = "// Place global declarations here."
-        self.__templates: List[Template] = []
+        self.__templates: List[Template] = _ChildList(self)
+        # index of templates by name and the max location id, built when needed and cleared when templates are modified
+        self.__template_by_name: Dict[str, Template] | None = None
+        self.__max_location_id: int | None = None
+        # the next location id returned by `allocate_location_ids`
+        self.__next_location_id: int = 0
+        self.__lazy: bool = lazy
+        # whether `self.__templates` has `_LazyTemplate` instances, which are parsed when `templates` is accessed
+        self.__has_lazy_templates: bool = False
         self.__system: str = "system cannot be None"
         self.__queries: List[str] | None = None
         self.__model_path: str = model_path
+        self.__read_only: bool = read_only
+        self.__autosave: bool = autosave and not read_only
+        # whether the model in memory differs from the file at `model_path`
+        self.__is_dirty: bool = False
 
         if model_path is None:
             print(
@@ -64,22 +90,34 @@ class UModel:
             err_info = f"declaration requires string, current is: {type(value)}."
             raise ValueError(err_info)
         self.__declaration = value
-        self.save()
+        self.__on_edit()
 
     # endregion
 
     # region ======== templates =======
     @property
     def templates(self) -> List[Template]:
+        if self.__has_lazy_templates:
+            # parse the templates of a lazy model
+            self.__templates = _ChildList(self, [self.__own_template(template) for template in self.__templates])
+            self.__has_lazy_templates = False
+            self.__clear_index()
         return self.__templates
 
+    def __own_template(self, template: Template | _LazyTemplate) -> Template:
+        if isinstance(template, _LazyTemplate):
+            return template.materialize()
+        return template
+
     @templates.setter
     def templates(self, value: List[Template]) -> None:
         # if not isinstance(value, List[Template]):
         #     err_info = f"declaration requires List[Template], current is: {type(value)}."
         #     raise ValueError(err_info)
-        self.__templates = value
-        self.save()
+        self.__templates = _ChildList(self, value)
+        self.__has_lazy_templates = False
+        self.__clear_index()
+        self.__on_edit()
 
     # endregion
 
@@ -94,7 +132,7 @@ class UModel:
             err_info = f"system requires string, current is: {type(value)}."
             raise ValueError(err_info)
         self.__system = value
-        self.save()
+        self.__on_edit()
 
     # endregion
 
@@ -117,7 +155,7 @@ class UModel:
         if isinstance(value, str):
             value = [value]
         self.__queries = value
-        self.save()
+        self.__on_edit()
 
     # endregion
 
@@ -145,7 +183,7 @@ class UModel:
         root.append(declaration_elem)
 
         # 2. 添加templates
-        for template in self.templates:
+        for template in self.__templates:
             root.append(template.Element)
 
         # 3. 添加system
@@ -178,13 +216,104 @@ class UModel:
         Returns:
             int: max location id of `self`.
         """
-        res = -1
-        for template in self.templates:
-            for location in template.locations:
-                if location.location_id > res:
-                    res = location.location_id
+        if self.__max_location_id is None:
+            self.__max_location_id = max((template.max_location_id for template in self.__templates), default=-1)
+        return self.__max_location_id
+
+    def allocate_location_ids(self, count: int = 1) -> int:
+        """Reserve `count` new location ids, which are larger than the ids in `self` and the ids reserved before,
+        so that templates created before being added to `self` do not share location ids.
+
+        Examples:
+            >>> init_ref = umodel.allocate_location_ids(3)
+            >>> locations = [Location(init_ref + i, (i * 100, 0)) for i in range(3)]
+
+        Args:
+            count (int, optional): number of location ids. Defaults to 1.
+
+        Returns:
+            int: the first reserved id, the reserved ids are `[res, res + count)`.
+        """
+        res = max(self.__next_location_id, self.max_location_id + 1)
+        self.__next_location_id = res + count
+        return res
+
+    def get_template(self, template_name: str) -> Template | None:
+        """Get the template by its name.
+
+        Args:
+            template_name (str): name of the template.
+
+        Returns:
+            Template | None: the template, `None` if not found.
+        """
+        res = self.__get_template(template_name)
+        if isinstance(res, _LazyTemplate):
+            res = self.__materialize(res)
         return res
 
+    def __materialize(self, lazy_template: _LazyTemplate) -> Template:
+        """Replace `lazy_template` in `self.__templates` by the parsed `Template`, keeping the index.
+        """
+        res = lazy_template.materialize()
+        template_by_name = self.__template_by_name
+        max_location_id = self.__max_location_id
+        is_dirty = self.__is_dirty
+        self.__templates[next(i for i, t in enumerate(self.__templates) if t is lazy_template)] = res
+        template_by_name[res.name] = res
+        self.__template_by_name = template_by_name
+        self.__max_location_id = max_location_id
+        # parsing is not an edit
+        self.__is_dirty = is_dirty
+        return res
+
+    def __get_template(self, template_name: str) -> Template | None:
+        if self.__template_by_name is None:
+            self.__template_by_name = {template.name: template for template in self.__templates}
+        res = self.__template_by_name.get(template_name)
+        if res is not None and res.name != template_name:
+            # renamed while owned by another model, which does not notify self
+            self.__clear_index()
+            return self.__get_template(template_name)
+        return res
+
+    def _on_change(self) -> None:
+        """Called when `self.templates` or a template in it is modified, e.g., `umodel.templates[0].locations[0].invariant = 't <= 1'`.
+        Clear the index of templates, and mark the model as edited, which is saved by `flush` but not by `autosave`.
+        """
+        self.__clear_index()
+        self.__is_dirty = True
+
+    def __clear_index(self) -> None:
+        self.__template_by_name = None
+        self.__max_location_id = None
+
+    @property
+    def autosave(self) -> bool:
+        """Whether the model is saved to `model_path` after each edit.
+        """
+        return self.__autosave
+
+    @autosave.setter
+    def autosave(self, value: bool) -> None:
+        if value and self.__read_only:
+            raise ValueError(f"Model {self.model_path} is read only, autosave can not be enabled.")
+        self.__autosave = value
+        if value:
+            self.flush()
+
+    @property
+    def read_only(self) -> bool:
+        """Whether the file at `model_path` is never written.
+        """
+        return self.__read_only
+
+    @property
+    def is_dirty(self) -> bool:
+        """Whether there are edits that are not saved to `model_path`.
+        """
+        return self.__is_dirty
+
     # endregion
     # endregion 基础 getter & setters
 
@@ -213,6 +342,28 @@ class UModel:
         start_index = 0
         return list(set(broadcast_chan))
 
+    @property
+    def model_hash(self) -> str:
+        """sha256 of `declaration`, `templates` and `system`, which identifies the behavior of the model
+        regardless of `queries` and `model_path`, e.g., as the key of `SuffixMemo`.
+        The templates are hashed in the canonical form of their parsed xml, so the hash does not depend on
+        the layout of the model file, or whether the templates of a lazily loaded model are accessed.
+
+        Returns:
+            str: the hex digest.
+        """
+        res = hashlib.sha256()
+        templates = []
+        for template in self.__templates:
+            # 惰性加载的模板只在此解析, 不替换 self.__templates
+            if isinstance(template, _LazyTemplate):
+                template = template.materialize()
+            templates.append(canonicalize(template.tostring()))
+        for text in [self.declaration, *templates, self.system]:
+            res.update((text or '').encode('utf-8'))
+            res.update(b'\0')
+        return res.hexdigest()
+
     # endregion
 
     # region 解构(build)
@@ -243,30 +394,80 @@ class UModel:
         3. system,
         4. queries等.
         """
-        element_tree = ET.ElementTree(file=self.model_path)
-
-        # 1. declaration
-        self.__declaration = element_tree.find("declaration").text
-
-        # 2. templates
-        template_elems = element_tree.findall("./template")
-        self.__templates = [Template.from_xml(t) for t in template_elems]
-
-        # 3. system
-        self.__system = element_tree.find("system").text
-
-        # 4. queries
-        query_formula_elems = element_tree.findall("./queries/query/formula")
-        self.__queries = [query_elem.text for query_elem in query_formula_elems]
-
-        self.save()
+        # the children of <nta> are parsed one by one, so the xml tree of the whole model is never in memory
+        if self.__lazy:
+            # the templates are kept as xml, and only the rest of the model is parsed
+            with open(self.model_path, 'rb') as f:
+                data, template_xmls = xmlio.split_elements(f.read(), 'template')
+            elements = xmlio.iter_children(io.BytesIO(data))
+            templates = [_LazyTemplate(t.decode('utf-8')) for t in template_xmls]
+        else:
+            elements = xmlio.iter_children(self.model_path)
+            templates = []
+
+        declaration_elem = None
+        system_elem = None
+        queries = []
+        for elem in elements:
+            if elem.tag == "declaration":
+                # 1. declaration
+                declaration_elem = elem
+            elif elem.tag == "template":
+                # 2. templates
+                templates.append(Template.from_xml(elem))
+            elif elem.tag == "system":
+                # 3. system
+                system_elem = elem
+            elif elem.tag == "queries":
+                # 4. queries
+                queries.extend(query_elem.text for query_elem in elem.iterfind("./query/formula"))
+
+        if declaration_elem is None or system_elem is None:
+            raise ValueError(f"Invalid UPPAAL model {self.model_path}: <declaration> and <system> are required.")
+        self.__declaration = declaration_elem.text
+        self.__templates = _ChildList(self, templates)
+        self.__has_lazy_templates = self.__lazy and len(templates) > 0
+        self.__clear_index()
+        self.__system = system_elem.text
+        self.__queries = queries
+
+        if self.__autosave:
+            self.save()
 
     # endregion 解构(build)
 
     # region 导出xml
     @property
     def xml(self) -> str:
-        return ET.tostring(self.Element, encoding="utf-8").decode("utf-8")
+        f = io.StringIO()
+        self.__write_xml(f, indent=0, xml_declaration=False)
+        return f.getvalue()
+
+    def __write_xml(self, f: TextIO, indent: int, xml_declaration: bool = True) -> None:
+        """Write the same xml as `self.Element`, reusing the cached xml of unmodified templates (see `Template.tostring`).
+
+        Args:
+            f (TextIO): target text file.
+            indent (int): indentation of the xml, `0` for no indentation.
+            xml_declaration (bool, optional): whether to write the xml declaration. Defaults to True.
+        """
+        # 直接写出文本, 不构建 ET.Element
+        prefix = [level * indent * ' ' if indent else None for level in range(4)]
+
+        def children() -> Iterator[str]:
+            yield xmlio.tostring_leaf("<declaration", "declaration", self.declaration, prefix[1])
+            for template in self.__templates:
+                yield template.tostring(indent)
+            yield xmlio.tostring_leaf("<system", "system", self.system, prefix[1])
+            if self.queries is not None:
+                queries = [xmlio.tostring_node("<query", "query",
+                                               [xmlio.tostring_leaf("<formula", "formula", query, prefix[3]),
+                                                xmlio.tostring_leaf("<comment", "comment", None, prefix[3])], prefix[2])
+                           for query in self.queries]
+                yield xmlio.tostring_node("<queries", "queries", queries, prefix[1])
+
+        # the root element in `self.Element` has text "\n"
+        xmlio.write_document(f, "nta", children(), indent, text="\n", xml_declaration=xml_declaration)
 
     # endregion 导出xml
 
@@ -333,14 +534,13 @@ system Process;
         """
 
         if indent != 0:
-            with NamedTemporaryFile(suffix="-unformatted.xml", mode="w", delete=False) as tmp_file:
-                self.ElementTree.write(tmp_file.name, encoding="utf-8", xml_declaration=True)
-            dom = xml.dom.minidom.parse(tmp_file.name)
-            xml_str = dom.toprettyxml(indent=indent*" ")
+            # same output as `xml.dom.minidom` toprettyxml, written in one pass
             with open(path, 'w', encoding='utf-8') as f:
-                f.write(xml_str)
+                self.__write_xml(f, indent)
         else:
-            self.ElementTree.write(path, encoding="utf-8", xml_declaration=True)
+            # same output as `ET.ElementTree.write`
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                self.__write_xml(f, indent)
 
     def save_as(self, new_path: str, indent=4) -> UModel:
         """Save the model to a new path with `self.model_path` changed to `new_model_path`.
@@ -351,8 +551,11 @@ system Process;
         Returns:
             UModel: self.
         """
+        if self.__read_only and os.path.abspath(new_path) == os.path.abspath(self.model_path):
+            raise ValueError(f"Model {self.model_path} is read only, use save_as or copy_as with another path.")
         self.write_xml_tree(new_path, indent)
         self.__model_path = new_path
+        self.__is_dirty = False
 
         return self
 
@@ -364,23 +567,96 @@ system Process;
         """
         return self.save_as(self.model_path)
 
-    def copy_as(self, new_path: str) -> UModel:
+    def flush(self) -> UModel:
+        """Save the current model only if there are unsaved edits.
+
+        Returns:
+            UModel: self.
+        """
+        if self.__is_dirty:
+            self.save()
+        return self
+
+    @contextmanager
+    def batch_edit(self) -> Iterator[UModel]:
+        """Apply any number of edits in memory, and save the model once when leaving the context.
+        If an exception is raised in the context, the edits are kept in memory but not saved.
+
+        Examples:
+            >>> with umodel.batch_edit():
+            >>>     umodel.add_template(template)
+            >>>     umodel.add_template_to_system(template.name)
+            >>>     umodel.queries = 'E<> Monitor.pass'
+
+        Yields:
+            UModel: self.
+        """
+        autosave = self.__autosave
+        self.__autosave = False
+        try:
+            yield self
+        finally:
+            self.__autosave = autosave
+        if autosave:
+            self.flush()
+
+    def __on_edit(self) -> None:
+        """Mark the model as edited, and save it if `autosave`.
+        """
+        self.__is_dirty = True
+        if self.__autosave:
+            self.save()
+
+    def copy_as(self, new_path: str, autosave: bool = True) -> UModel:
         """Make a copy of the current model and return the copied instance.
 
         Args:
             new_path (str): target copy file path.
+            autosave (bool, optional): `autosave` of the copied instance. Defaults to True.
 
         Returns:
             UModel: new copied instance.
         """
 
-        self.ElementTree.write(new_path, encoding="utf-8", xml_declaration=True)
-        return UModel(new_path)
+        self.write_xml_tree(new_path, indent=0)
+        return UModel(new_path, autosave=autosave, lazy=self.__lazy)
+
+    def clone(self, new_path: str = None) -> UModel:
+        """Make a copy of the current model in memory, the file of the copy is only written when it is verified or saved.
+
+        The copy owns copies of the templates, which keep their serialized xml, so cloning is cheap and
+        the `Template` instances of `self` and of the copy can be modified independently.
+
+        Args:
+            new_path (str, optional): model path of the copy. Defaults to None, using `tmp_clone_<uuid>.xml` in the directory of `self.model_path`.
+
+        Returns:
+            UModel: the copy, with `autosave=False`.
+        """
+        if new_path is None:
+            new_path = os.path.join(os.path.dirname(self.model_path), f"tmp_clone_{uuid.uuid4()}.xml")
+        res = object.__new__(UModel)
+        res.__declaration = self.__declaration
+        # `_LazyTemplate.copy` returns itself, it is never modified
+        res.__templates = _ChildList(res, [template.copy() for template in self.__templates])
+        res.__template_by_name = None
+        res.__max_location_id = self.__max_location_id
+        res.__next_location_id = self.__next_location_id
+        res.__lazy = self.__lazy
+        res.__has_lazy_templates = self.__has_lazy_templates
+        res.__system = self.__system
+        res.__queries = list(self.__queries) if self.__queries is not None else None
+        res.__model_path = new_path
+        res.__read_only = False
+        res.__autosave = False
+        res.__is_dirty = True
+        return res
 
     # endregion 基础的文件保存功能
 
     # region 验证相关
-    def verify(self, trace_path: str = None, verify_options: str = None, keep_tmp_file: bool = True, timeout: float = None) -> str:
+    def verify(self, trace_path: str = None, verify_options: str = None, keep_tmp_file: bool = True, timeout: float = None,
+               parse_result: bool = False) -> str | VerificationResult:
         """Verify and return the verify result. If `trace_path` is not given, it wll return the terminal result.
 
         Args:
@@ -388,11 +664,13 @@ system Process;
             verify_options (str, optional): options for verifyta, such as ` -t 0 -o 0`. Defaults to None.
             keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
             timeout (float, optional): timeout in seconds for the verification command execution.
+            parse_result (bool, optional): return a `VerificationResult` with per-query verdicts and statistics. Defaults to False.
 
         Returns:
-            str: terminal verify results for `self`.
+            str | VerificationResult: terminal verify results for `self`, or the parsed result if `parse_result`.
         """
-        return Verifyta().verify(self.model_path, trace_path, verify_options, keep_tmp_file, timeout=timeout)
+        self.flush()
+        return Verifyta().verify(self.model_path, trace_path, verify_options, keep_tmp_file, timeout=timeout, parse_result=parse_result)
 
     def easy_verify(
         self, verify_options: str = "-t 1", keep_tmp_file=True, timeout: float = None
@@ -407,8 +685,92 @@ system Process;
         Returns:
             SimTrace | None: if exists a counter example, return a SimTrace, else return None.
         """
+        self.__check_easy_verify(verify_options)
+        self.flush()
+        xtr_trace_path, res_trace_path, markers = self.__easy_verify_trace_paths()
+        verify_cmd_res = Verifyta().verify(
+            self.model_path, xtr_trace_path, verify_options=verify_options, timeout=timeout
+        )
+
+        if any(marker in verify_cmd_res for marker in markers):
+            res = self.load_xtr_trace(res_trace_path)
+            if not keep_tmp_file:
+                os.remove(res_trace_path)
+            return res
+        # print("Warning: umodel.py: easy_verify returned None!!!")
+        return None
+
+    def verify_all_queries(
+        self, verify_options: str = "-t 1", keep_tmp_file=True, timeout: float = None
+    ) -> List[Tuple[QueryResult, SimTrace | None]]:
+        """Verify all queries of current model in one `verifyta` run, and return the verdict and the parsed trace (if exists) of each query.
+        The model is compiled to `.if` only once for all traces.
+
+        Examples:
+            >>> umodel.queries = ['E<> P.pass', 'A[] not deadlock']
+            >>> for query_res, sim_trace in umodel.verify_all_queries():
+            >>>     print(query_res.index, query_res.verdict, sim_trace is not None)
+
+        Args:
+            verify_options (str, optional): verify options, and `-t` must be set because returning a `SimTrace` requires a `.xtr` trace file. Defaults to '-t 1', returning the shortest trace.
+                None is the same as '-t 1'.
+            keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+            timeout (float, optional): timeout in seconds for the verification command execution.
+
+        Raises:
+            ValueError: if `-t` is not set in `verify_options`.
+
+        Returns:
+            List[Tuple[QueryResult, SimTrace | None]]: for each query in `self.queries`, its `QueryResult` and its trace as `SimTrace` (or None).
+        """
+        if verify_options is None:
+            verify_options = "-t 1"
+        if "-t" not in verify_options:
+            err_info = f'"-t" must be set in verify_options, current verify_options: {verify_options}.'
+            raise ValueError(err_info)
+
+        self.flush()
+        xtr_trace_path, _, _ = self.__easy_verify_trace_paths()
+        # trace files are numbered by the index of the query, e.g., `-1`, `-2`,
+        # and the files of a previous run are removed, so that a trace found by its number is written by this run
+        prefix = xtr_trace_path[:-len('.xtr')] if xtr_trace_path.endswith('.xtr') else xtr_trace_path
+        for index in range(1, len(self.queries) + 1):
+            stale_trace_path = Verifyta().capabilities.trace_file(prefix, index)
+            if os.path.exists(stale_trace_path):
+                os.remove(stale_trace_path)
+        verify_res = Verifyta().verify(
+            self.model_path, xtr_trace_path, verify_options=verify_options, timeout=timeout, parse_result=True
+        )
+
+        for query_res in verify_res.queries:
+            trace_path = query_res.trace_path
+            if trace_path is None or not os.path.exists(trace_path):
+                trace_path = Verifyta().capabilities.trace_file(prefix, query_res.index)
+            query_res.trace_path = trace_path if os.path.exists(trace_path) else None
+
+        if all(query_res.trace_path is None for query_res in verify_res.queries):
+            return [(query_res, None) for query_res in verify_res.queries]
+
+        if_name = Verifyta().compile_to_if(self.model_path)
+        res = []
+        try:
+            for query_res in verify_res.queries:
+                sim_trace = None
+                if query_res.trace_path is not None:
+                    sim_trace = self.__parse_xtr_trace(if_name, query_res.trace_path, keep_if=True)
+                    if not keep_tmp_file:
+                        os.remove(query_res.trace_path)
+                        query_res.trace_path = None
+                res.append((query_res, sim_trace))
+        finally:
+            if os.path.exists(if_name):
+                os.remove(if_name)
+        return res
+
+    def __check_easy_verify(self, verify_options: str) -> None:
         if len(self.queries) != 1:
-            err_info = f'You can do easy_verify with only ONE query, current number of queries is: {len(self.queries)}, they are: {self.queries}.'
+            err_info = f'You can do easy_verify with only ONE query, current number of queries is: {len(self.queries)}, they are: {self.queries}. ' \
+                'Use verify_all_queries for models with multiple queries.'
             raise ValueError(err_info)
 
         # print(verify_options)
@@ -416,32 +778,64 @@ system Process;
             err_info = f'"-t" must be set in verify_options, current verify_options: {verify_options}.'
             raise ValueError(err_info)
 
+    def __easy_verify_trace_paths(self) -> Tuple[str, str, Tuple[str, str]]:
+        """Trace paths used by `easy_verify`.
+
+        Returns:
+            Tuple[str, str, Tuple[str, str]]: trace path passed to `verifyta`, path of the created trace file,
+                and the markers in the verify result that indicate a trace file is written.
+        """
         if Verifyta().get_uppaal_version() == 4:  # uppaal4.x
             xtr_trace_path = self.model_path.replace(".xml", ".xtr")
-            verify_cmd_res = Verifyta().verify(
-                self.model_path, xtr_trace_path, verify_options=verify_options, timeout=timeout
-            )
+            return (xtr_trace_path, xtr_trace_path.replace(".xtr", "-1.xtr"),
+                    ("Writing example trace to", "Writing counter example to"))
+        # uppaal5.x
+        xtr_trace_path = self.model_path.replace(".xml", "_xtr")
+        return (xtr_trace_path, xtr_trace_path.replace("_xtr", "_xtr-1"),
+                ("Writing witness trace", "Writing counter example to"))
 
-            # print(verify_cmd_res)
-            xtr_trace_path = xtr_trace_path.replace(".xtr", "-1.xtr")
-            if "Writing example trace to" in verify_cmd_res or "Writing counter example to" in verify_cmd_res:
-                res = self.load_xtr_trace(xtr_trace_path)
-                if not keep_tmp_file:
-                    os.remove(xtr_trace_path)
-                return res
-        else:  # uppaal5.x
-            xtr_trace_path = self.model_path.replace(".xml", "_xtr")
-            verify_cmd_res = Verifyta().verify(
-                self.model_path, xtr_trace_path, verify_options=verify_options, timeout=timeout
-            )
+    async def averify(self, trace_path: str = None, verify_options: str = None, keep_tmp_file: bool = True, timeout: float = None,
+                      parse_result: bool = False) -> str | VerificationResult:
+        """Coroutine version of `verify`, see `Verifyta().averify`.
 
-            xtr_trace_path = xtr_trace_path.replace("_xtr", "_xtr-1")
-            if "Writing witness trace" in verify_cmd_res or "Writing counter example to" in verify_cmd_res:
-                res = self.load_xtr_trace(xtr_trace_path)
-                if not keep_tmp_file:
-                    os.remove(xtr_trace_path)
-                return res
-        # print("Warning: umodel.py: easy_verify returned None!!!")
+        Args:
+            trace_path (str, optional): the path to save the trace file. Defaults to None.
+            verify_options (str, optional): options for verifyta, such as ` -t 0 -o 0`. Defaults to None.
+            keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+            timeout (float, optional): deadline in seconds for the verification.
+            parse_result (bool, optional): return a `VerificationResult` with per-query verdicts and statistics. Defaults to False.
+
+        Returns:
+            str | VerificationResult: terminal verify results for `self`, or the parsed result if `parse_result`.
+        """
+        self.flush()
+        return await Verifyta().averify(self.model_path, trace_path, verify_options, keep_tmp_file, timeout=timeout, parse_result=parse_result)
+
+    async def aeasy_verify(
+        self, verify_options: str = "-t 1", keep_tmp_file=True, timeout: float = None
+    ) -> SimTrace | None:
+        """Coroutine version of `easy_verify`, see `Verifyta().averify`.
+
+        Args:
+            verify_options (str, optional): verify options, and `-t` must be set. Defaults to '-t 1', returning the shortest trace.
+            keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+            timeout (float, optional): deadline in seconds for the verification.
+
+        Returns:
+            SimTrace | None: if exists a counter example, return a SimTrace, else return None.
+        """
+        self.__check_easy_verify(verify_options)
+        self.flush()
+        xtr_trace_path, res_trace_path, markers = self.__easy_verify_trace_paths()
+        verify_cmd_res = await Verifyta().averify(
+            self.model_path, xtr_trace_path, verify_options=verify_options, timeout=timeout
+        )
+
+        if any(marker in verify_cmd_res for marker in markers):
+            res = await self.aload_xtr_trace(res_trace_path)
+            if not keep_tmp_file:
+                os.remove(res_trace_path)
+            return res
         return None
 
     # endregion
@@ -492,6 +886,7 @@ system Process;
         Returns:
             Mermaid: a `Mermaid` instance.
         """
+        self.flush()
         mermaid_str = build_cg(self.model_path)
         m = Mermaid(mermaid_str)
         if is_beautify:
@@ -563,11 +958,11 @@ system Process;
         Returns:
             bool: `True` when succeed, `False` when fail.
         """
-        for i, template in enumerate(self.templates):
-            if template.name == template_name:
-                self.templates.remove(self.templates[i])
-                break
-        self.save()
+        template = self.__get_template(template_name)
+        if template is not None:
+            # by identity, `Template` instances are equal by `==` since the dataclass has no fields
+            del self.__templates[next(i for i, t in enumerate(self.__templates) if t is template)]
+        self.__on_edit()
         return True
 
     # endregion
@@ -615,14 +1010,14 @@ system Process;
             map(lambda x: x.replace("!", "").replace("?", ""), sigma_o)
         )
 
-        if template_name in [template.name for template in self.templates]:
+        if self.__get_template(template_name) is not None:
             raise ValueError(f"Template <{template_name}> already exists.")
 
         monitor = Monitors.observer_template(
             name=template_name,
             signals=signals,
             sigma_o=sigma_o,
-            init_ref=self.max_location_id + 1,
+            init_ref=self.allocate_location_ids(),
             strict=is_strict,
             allpattern=all_patterns,
         )
@@ -630,8 +1025,9 @@ system Process;
 
         # 将新到monitor加入到system中
 
-        self.add_template_to_system(monitor.name)
-        self.add_template(monitor)
+        with self.batch_edit():
+            self.add_template_to_system(monitor.name)
+            self.add_template(monitor)
 
     def add_input_monitor(
         self,
@@ -652,24 +1048,24 @@ system Process;
         signals = self.__parse_observations(inputs)
         assert len(signals) > 0
 
-        start_id = self.max_location_id + 1
         # 删除相同名字的monitor
         # self.remove_template(template_name)
-        if template_name in [template.name for template in self.templates]:
+        if self.__get_template(template_name) is not None:
             raise ValueError(f"Template <{template_name}> already exists.")
 
         # clock_name, signals = self.__parse_signals(signals)
         # input_model = UFactory.input(template_name, signals.to_list_tuple(clock_name), start_id)
         input_monitor = Monitors.input_template(
-            name=template_name, signals=signals, init_ref=start_id
+            name=template_name, signals=signals, init_ref=self.allocate_location_ids()
         )
         # self.templates.append(input_monitor)
 
         # self.__root_elem.insert(-2, input_model)
 
         # 将新到monitor加入到system中
-        self.add_template(input_monitor)
-        self.add_template_to_system(input_monitor.name)
+        with self.batch_edit():
+            self.add_template(input_monitor)
+            self.add_template_to_system(input_monitor.name)
 
         return None
 
@@ -684,11 +1080,17 @@ system Process;
         """
 
         # Check if the template name already exists
-        if template.name in [t.name for t in self.templates]:
+        if self.__get_template(template.name) is not None:
             raise ValueError(f"Template <{template.name}> already exists in the model.")
 
-        self.templates.append(template)
-        self.save()
+        # update the index instead of rebuilding it, so that adding many templates is linear
+        template_by_name = self.__template_by_name
+        max_location_id = max(self.max_location_id, template.max_location_id)
+        self.__templates.append(template)
+        template_by_name[template.name] = template
+        self.__template_by_name = template_by_name
+        self.__max_location_id = max_location_id
+        self.__on_edit()
 
     def add_template_to_system(self, template_name: str):
         """Add a template to system declarations.
@@ -782,12 +1184,13 @@ system Process;
             List[SimTrace]: the list of found patterns.
         """
         res = []
-        new_model = self.copy_as(f"tmp_find_all_patterns_{uuid.uuid4()}.xml")
+        new_model = self.clone(f"tmp_find_all_patterns_{uuid.uuid4()}.xml")
         all_patterns_iter = new_model.find_all_patterns_iter(focused_actions, verify_options, keep_tmp_file)
         for simtrace in all_patterns_iter:
             # print(simtrace.untime_pattern)
             res.append(simtrace)
-        if not keep_tmp_file:
+        # the cloned model is only written if it is verified
+        if not keep_tmp_file and os.path.exists(new_model.model_path):
             os.remove(new_model.model_path)
         return res
 
@@ -841,7 +1244,7 @@ system Process;
 
         model_uuid = self.model_path.split("_")[-1]
         new_model_path = f"tmp_find_all_patterns_iter_{model_uuid}"
-        new_umodel = self.copy_as(new_path=new_model_path)
+        new_umodel = self.clone(new_model_path)
         # tmp_find_all_iter_dde41bdf-7482-44f0-8674-ede5fd97e5c8.xml
         new_umodel.queries = default_query
         # print(f"create a new model: {new_umodel.model_path}")
@@ -919,7 +1322,7 @@ system Process;
                 `UModel` is the copied model.
 
         """
-        tmp_model = self.copy_as(f"tmp_diagnosable_suffix_{uuid.uuid4()}.xml")
+        tmp_model = self.clone(f"tmp_diagnosable_suffix_{uuid.uuid4()}.xml")
 
         template = Monitors.obs_after_fault_monitor(
             "MObsAfterFault",
@@ -932,12 +1335,143 @@ system Process;
         tmp_model.add_template(template)
         tmp_model.add_template_to_system(template.name)
         tmp_model.queries = "E<> MObsAfterFault.pass"
-        res = tmp_model.verify(keep_tmp_file=keep_tmp_file)
+        try:
+            res = tmp_model.verify(keep_tmp_file=keep_tmp_file)
+        finally:
+            # also when the verification is killed, see `Verifyta().join_process_group`
+            if not keep_tmp_file and os.path.exists(tmp_model.model_path):
+                os.remove(tmp_model.model_path)
         if not keep_tmp_file:
-            os.remove(tmp_model.model_path)
             return ("is satisfied" in res, None)
         return ("is satisfied" in res, tmp_model)
 
+    def valid_suffixes(
+        self,
+        fault: str,
+        suffixes: List[List[str]],
+        sigma_o: List[str],
+        sigma_un: List[str],
+        keep_tmp_file=True,
+    ) -> List[bool]:
+        """Determine whether each sequence in `suffixes` can happen after the `fault`, with one `verifyta` run.
+
+        The suffixes are encoded in one monitor (see `Monitors.obs_after_fault_trie_monitor`) with one query per distinct suffix,
+        instead of one model copy and one `verifyta` run per suffix.
+        This function will NOT modify the model, a copy named 'tmp_diagnosable_suffixes_<uuid>.xml' will be generated.
+
+        Args:
+            fault (str): fault name.
+            suffixes (List[List[str]]): observation sequences (suffix sequences), e.g., 100 to 1000 suffixes.
+            sigma_o (List[str]): the set of observable events.
+            sigma_un (List[str]): the set of unobservable events.
+            keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+
+        Raises:
+            ValueError: if the number of verified queries is not the number of distinct suffixes.
+
+        Returns:
+            List[bool]: whether `suffixes[i]` can happen after the `fault`, for each `i`.
+        """
+        distinct = list(dict.fromkeys(tuple(suffix) for suffix in suffixes))
+        if not distinct:
+            return []
+        tmp_model = self.clone(f"tmp_diagnosable_suffixes_{uuid.uuid4()}.xml")
+        template = Monitors.obs_after_fault_trie_monitor(
+            "MObsAfterFault",
+            [list(suffix) for suffix in distinct],
+            sigma_o,
+            sigma_un,
+            fault,
+            tmp_model.max_location_id + 1,
+        )
+        tmp_model.add_template(template)
+        tmp_model.add_template_to_system(template.name)
+        tmp_model.queries = [f"E<> MObsAfterFault.pass_{i}" for i in range(len(distinct))]
+        res = tmp_model.verify(keep_tmp_file=keep_tmp_file, parse_result=True)
+        if not keep_tmp_file:
+            os.remove(tmp_model.model_path)
+        if len(res.queries) != len(distinct):
+            raise ValueError(f"{len(distinct)} queries are expected, but {len(res.queries)} are verified: {res}")
+        is_valid = {suffix: query.is_satisfied for suffix, query in zip(distinct, res.queries)}
+        return [is_valid[tuple(suffix)] for suffix in suffixes]
+
+    def __iter_valid_suffixes(
+        self,
+        fault: str,
+        n: int,
+        sigma_o: List[str],
+        sigma_un: List[str],
+        keep_tmp_file: bool,
+        batch_size: int,
+        valid_memo: Dict[Tuple[str, ...], bool],
+    ) -> Iterator[Tuple[List[str], bool]]:
+        """Yield each suffix of length `n` in the order of `itertools.product`, and whether it can happen after the `fault`.
+        The suffixes that are not in `valid_memo` are checked by `valid_suffixes` in batches of `batch_size`, or one by one if `batch_size` is 1.
+        """
+        suffixes = product(sigma_o, repeat=n)
+        while True:
+            batch = [list(suffix) for suffix in islice(suffixes, batch_size)]
+            if not batch:
+                return
+            if batch_size == 1:
+                yield batch[0], self.__check_valid_suffix(valid_memo, sigma_o, sigma_un, fault, batch[0], keep_tmp_file)
+                continue
+            unknown = [suffix for suffix in batch if self.__memo_valid(valid_memo, suffix) is None]
+            if unknown:
+                for suffix, is_valid in zip(unknown, self.valid_suffixes(fault, unknown, sigma_o, sigma_un, keep_tmp_file)):
+                    valid_memo[tuple(suffix)] = is_valid
+            yield from ((suffix, self.__memo_valid(valid_memo, suffix)) for suffix in batch)
+
+    @staticmethod
+    def __memo_valid(valid_memo: Dict[Tuple[str, ...], bool], suffix: List[str]) -> bool | None:
+        """Validity of `suffix` in the memo, `None` if unknown. A suffix with an invalid prefix is also invalid.
+        """
+        res = valid_memo.get(tuple(suffix))
+        if res is None and any(valid_memo.get(tuple(suffix[:k])) is False for k in range(1, len(suffix))):
+            return False
+        return res
+
+    def __check_valid_suffix(
+        self,
+        valid_memo: Dict[Tuple[str, ...], bool],
+        sigma_o: List[str],
+        sigma_un: List[str],
+        fault: str,
+        suffix: List[str],
+        keep_tmp_file: bool,
+    ) -> bool:
+        """`__is_valid_suffix` with the memo of validity verdicts.
+        """
+        res = self.__memo_valid(valid_memo, suffix)
+        if res is None:
+            res = self.__is_valid_suffix(sigma_o, sigma_un, fault, suffix, keep_tmp_file)[0]
+            valid_memo[tuple(suffix)] = res
+        return res
+
+    def __identify(
+        self,
+        identified_memo: Dict[Tuple[str, ...], bool],
+        suffix: List[str],
+        fault: str,
+        sigma_o: List[str],
+        sigma_un: List[str],
+        keep_tmp_file: bool,
+        need_trace: bool = True,
+    ) -> (bool, SimTrace):
+        """`fault_identification` with the memo of identification verdicts.
+
+        A suffix that contains an identifying sequence also identifies the fault, e.g., the extensions of the identifying suffixes of `n - 1`.
+        A suffix that does not identify the fault is identified again only if `need_trace`, to return its trace.
+        """
+        key = tuple(suffix)
+        if any(identified_memo.get(key[i:j]) for i in range(len(key)) for j in range(i + 1, len(key) + 1)):
+            return True, None
+        if not need_trace and identified_memo.get(key) is False:
+            return False, None
+        res, trace = self.fault_identification(suffix, fault, sigma_o, sigma_un, keep_tmp_file)
+        identified_memo[key] = res
+        return res, trace
+
     # def diagnosable_one_fault(self, fault: str, n: int, sigma_o: List[str], sigma_un: List[str], visual=False, keep_tmp_file=True) -> bool:
     # fault_diagnosability_early_return
     # fault_diagnosability_ER+TC
@@ -950,6 +1484,9 @@ system Process;
         sigma_un: List[str],
         visual=False,
         keep_tmp_file=True,
+        max_workers: int = 1,
+        batch_size: int = 1,
+        memo: SuffixMemo = None,
     ) -> (bool, SimTrace):
         """Determine whether the `fault` is `n` diagnosable.
 
@@ -963,30 +1500,50 @@ system Process;
             sigma_un (List[str]): the set of unobservable events,
             visual (bool, optional): whether to visualize the analyzing process with a progress bar. Defaults to False.
             keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+            max_workers (int, optional): the number of suffixes checked in parallel, each by its own `verifyta` processes.
+                `None` for `os.cpu_count()`. Defaults to 1, checking the suffixes one by one.
+            batch_size (int, optional): the number of suffixes whose validity is checked by one `verifyta` run (see `valid_suffixes`),
+                e.g., 100 to 1000. Can not be used with `max_workers` larger than 1. Defaults to 1.
+            memo (SuffixMemo, optional): the verdicts of the suffixes checked before, e.g., for another `n`, which is updated by this function.
+                Defaults to None, checking all suffixes.
+
+        Raises:
+            ValueError: if both `max_workers` and `batch_size` are larger than 1.
 
         Returns:
             (bool, SimTrace):
                 bool: whether the fault is n-diagnosable.
                 SimTrace: if is not n-diagnosable, a `SimTrace` will be returend as a proof.
+                It is the trace of the first failing suffix in the order of `itertools.product(sigma_o, repeat=n)`, also in parallel.
         """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers > 1 and batch_size > 1:
+            raise ValueError(f"max_workers and batch_size can not be both larger than 1, got {max_workers} and {batch_size}.")
+        valid_memo, identified_memo = memo.tables(self.model_hash, fault, sigma_o, sigma_un) if memo is not None else ({}, {})
+        if max_workers > 1:
+            return self.__fault_diagnosability_parallel(fault, n, sigma_o, sigma_un, visual, keep_tmp_file, max_workers,
+                                                        valid_memo, identified_memo)
+
         total_processes = len(sigma_o) ** n
-        block_size = total_processes // 10
+        # 少于 10 个后缀时, block_size 为 0 会导致进度条死循环
+        block_size = max(total_processes // 10, 1)
         blocks_printed = 0
 
         if (visual):
             print("Progress: [ ]", end='')  # 10 spaces inside brackets
             print('\b' * 12, end='', flush=True)  # Move cursor back to start after '['
 
-        for process_counter, suffix in enumerate(product(sigma_o, repeat=n), 1):
-            suffix = list(suffix)
+        checked_suffixes = self.__iter_valid_suffixes(fault, n, sigma_o, sigma_un, keep_tmp_file, batch_size, valid_memo)
+        for process_counter, (suffix, is_valid) in enumerate(checked_suffixes, 1):
             # Update progress bar based on the number of iterations
-            while (process_counter > (blocks_printed + 1) * block_size) and visual:
+            while (process_counter > (blocks_printed + 1) * block_size) and blocks_printed < 10 and visual:
                 print('█', end='', flush=True)
                 blocks_printed += 1
 
-            if self.__is_valid_suffix(sigma_o, sigma_un, fault, suffix, keep_tmp_file)[0]:
-                verify_res, trace = self.fault_identification(
-                    suffix, fault, sigma_o, sigma_un, keep_tmp_file
+            if is_valid:
+                verify_res, trace = self.__identify(
+                    identified_memo, suffix, fault, sigma_o, sigma_un, keep_tmp_file
                 )
                 if verify_res:
                     continue
@@ -1000,6 +1557,103 @@ system Process;
             print(']' + ' ' * (10 - blocks_printed) + ' Complete!')  # Finish the progress bar
         return True, None
 
+    def __fault_diagnosability_parallel(
+        self,
+        fault: str,
+        n: int,
+        sigma_o: List[str],
+        sigma_un: List[str],
+        visual: bool,
+        keep_tmp_file: bool,
+        max_workers: int,
+        valid_memo: Dict[Tuple[str, ...], bool],
+        identified_memo: Dict[Tuple[str, ...], bool],
+    ) -> (bool, SimTrace):
+        """`fault_diagnosability` with the suffixes checked by `max_workers` threads, each waiting for its own `verifyta` processes.
+
+        Once a suffix proves that the fault is not diagnosable, the suffixes after it are cancelled, while the suffixes before it
+        are still checked, so that the returned trace is the same as `max_workers=1`.
+        The `verifyta` processes of a suffix that is already running are killed (see `VerifytaProcessGroup`).
+        """
+        total_processes = len(sigma_o) ** n
+        block_size = max(total_processes // 10, 1)
+        blocks_printed = 0
+        if visual:
+            print("Progress: [ ]", end='')
+            print('\b' * 12, end='', flush=True)
+
+        # 在主线程中序列化一次, 缓存各模板的 xml, 各线程复制模型时直接复用
+        self.xml
+        # index of the first failing suffix found so far, the workers skip the suffixes after it
+        first_failure = [total_processes]
+
+        def check(index: int, suffix: List[str], group: VerifytaProcessGroup) -> (bool, SimTrace):
+            try:
+                with Verifyta().join_process_group(group):
+                    if index > first_failure[0] or not self.__check_valid_suffix(valid_memo, sigma_o, sigma_un, fault, suffix, keep_tmp_file):
+                        return True, None
+                    if index > first_failure[0]:
+                        return True, None
+                    return self.__identify(identified_memo, suffix, fault, sigma_o, sigma_un, keep_tmp_file)
+            except CancelledError:
+                # killed after a failing suffix before it is found
+                return True, None
+
+        suffixes = enumerate(product(sigma_o, repeat=n))
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending: Dict[Future, int] = {}
+        groups: Dict[Future, VerifytaProcessGroup] = {}
+        trace = None
+        finished = 0
+        try:
+            while True:
+                # submit the suffixes in order, so that no suffix before a failing one is skipped
+                while len(pending) < 2 * max_workers and first_failure[0] == total_processes:
+                    item = next(suffixes, None)
+                    if item is None:
+                        break
+                    group = VerifytaProcessGroup()
+                    future = executor.submit(check, item[0], list(item[1]), group)
+                    pending[future] = item[0]
+                    groups[future] = group
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    del groups[future]
+                    finished += 1
+                    verify_res, suffix_trace = future.result()
+                    if not verify_res and index < first_failure[0]:
+                        first_failure[0] = index
+                        trace = suffix_trace
+                # cancel the suffixes after the first failing one, and kill the running ones
+                for future, index in list(pending.items()):
+                    if index <= first_failure[0]:
+                        continue
+                    if future.cancel():
+                        del pending[future]
+                        del groups[future]
+                        finished += 1
+                    else:
+                        groups[future].kill()
+                while visual and finished > (blocks_printed + 1) * block_size and blocks_printed < 10:
+                    print('█', end='', flush=True)
+                    blocks_printed += 1
+        finally:
+            for future in pending:
+                if not future.cancel():
+                    groups[future].kill()
+            executor.shutdown(wait=True)
+
+        if first_failure[0] < total_processes:
+            if visual:
+                print(']' + ' ' * (10 - blocks_printed) + ' Early Return!')
+            return False, trace
+        if visual:
+            print(']' + ' ' * (10 - blocks_printed) + ' Complete!')
+        return True, None
+
     def fault_diagnosability_optimized(
         self,
         fault: str,
@@ -1007,9 +1661,14 @@ system Process;
         sigma_o: List[str],
         sigma_un: List[str],
         keep_tmp_file=True,
+        strategy: str = 'dfs',
+        return_stats: bool = False,
+        memo: SuffixMemo = None,
     ) -> (bool, SimTrace):
-        """Determine whether the `fault` is `n` diagnosable.
+        """Determine whether the `fault` is `n` diagnosable, as `fault_diagnosability` but pruning the invalid prefixes.
 
+        The prefixes of the observation suffixes are checked from short to long (see `SuffixSearch`).
+        If a prefix can not be observed after the fault, none of its extensions is checked.
         This function will NOT modify the model. It will copy to 'tmp_diagnosable_suffix.xml' and 'tmp_identify.xml'
         Note: If not keep_tmp_file, it won't be able to get the trace because the tmp model is removed.
 
@@ -1019,30 +1678,281 @@ system Process;
             sigma_o (List[str]): the set of observable events,
             sigma_un (List[str]): the set of unobservable events,
             keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+            strategy (str, optional): `'dfs'` or `'bfs'`, see `SuffixSearch`. With `'dfs'`, the counterexample is the same as `fault_diagnosability`.
+                Defaults to 'dfs'.
+            return_stats (bool, optional): also return the `SearchStats`, e.g., how many verifier calls are saved by pruning. Defaults to False.
+            memo (SuffixMemo, optional): the verdicts of the suffixes checked before, e.g., for another `n`, which is updated by this function.
+                Defaults to None, checking all suffixes.
 
         Returns:
-            (bool, SimTrace):
+            (bool, SimTrace) or (bool, SimTrace, SearchStats) if `return_stats`:
                 bool: whether the fault is n-diagnosable.
                 SimTrace: if is not n-diagnosable, a `SimTrace` will be returend as a proof.
+                SearchStats: statistics of the search.
         """
-        # FIX ME: bugs to be test
-        # should provide different optimization strategies, such as DFS, BFS, randomized
-        # here we provide DFS
-        root = MyTree(sigma_o=sigma_o, n=n)
-        if root.grow():
-            while True:
-                node = root.leftmost_not_verified_node
-                if node is None:
-                    return True
-                # check if is valid observation sequence
-                suffix = list(node.observation_sequence)
-                node.has_checked = True
-                node.is_valid = self.__is_valid_suffix(sigma_o, sigma_un, fault, suffix, keep_tmp_file)[0]
-                # check if it can identify the fault
-                if node.is_valid and node.depth == n:
-                    can_detect, trace = self.fault_identification(suffix, fault, sigma_o, sigma_un, keep_tmp_file)
-                    if not can_detect and node.depth == n:
-                        return False, trace
+        valid_memo, identified_memo = memo.tables(self.model_hash, fault, sigma_o, sigma_un) if memo is not None else ({}, {})
+        res = self.__search_diagnosability(fault, n, sigma_o, sigma_un, keep_tmp_file, strategy, valid_memo, identified_memo)
+        if return_stats:
+            return res
+        return res[:2]
+
+    def __search_diagnosability(
+        self,
+        fault: str,
+        n: int,
+        sigma_o: List[str],
+        sigma_un: List[str],
+        keep_tmp_file: bool,
+        strategy: str,
+        valid_memo: Dict[Tuple[str, ...], bool],
+        identified_memo: Dict[Tuple[str, ...], bool],
+        need_trace: bool = True,
+    ) -> (bool, SimTrace, SearchStats):
+        """`fault_diagnosability_optimized` with the memo tables, the trace is None if not `need_trace`.
+        """
+        search = SuffixSearch(sigma_o, n, strategy=strategy, memo=valid_memo,
+                              is_valid=lambda prefix: self.__is_valid_suffix(sigma_o, sigma_un, fault, prefix, keep_tmp_file)[0])
+        for suffix in search:
+            # check if it can identify the fault
+            can_detect, trace = self.__identify(identified_memo, suffix, fault, sigma_o, sigma_un, keep_tmp_file, need_trace)
+            if not can_detect:
+                return False, trace, search.stats
+        return True, None, search.stats
+
+    def fault_diagnosability_increasing(
+        self,
+        fault: str,
+        max_n: int,
+        sigma_o: List[str],
+        sigma_un: List[str],
+        keep_tmp_file=True,
+        memo: SuffixMemo = None,
+    ) -> (int | None, SimTrace):
+        """Find the smallest `n` for which the `fault` is `n` diagnosable, by `fault_diagnosability_optimized` with `n = 1, 2, ..., max_n`.
+
+        A fault that is `n` diagnosable is also `n + 1` diagnosable. Each `n` reuses the verdicts of the smaller ones in `memo`:
+        the valid prefixes are not checked again, and the extensions of the identifying suffixes are not identified again.
+        This function will NOT modify the model.
+
+        Args:
+            fault (str): fault name
+            max_n (int): the largest `n` to check.
+            sigma_o (List[str]): the set of observable events,
+            sigma_un (List[str]): the set of unobservable events,
+            keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+            memo (SuffixMemo, optional): the verdicts shared with other checks, e.g., of other faults or loaded from a file.
+                Defaults to None, using a new `SuffixMemo` for this call.
+
+        Returns:
+            (int | None, SimTrace):
+                int | None: the smallest `n`, or None if the fault is not `max_n` diagnosable.
+                SimTrace: if the fault is not `max_n` diagnosable, the counterexample of `max_n`.
+        """
+        if memo is None:
+            memo = SuffixMemo()
+        valid_memo, identified_memo = memo.tables(self.model_hash, fault, sigma_o, sigma_un)
+        trace = None
+        for n in range(1, max_n + 1):
+            # only the counterexample of max_n is returned
+            is_diagnosable, trace, _ = self.__search_diagnosability(fault, n, sigma_o, sigma_un, keep_tmp_file, 'dfs',
+                                                                    valid_memo, identified_memo, need_trace=n == max_n)
+            if is_diagnosable:
+                return n, None
+        return None, trace
+
+    def twin_plant(self, fault: str, n: int, sigma_o: List[str], new_path: str = None) -> UModel:
+        """Build the twin plant of `self` for `fault_diagnosability_twin`, which is a copy of `self` with
+        a fault-free copy of the plant and the monitor `MTwin` (see `Monitors.twin_plant_monitor`).
+
+        The processes of `self` are the faulty copy. Each template `T` is copied as `T_twin`, with the locations renumbered,
+        the global channels `c` renamed to `c_twin`, and the edges sending `fault` removed, which is the fault-free copy.
+        The processes in `system` are instantiated again from the copied templates, e.g., `p = T(a);` gives `p_twin = T_twin(a_twin);`.
+        Only the global channels are duplicated, so the global variables and clocks must be constants,
+        and the edges sending `fault` must use the global channel instead of a parameter.
+
+        The twin plant is meant for small untimed models such as the toy models of the tests, and is not a general replacement
+        of `fault_diagnosability`. A faulty run and a fault-free run are explored as one run of the product, in which both copies
+        share the global time. So a pair of runs is missed, and the fault may be reported `n` diagnosable although the
+        suffix based check disagrees, if a copy is blocked in a committed location, or an invariant of a copy stops the time
+        before the other copy makes its observations.
+
+        This function will NOT modify the model.
+
+        Args:
+            fault (str): fault name.
+            n (int): the number of observations after the fault, should be positive.
+            sigma_o (List[str]): the set of observable events.
+            new_path (str, optional): model path of the twin plant. Defaults to None, using `tmp_twin_plant_<uuid>.xml`.
+
+        Raises:
+            ValueError: if `fault` or an event in `sigma_o` is not a global broadcast channel, `fault` is sent by a process as a parameter,
+                `declaration` or `system` has variables or clocks that are not constants, or the twin plant has a name conflict.
+
+        Returns:
+            UModel: the twin plant, with `autosave=False`. `E<> MTwin.pass` holds iff the fault is not `n` diagnosable.
+        """
+        suffix = '_twin'
+        if new_path is None:
+            new_path = os.path.join(os.path.dirname(self.model_path), f"tmp_twin_plant_{uuid.uuid4()}.xml")
+        tmp_model = self.clone(new_path)
+
+        # global channels, e.g., `urgent broadcast chan a, b[2];` is duplicated as `urgent broadcast chan a_twin, b_twin[2];`
+        declaration = re.sub(r'//[^\n]*|/\*.*?\*/', '', tmp_model.declaration, flags=re.S)
+        channels: List[str] = []
+        broadcast_channels: List[str] = []
+        twin_declarations: List[str] = []
+        for kind, items in re.findall(r'\b((?:urgent\s+)?(?:broadcast\s+)?chan)\s+([^;]+);', declaration):
+            twin_items = []
+            for item in items.split(','):
+                name = re.match(r'\s*(\w+)', item).group(1)
+                channels.append(name)
+                if 'broadcast' in kind:
+                    broadcast_channels.append(name)
+                twin_items.append(f'{name}{suffix}{item.strip()[len(name):]}')
+            twin_declarations.append(f"{kind} {', '.join(twin_items)};")
+        for event in [fault] + sigma_o:
+            # the monitor does not receive every observation, which would block the senders of a binary channel
+            if event not in broadcast_channels:
+                raise ValueError(f"{event} is not a global broadcast channel, global broadcast channels: {broadcast_channels}.")
+        # the variables would be shared by both copies, so that the faulty copy drives the fault-free copy
+        system = re.sub(r'//[^\n]*|/\*.*?\*/', '', tmp_model.system, flags=re.S)
+        system = re.sub(r'^\s*\w+\s*(\([^)]*\))?\s*=\s*\w+\s*\(.*\)\s*;|\bsystem\b[^;]*;', '', system, flags=re.M)
+        mutable_declarations = self.__mutable_declarations(declaration) + self.__mutable_declarations(system)
+        if mutable_declarations:
+            raise ValueError(f"The twin plant can not share variables or clocks between the copies, found: {mutable_declarations}.")
+
+        def rename(text: str) -> str:
+            return re.sub(r'\b\w+\b', lambda m: m.group() + suffix if m.group() in channels else m.group(), text)
+
+        # the fault-free copy of the templates
+        templates = list(tmp_model.templates)
+        template_names = [template.name for template in templates]
+        offset = tmp_model.max_location_id + 1
+        for template in templates:
+            if tmp_model.get_template(template.name + suffix) is not None:
+                raise ValueError(f"Template <{template.name + suffix}> already exists in the model.")
+            twin = template.copy()
+            twin.name = template.name + suffix
+            twin.init_ref += offset
+            for location in twin.locations:
+                location.location_id += offset
+            twin_edges = []
+            for edge in twin.edges or []:
+                if edge.sync is not None:
+                    if re.match(rf'\s*{re.escape(fault)}\b[^!?]*!', edge.sync):
+                        continue
+                    edge.sync = rename(edge.sync)
+                edge.source_location_id += offset
+                edge.target_location_id += offset
+                twin_edges.append(edge)
+            twin.edges = twin_edges
+            tmp_model.add_template(twin)
+
+        # instantiate the processes again, before the `system` line
+        system_lines = tmp_model.system.split('\n')
+        processes = list(template_names)
+        twin_lines = []
+        system_index = len(system_lines)
+        for i, line in enumerate(system_lines):
+            if re.match(r'\s*system\b', line):
+                system_index = i
+                break
+            instance = re.match(r'\s*(\w+)\s*=\s*(\w+)\s*\((.*)\)\s*;', line)
+            if instance is not None and instance.group(2) in template_names:
+                # the fault can be received by a parameter, but the edges sending it by a parameter are kept in the copy
+                template = templates[template_names.index(instance.group(2))]
+                params = [re.search(r'(\w+)\s*(\[[^\]]*\]\s*)*$', param).group(1) for param in (template.params or '').split(',') if param.strip()]
+                args = [arg.strip() for arg in instance.group(3).split(',')]
+                for param, arg in zip(params, args):
+                    if re.match(rf'{re.escape(fault)}\b', arg) and \
+                            any(re.match(rf'\s*{param}\b[^!?]*!', edge.sync or '') for edge in template.edges or []):
+                        raise ValueError(f"{fault} is sent by process {instance.group(1)} as the parameter {param}, which can not be removed from the twin plant.")
+                processes.append(instance.group(1))
+                twin_lines.append(f'{instance.group(1)}{suffix} = {instance.group(2)}{suffix}({rename(instance.group(3))});')
+        system_items = []
+        if system_index < len(system_lines):
+            system_items = [item.strip() for item in re.match(r'\s*system\b([^;]*)', system_lines[system_index]).group(1).split(',')]
+        system_lines[system_index:system_index] = twin_lines
+        tmp_model.system = '\n'.join(system_lines)
+        for item in system_items:
+            if item in processes:
+                tmp_model.add_template_to_system(item + suffix)
+
+        tmp_model.declaration = tmp_model.declaration + '\n' + '\n'.join(twin_declarations)
+        monitor = Monitors.twin_plant_monitor('MTwin', n, sigma_o, [event + suffix for event in sigma_o], fault,
+                                              tmp_model.max_location_id + 1)
+        tmp_model.add_template(monitor)
+        tmp_model.add_template_to_system(monitor.name)
+        tmp_model.queries = "E<> MTwin.pass"
+        return tmp_model
+
+    @staticmethod
+    def __mutable_declarations(declaration: str) -> List[str]:
+        """The top-level declarations in `declaration` without comments, that are neither constants, types, channels nor functions,
+        e.g., `int x` and `clock t`.
+        """
+        # 函数体与初始化列表替换为 {}
+        collapsed = []
+        depth = 0
+        for char in declaration:
+            if char == '{':
+                if depth == 0:
+                    collapsed.append(char)
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    collapsed.append(char)
+            elif depth == 0:
+                collapsed.append(char)
+        # function definitions, e.g., `void f(int i) {}`
+        text = re.sub(r'[\w\s\[\],&]+\([^()]*\)\s*\{\}', ';', ''.join(collapsed))
+        res = []
+        for statement in text.split(';'):
+            statement = statement.strip()
+            if statement and not re.match(r'(const|typedef|(urgent\s+)?(broadcast\s+)?chan)\b', statement):
+                res.append(statement)
+        return res
+
+    def fault_diagnosability_twin(
+        self,
+        fault: str,
+        n: int,
+        sigma_o: List[str],
+        keep_tmp_file=True,
+    ) -> (bool, SimTrace):
+        """Determine whether the `fault` is `n` diagnosable with one `verifyta` run on the twin plant (see `twin_plant`),
+        instead of checking each observation suffix as `fault_diagnosability` does.
+
+        The fault is not `n` diagnosable iff the first `n` observations after the fault can also be observed
+        in a run without the fault, i.e., `E<> MTwin.pass` holds in the twin plant.
+        The result is the same as `fault_diagnosability` only within the scope described in `twin_plant`.
+        This function will NOT modify the model. It will copy to 'tmp_twin_plant_<uuid>.xml'.
+
+        Args:
+            fault (str): fault name
+            n (int): n-diagnosability, should be positive.
+            sigma_o (List[str]): the set of observable events,
+            keep_tmp_file (bool, optional): whether to keep the temp file such as `xtr` or in-process `xml`. Defaults to True.
+
+        Raises:
+            ValueError: if the verdict of `E<> MTwin.pass` is neither satisfied nor not satisfied.
+
+        Returns:
+            (bool, SimTrace):
+                bool: whether the fault is n-diagnosable.
+                SimTrace: if is not n-diagnosable, the trace of the twin plant will be returend as a proof,
+                in which `MTwin.f_obs` is the ambiguous observation sequence.
+        """
+        tmp_model = self.twin_plant(fault, n, sigma_o)
+        query_res, trace = tmp_model.verify_all_queries(keep_tmp_file=keep_tmp_file)[0]
+        if not keep_tmp_file:
+            os.remove(tmp_model.model_path)
+        if not query_res.is_satisfied and query_res.verdict != NOT_SATISFIED:
+            raise ValueError(f"Unexpected verdict of {tmp_model.queries[0]}: {query_res.verdict}, {query_res.message}")
+        if query_res.is_satisfied:
+            return False, trace
+        return True, None
 
     def fault_identification(
         self,
@@ -1066,7 +1976,7 @@ system Process;
             SimTrace: if the `fault` can not be identified, a counter-example will be returned.
         """
 
-        tmp_model = self.copy_as(f"tmp_identify_{uuid.uuid4()}.xml")
+        tmp_model = self.clone(f"tmp_identify_{uuid.uuid4()}.xml")
         sequence_monitor = Monitors.observer_suffix_monitor(
             name="MObserverSuffix",
             suffix_sequence=suffix_sequence,
@@ -1085,10 +1995,12 @@ system Process;
         tmp_model.add_template_to_system(fault_monitor.name)
         # must imply
         tmp_model.queries = f"MObserverSuffix.pass-->{f}_Monitor.pass"
-        res = tmp_model.verify().find("NOT") == -1
-        trace = tmp_model.easy_verify(keep_tmp_file=keep_tmp_file)
-        if not keep_tmp_file:
-            os.remove(tmp_model.model_path)
+        try:
+            res = tmp_model.verify().find("NOT") == -1
+            trace = tmp_model.easy_verify(keep_tmp_file=keep_tmp_file)
+        finally:
+            if not keep_tmp_file and os.path.exists(tmp_model.model_path):
+                os.remove(tmp_model.model_path)
         return (res, trace)
 
     def fault_tolerance(
@@ -1124,7 +2036,7 @@ system Process;
             str: the result of tolerance, the control sequence tail, and the trace.
         """
         for _ in range(len(identified_faults)):
-            tmp_model = self.copy_as(f"tmp_tolerance_design_input_{uuid.uuid4()}.xml")
+            tmp_model = self.clone(f"tmp_tolerance_design_input_{uuid.uuid4()}.xml")
 
             template = Monitors.input_after_fault_monitor(
                 "MInputAfterFault",
@@ -1145,14 +2057,15 @@ system Process;
                 keep_tmp_file=keep_tmp_file,
             )  # find all patterns, return SimTrace
 
-            if not keep_tmp_file:
+            # the cloned model is only written if it is verified
+            if not keep_tmp_file and os.path.exists(tmp_model.model_path):
                 os.remove(tmp_model.model_path)
 
         if len(result) == 0:
             return "Fault can NOT be tolerated"
 
         for i, result_i in enumerate(result):
-            tmp_model = self.copy_as(f"tmp_tolerance_check_input_{uuid.uuid4()}.xml")
+            tmp_model = self.clone(f"tmp_tolerance_check_input_{uuid.uuid4()}.xml")
             control_tail = result_i.untime_pattern[-control_length:]
             # print('==================== control tail ======================\n')
             # print(control_tail)
@@ -1246,15 +2159,10 @@ system Process;
                     idx = i
                     target_location_id = l.location_id
                     break
+            # 用索引找到指向fail0的边, 一次性删除
+            edges_to_be_removed = set(map(id, observer_template.in_edges(target_location_id)))
             del observer_template.locations[idx]
-
-            edges_idx_to_be_removed = []
-            for i, e in enumerate(observer_template.edges):
-                if e.target_location_id == target_location_id:
-                    edges_idx_to_be_removed.append(i)
-
-            for i in reversed(edges_idx_to_be_removed):
-                del observer_template.edges[i]
+            observer_template.edges = [e for e in observer_template.edges if id(e) not in edges_to_be_removed]
 
             new_umodel.templates.append(observer_template)
             new_umodel.save()
@@ -1295,7 +2203,26 @@ system Process;
         Returns:
             SimTrace | None: if you want to save the parsed raw trace, you can use SimTrace.save_raw(file_name)
         """
+        self.flush()
         if_name = Verifyta().compile_to_if(self.model_path)
+        return self.__parse_xtr_trace(if_name, xtr_trace_path, keep_if)
+
+    async def aload_xtr_trace(self, xtr_trace_path: str, keep_if=False) -> SimTrace | None:
+        """Coroutine version of `load_xtr_trace`, the trace is parsed in the default executor of the running loop.
+
+        Args:
+            xtr_trace_path (str): the path of the `.xtr` trace file
+            keep_if (bool): keep the `.if` file
+
+        Returns:
+            SimTrace | None: the parsed trace.
+        """
+        self.flush()
+        if_name = await Verifyta().acompile_to_if(self.model_path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.__parse_xtr_trace, if_name, xtr_trace_path, keep_if)
+
+    def __parse_xtr_trace(self, if_name: str, xtr_trace_path: str, keep_if: bool) -> SimTrace:
         trace_text = utap_parser(if_name, xtr_trace_path, keep_if=keep_if)
 
         res = SimTrace(trace_text)
@@ -22,7 +22,6 @@ TRACEER_FILE = TRACEER_FILE_DICT[platform.system()]
 
 # platform
 PLATFORM = platform.system()
-USE_SHELL = PLATFORM == 'Windows'
 
 def utap_parser(if_file: str, xtr_file: str, keep_if: bool = False) -> str:
     """Parse `.if` and associated `.xtr` file to readable trace string, which will be parsed into `SimTrace`.
@@ -39,7 +38,7 @@ def utap_parser(if_file: str, xtr_file: str, keep_if: bool = False) -> str:
     cmd = [TRACEER_FILE, "--trace=string", "-t", xtr_file, "-i", if_file]
 
     try:
-        cmd_res = subprocess.run(cmd, capture_output=True, shell=USE_SHELL, text=True, check=False)
+        cmd_res = subprocess.run(cmd, capture_output=True, text=True, check=False)
         if cmd_res.stderr:
             err_info = f"Command error with: {' '.join(cmd)}:\n {cmd_res.stderr}"
             raise ValueError(err_info)
@@ -4,9 +4,156 @@
 # https://github.com/microsoft/pylance-release/issues/513
 from __future__ import annotations
 
+import asyncio
 import platform
 import os
+import re
+import shlex
+import shutil
 import subprocess
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, CancelledError, as_completed
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .cache import get_cache_dir, load_json, dump_json, VerifyCache, CompileCache
+from .results import VerificationResult
+
+
+class VerifytaCapabilities:
+    """Capabilities of a `verifyta` binary, including the version, the supported options and the naming convention of trace files.
+    It is probed once per binary and cached by `Verifyta`.
+    """
+
+    def __init__(self, version: str, options: List[str]):
+        """
+        Args:
+            version (str): full version of UPPAAL, e.g., `'5.0.0'`.
+            options (List[str]): options listed by `verifyta -h`, e.g., `['-t', '--diagnostic', ...]`.
+        """
+        self.version: str = version
+        self.options: List[str] = options
+
+    def __repr__(self) -> str:
+        return f'VerifytaCapabilities(version={self.version}, options={self.options})'
+
+    @property
+    def major_version(self) -> int:
+        """Major version of UPPAAL, e.g., `4` or `5`.
+        """
+        return int(self.version.split('.')[0])
+
+    @property
+    def trace_file_format(self) -> str:
+        """Format of the trace files created by `verifyta -f prefix`, with fields `prefix` and `index` (starting from 1).
+        UPPAAL 4.x creates `prefix-1.xtr`, while UPPAAL 5.x creates `prefix-1`.
+        """
+        if self.major_version == 4:
+            return '{prefix}-{index}.xtr'
+        return '{prefix}-{index}'
+
+    def trace_file(self, prefix: str, index: int = 1) -> str:
+        """Path of the `index`-th trace file created by `verifyta -f prefix`.
+
+        Args:
+            prefix (str): the prefix passed to `-f`.
+            index (int, optional): index of the query, starting from 1. Defaults to 1.
+
+        Returns:
+            str: path of the trace file.
+        """
+        return self.trace_file_format.format(prefix=prefix, index=index)
+
+    def supports(self, option: str) -> bool:
+        """Whether `option`, such as `-u` or `--summary`, is supported by the binary.
+        """
+        return option in self.options
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'version': self.version, 'options': self.options}
+
+    @staticmethod
+    def from_dict(content: Dict[str, object]) -> VerifytaCapabilities:
+        return VerifytaCapabilities(content['version'], list(content['options']))
+
+
+class VerifytaCommand:
+    """A command that runs without shell: the argv list is passed straight to the child process together with `env`,
+    and stdout can be captured directly into a file.
+    """
+
+    def __init__(self, argv: List[str], env: Dict[str, str] = None, stdout_path: str = None):
+        """
+        Args:
+            argv (List[str]): the program and its arguments, e.g., `['verifyta', 'demo.xml', '-t', '1']`.
+            env (Dict[str, str], optional): environment variables of the child process. Defaults to None, inheriting the current environment.
+            stdout_path (str, optional): write stdout to this file instead of capturing it. Defaults to None.
+        """
+        self.argv: List[str] = argv
+        self.env: Dict[str, str] | None = env
+        self.stdout_path: str | None = stdout_path
+
+    def __str__(self) -> str:
+        res = ' '.join(shlex.quote(arg) for arg in self.argv)
+        if self.stdout_path is not None:
+            res += f' > {shlex.quote(self.stdout_path)}'
+        return res
+
+    def __repr__(self) -> str:
+        return f'VerifytaCommand({self.__str__()})'
+
+
+class VerifytaProcessGroup:
+    """The `verifyta` processes started by `Verifyta().cmd` in the threads joined by `Verifyta().join_process_group`,
+    which can be killed together, e.g., to stop a task that is running in another thread.
+
+    Examples:
+        >>> group = VerifytaProcessGroup()
+        >>> # in a worker thread
+        >>> with Verifyta().join_process_group(group):
+        >>>     umodel.verify()  # raises CancelledError once killed
+        >>> # in the main thread
+        >>> group.kill()
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__processes = set()
+        self.__killed: bool = False
+
+    @property
+    def killed(self) -> bool:
+        """Whether `kill` is called.
+        """
+        return self.__killed
+
+    def popen(self, argv: List[str], **kwargs) -> subprocess.Popen:
+        """Start a process in the group.
+
+        Raises:
+            CancelledError: if the group is killed.
+        """
+        with self.__lock:
+            if self.__killed:
+                raise CancelledError(' '.join(argv))
+            proc = subprocess.Popen(argv, **kwargs)
+            self.__processes.add(proc)
+        return proc
+
+    def discard(self, proc: subprocess.Popen) -> None:
+        """Remove a finished process from the group.
+        """
+        with self.__lock:
+            self.__processes.discard(proc)
+
+    def kill(self) -> None:
+        """Kill the running processes, and refuse to start new ones.
+        """
+        with self.__lock:
+            self.__killed = True
+            for proc in self.__processes:
+                proc.kill()
 
 
 class Verifyta:
@@ -31,8 +178,24 @@ class Verifyta:
 
         self.__verifyta_version: int = None
 
+        self.__capabilities: VerifytaCapabilities = None
+        # capabilities probed in current process, {binary key: VerifytaCapabilities}
+        self.__capabilities_cache: Dict[str, VerifytaCapabilities] = {}
+        self.__capabilities_lock = threading.Lock()
+
         self.__operating_system: str = self.get_env()
 
+        # limits the number of concurrent verifyta processes started by the coroutines, e.g., `averify`
+        self.__async_limit: int = os.cpu_count() or 1
+        self.__async_semaphores = weakref.WeakKeyDictionary()
+        # the process group of each thread, see `join_process_group`
+        self.__thread_local = threading.local()
+
+        # opt-in cache of verification results, see `enable_cache`
+        self.__verify_cache: VerifyCache | None = None
+        # opt-in cache of `.if` files, so that loading traces of an unchanged model compiles it only once, see `set_compile_cache`
+        self.__compile_cache: CompileCache | None = None
+
     @property
     def verifyta_path(self) -> str:
         """Get current verifyta path.
@@ -57,10 +220,101 @@ class Verifyta:
             raise ValueError(f'Unknown operating system: {operating_system}')
 
     def get_uppaal_version(self) -> int:
+        """Get the major version of UPPAAL, e.g., `4` or `5`. The version is probed only once per binary.
+
+        Returns:
+            int: major version of UPPAAL.
+        """
+        return self.capabilities.major_version
+
+    @property
+    def capabilities(self) -> VerifytaCapabilities:
+        """Capabilities of current `verifyta`, which are probed once per binary and cached.
+
+        Raises:
+            ValueError: if verifyta_path is not set.
+
+        Returns:
+            VerifytaCapabilities: the version, supported options and trace file naming convention.
+        """
+        if self.__capabilities is None:
+            self.__check_verifyta_path()
+            self.__capabilities = self.__probe_capabilities(self.__verifyta_path)
+        return self.__capabilities
+
+    @staticmethod
+    def __binary_key(verifyta_path: str) -> str | None:
+        """Key of a `verifyta` binary that changes when the binary is replaced, composed by its real path, size and mtime.
+        Returns None if the binary can not be found.
+        """
+        path = verifyta_path if os.path.isfile(verifyta_path) else shutil.which(verifyta_path)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return f'{os.path.realpath(path)}|{stat.st_size}|{stat.st_mtime_ns}'
+
+    def __probe_capabilities(self, verifyta_path: str) -> VerifytaCapabilities | None:
+        """Probe the capabilities of `verifyta_path` by `verifyta -v` and `verifyta -h`.
+        The result is cached in memory and in `capabilities.json` of the cache directory,
+        so that other processes do not need to probe the same binary again.
+
+        Args:
+            verifyta_path (str): path to `verifyta`.
+
+        Returns:
+            VerifytaCapabilities | None: None if `verifyta_path` is not a valid verifyta.
+        """
+        key = self.__binary_key(verifyta_path)
+        cache_path = os.path.join(get_cache_dir(), 'capabilities.json')
+        with self.__capabilities_lock:
+            if key is not None and key in self.__capabilities_cache:
+                return self.__capabilities_cache[key]
+            if key is not None:
+                cached = load_json(cache_path).get(key)
+                if cached is not None:
+                    try:
+                        res = VerifytaCapabilities.from_dict(cached)
+                    except (KeyError, TypeError):
+                        res = None
+                    if res is not None:
+                        self.__capabilities_cache[key] = res
+                        return res
+
+            # UPPAAL5 will get noneType in stderr.
+            version_res = self.__run_probe([verifyta_path, '-v'])
+            if 'UPPAAL' not in version_res:
+                return None
+            version_words = version_res.split()
+            index = version_words.index('UPPAAL')  # Version is the word after UPPAAL
+            version = version_words[index + 1]
 
-        res = self.cmd(f'{self.__verifyta_path} -v')
-        index = res.split(' ').index('UPPAAL')  # Version is the word after UPPAAL
-        return int(res.split(' ')[index + 1].split('.')[0])
+            help_res = self.__run_probe([verifyta_path, '-h'])
+            options = []
+            for option in re.findall(r'^\s*(-\w)?(?:[\s,]*\[?\s*(--[\w-]+))?', help_res, flags=re.MULTILINE):
+                options += [o for o in option if o and o not in options]
+
+            res = VerifytaCapabilities(version, options)
+            if key is not None:
+                self.__capabilities_cache[key] = res
+                content = load_json(cache_path)
+                content[key] = res.to_dict()
+                dump_json(cache_path, content)
+            return res
+
+    @staticmethod
+    def __run_probe(argv: List[str]) -> str:
+        """Run a probing command, and return `stdout + stderr`, or empty string if the program can not be run.
+        """
+        try:
+            cmd_res = subprocess.run(argv, capture_output=True)
+        except OSError:
+            return ''
+        # 如果报错里面有 \xcf\xB5\xCD\xB3，是中文gbk系统的问题，大概率解码后是"路径不存在"。
+        res = cmd_res.stdout + cmd_res.stderr if cmd_res.stderr is not None else cmd_res.stdout
+        return res.decode('utf-8', errors='replace')
 
     def set_verifyta_path(self, verifyta_path: str) -> None:
         """Set the verifyta path before using pyuppaal.
@@ -69,6 +323,9 @@ class Verifyta:
         1. run cmd with `verifyta_path -v`;
         2. check whether `'UPPAAL' in res`.
 
+        The probed version and capabilities are cached on disk (see `pyuppaal.cache`) and keyed by the path, size and mtime of the binary,
+        so that setting the same binary again, e.g., in worker processes, does not run `verifyta`.
+
         Example paths:
 
         1. Windows: path_to_uppaal\\bin-Windows\\verifyta.exe
@@ -85,26 +342,12 @@ class Verifyta:
             None
         """
         # check validation of verifyta
-        cmd = f'{verifyta_path} -v'
-
-        cmd_res = subprocess.run(cmd, shell=True, capture_output=True)
-        # if cmd_res.returncode == 0:
-        #     pass
-        # else:
-        #     # 如果报错里面有 \xcf\xB5\xCD\xB3，是中文gbk系统的问题，大概率解码后是"路径不存在"。
-        #     # if "\\xcf\\xb5\\xcd\\xb3" in str(cmd_res):
-        #     #     print("Encounter Encode Error. Probable means 'File Not Found' in your language.")
-        #     raise ValueError(f"Verifyta Not Found!. \nCommand: {cmd}\nErr: {str(cmd_res.stderr)}")
-
-        # UPPAAL5 will get noneType in stderr.
-        if cmd_res.stderr is not None:
-            cmd_res = str(cmd_res.stdout + cmd_res.stderr)
-        else:
-            cmd_res = str(cmd_res.stdout)
+        capabilities = self.__probe_capabilities(verifyta_path)
 
-        if 'UPPAAL' in cmd_res:
+        if capabilities is not None:
             self.__verifyta_path = verifyta_path
-            self.__verifyta_version = self.get_uppaal_version()
+            self.__capabilities = capabilities
+            self.__verifyta_version = capabilities.major_version
         else:
             example_info = "======== Example Paths ========" \
                            "\nWindows: absolute_path_to_uppaal\\bin-Windows\\verifyta.exe" \
@@ -113,11 +356,14 @@ class Verifyta:
             raise ValueError(
                 f"Invalid verifyta_path: {verifyta_path}.\n{example_info} \nVerifyta Not Found!.")
 
-    def cmd(self, cmd: str, timeout: float = None) -> str:
+    def cmd(self, cmd: str | List[str] | VerifytaCommand, timeout: float = None) -> str:
         """Run common command with cmd, you can easily ignore the verifyta path.
 
+        `List[str]` and `VerifytaCommand` are run without shell, which is faster and is used by `verify` and `compile_to_if`.
+        `str` is run with shell.
+
         Args:
-            cmd (str): command to run.
+            cmd (str | List[str] | VerifytaCommand): command to run.
             timeout (float, optional): timeout in seconds for the command execution.
 
         Raises:
@@ -129,24 +375,90 @@ class Verifyta:
             str: the output of the input command.
         """
         # check for validation of verifyta path
-        if not Verifyta().verifyta_path:
-            error_info = 'Verifyta path is not set.'
-            error_info += ' Please use "pyuppaal.set_verifyta_path(verifyta_path: str)" to set the path of verifyta.'
-            raise ValueError(error_info)
+        self.__check_verifyta_path()
 
-        # Run the command and check for errors. Use shell because we set env var and && is used.
-        # macos and windows use shell, linux not use
+        if isinstance(cmd, list):
+            cmd = VerifytaCommand(cmd)
+
+        if isinstance(cmd, VerifytaCommand):
+            group = getattr(self.__thread_local, 'group', None)
+            if group is None:
+                group = VerifytaProcessGroup()
+            stdout_file = open(cmd.stdout_path, 'wb') if cmd.stdout_path is not None else None
+            try:
+                proc = group.popen(cmd.argv, env=cmd.env, text=True,
+                                   stdout=stdout_file if stdout_file is not None else subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+                try:
+                    stdout, stderr = proc.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired as e:
+                    proc.kill()
+                    proc.communicate()
+                    raise TimeoutError(f"Command '{cmd}' timed out after {timeout} seconds") from e
+                finally:
+                    group.discard(proc)
+            finally:
+                if stdout_file is not None:
+                    stdout_file.close()
+            if group.killed:
+                raise CancelledError(str(cmd))
+            return self.__check_cmd_res(str(cmd), stdout, stderr)
+
+        # Run the command with shell, because env var and && may be used.
         try:
             cmd_res = subprocess.run(cmd, shell=True, capture_output=True, text=True, check=False, timeout=timeout)
         except subprocess.TimeoutExpired as e:
             raise TimeoutError(f"Command '{cmd}' timed out after {timeout} seconds") from e
 
-        if cmd_res.stderr is not None and cmd_res.stderr != '':
-            if "Writing example trace to" in cmd_res.stderr:
+        return self.__check_cmd_res(cmd, cmd_res.stdout, cmd_res.stderr)
+
+    @contextmanager
+    def join_process_group(self, group: VerifytaProcessGroup) -> Iterator[VerifytaProcessGroup]:
+        """Start the `verifyta` processes of `cmd` in current thread in `group`, so that they are killed by `group.kill()`.
+        A command in a killed group raises `CancelledError`.
+
+        Args:
+            group (VerifytaProcessGroup): the process group.
+
+        Yields:
+            VerifytaProcessGroup: `group`.
+        """
+        previous = getattr(self.__thread_local, 'group', None)
+        self.__thread_local.group = group
+        try:
+            yield group
+        finally:
+            self.__thread_local.group = previous
+
+    def __check_verifyta_path(self) -> None:
+        """Raise ValueError if verifyta_path is not set.
+        """
+        if not Verifyta().verifyta_path:
+            error_info = 'Verifyta path is not set.'
+            error_info += ' Please use "pyuppaal.set_verifyta_path(verifyta_path: str)" to set the path of verifyta.'
+            raise ValueError(error_info)
+
+    @staticmethod
+    def __check_cmd_res(cmd: str, stdout: str, stderr: str) -> str:
+        """Classify the outputs of a finished command, raise if `stderr` is not as expected.
+
+        Args:
+            cmd (str): the command that has been run, only used for error messages.
+            stdout (str): stdout of the command.
+            stderr (str): stderr of the command.
+
+        Raises:
+            ValueError: if cmd got stderr and not as expected.
+
+        Returns:
+            str: `stderr + stdout` of the command.
+        """
+        if stderr is not None and stderr != '':
+            if "Writing example trace to" in stderr:
                 pass
-            elif "Writing counter example" in cmd_res.stderr:
+            elif "Writing counter example" in stderr:
                 pass
-            elif cmd_res.stdout is not None and "Showing" in cmd_res.stdout:
+            elif stdout is not None and "Showing" in stdout:
                 # cmd:
                 #   set UPPAAL_COMPILE_ONLY=&&c:\users\taco\documents\github\pyuppaal_hcps\src\pyuppaal\../../bin/uppaal64-4.1.26\bin-Windows/verifyta.exe C:\Users\Taco\Documents\GitHub\pyuppaal_hcps\src\test_unit\demo1.xml -t 1 -o 0
                 # stdout:
@@ -173,103 +485,93 @@ class Verifyta:
                 # ( P1.C )
                 # P1.t=0 #depth=1
                 pass
-            elif "[warning] Strict invariant." in cmd_res.stderr:
+            elif "[warning] Strict invariant." in stderr:
                 # TODO: Maybe change the input/observation clk name to avoid this.
                 pass
             else:
-                if "license key is not set" in cmd_res.stderr:
+                if "license key is not set" in stderr:
                     raise ValueError(
-                        f"UPPAAL License Not set. Register on `https://uppaal.veriaal.dk/academic.html` and set the key via `verifyta --lease 168 --key YOUR_LICENSE_KEY`.\n Note: You may need to modify `verifyta` to the real verifyta path. \n cmd: {''.join(cmd)}\nErr: {cmd_res.stderr}")
-                if "Failed to retrieve" in cmd_res.stderr:
-                    raise ValueError(f"UPPAAL License Error. Check Internect connection and try again may help. \n cmd: {''.join(cmd)}\nErr: {cmd_res.stderr}")
-                raise ValueError(f"Command: {''.join(cmd)}\nErr: {cmd_res.stderr}")
-        res = cmd_res.stderr
+                        f"UPPAAL License Not set. Register on `https://uppaal.veriaal.dk/academic.html` and set the key via `verifyta --lease 168 --key YOUR_LICENSE_KEY`.\n Note: You may need to modify `verifyta` to the real verifyta path. \n cmd: {''.join(cmd)}\nErr: {stderr}")
+                if "Failed to retrieve" in stderr:
+                    raise ValueError(f"UPPAAL License Error. Check Internect connection and try again may help. \n cmd: {''.join(cmd)}\nErr: {stderr}")
+                raise ValueError(f"Command: {''.join(cmd)}\nErr: {stderr}")
+        res = stderr if stderr is not None else ''
 
-        if cmd_res.stdout is not None:
-            res = res + cmd_res.stdout
+        if stdout is not None:
+            res = res + stdout
 
         return res
 
-    def compile_to_if(self, model_path: str) -> str:
-        """Compile the `.xml` model_path to a `.if` file and return the content of the `.if` file.
+    def compile_command(self, model_path: str) -> VerifytaCommand:
+        """Build the command that compiles the `.xml` model_path to a `.if` file next to it.
 
         Args:
             model_path (str): `.xml` model file.
 
         Raises:
-            FileNotFoundError: `model_path` not found.
             ValueError: `model_path` is not a `.xml`.
 
         Returns:
-            str: path to `.if` file.
+            VerifytaCommand: the command, whose `stdout_path` is the `.if` file.
         """
-        if not os.path.exists(model_path):
-            error_info = f'model_path {model_path} not found.'
-            raise FileNotFoundError(error_info)
+        self.__check_verifyta_path()
         file_path, file_ext = os.path.splitext(model_path)
 
         if file_ext != '.xml':
             error_info = f'model_path {model_path} should be xml format file.'
             raise ValueError(error_info)
 
-        if_path = file_path + '.if'
         # set uppaal environment variables
-        # 设置命令行环境保证uppaal能够产生正确的.if文件，后半部分保证文件以UTF-8编码，进而保证lf结尾。
-        if self.__operating_system == "Windows":
-            cmd_env = "set UPPAAL_COMPILE_ONLY=1 && set PSDefaultParameterValues['Out-File:Encoding']='Default'"
-            cmd = f'{cmd_env} && {self.__verifyta_path} {model_path} > {if_path}'
-        else:
-            cmd_env = "UPPAAL_COMPILE_ONLY=1"
-            cmd = f'{cmd_env} {self.__verifyta_path} {model_path} > {if_path}'
-        self.cmd(cmd=cmd)
+        # stdout is written to the .if file by bytes, which keeps the lf line endings on all platforms.
+        env = dict(os.environ, UPPAAL_COMPILE_ONLY='1')
+        return VerifytaCommand([self.__verifyta_path, model_path], env=env, stdout_path=file_path + '.if')
+
+    def compile_to_if(self, model_path: str) -> str:
+        """Compile the `.xml` model_path to a `.if` file and return the content of the `.if` file.
 
-        return if_path
+        Args:
+            model_path (str): `.xml` model file.
+
+        Raises:
+            FileNotFoundError: `model_path` not found.
+            ValueError: `model_path` is not a `.xml`.
 
-    def verify(self, model_path: str, trace_path: str = None, verify_options: str = "-t 1", keep_tmp_file=True, timeout: float = None) -> str:
+        Returns:
+            str: path to `.if` file.
         """
-        Verify model and return the verify result as list.
-        This is designed for advanced UPPAAL user.
+        if not os.path.exists(model_path):
+            error_info = f'model_path {model_path} not found.'
+            raise FileNotFoundError(error_info)
 
-        Verify models and return the verify results as list.
-        For `trace_path` param, both `.xtr` and `.xml`(DBM) files are supported.
-        WARNING: Note that `-f xx.xtr` or `-X xx.xml` should be used together with `-t` options, otherwise you may fail to save the path files.
-        WARNING: `-t` option must be set for `verify_options`, which is set by default `verify_options = '-t 1'`(shortest), otherwise counter-example file may not be created.
+        cmd = self.compile_command(model_path)
+        cache, key, hit = self.__compile_cache_get(cmd)
+        if not hit:
+            self.cmd(cmd=cmd)
+            if cache is not None:
+                cache.put(key, cmd.stdout_path)
 
-        Examples:
-            >>> Verifyta().set_verifyta_path(VERIFYTA_PATH)
-            >>> model_path = os.path.join(ROOT_DIR, 'demo1.xml')
-            >>> trace_path = os.path.join(ROOT_DIR, 't1.xtr')
-            >>> Verifyta().verify(model_path, trace_path=trace_path, verify_options='-t 1 -o 0')
+        return cmd.stdout_path
+
+    def __trace_option(self, model_path: str, trace_path: str | None, verify_options: str | None) -> Tuple[str, List[str], str]:
+        """Resolve `trace_path` and the trace option (`-f` or `-X`) passed to `verifyta`.
 
         Args:
             model_path (str): model path to be verified.
-            trace_path (str, optional): target trace path, both `.xtr` and `.xml`(DBM) are supported. 
-                Defaults to None, which will create `.xtr` path.
-            verify_options (str, optional): verify options that are proveded by `verifyta`, and you can get details by run `verifyta -h` in your terminal.
-                Defaults to '-t 1', returning the shortest trace.
-            keep_tmp_file (bool, optional): whether to keep temporary trace files. Defaults to True.
-            timeout (float, optional): timeout in seconds for the verification command execution.
+            trace_path (str | None): target trace path, `None` for the default trace path next to `model_path`.
+            verify_options (str | None): verify options, `-t 1` will be added if `-t` is not set.
 
         Raises:
             ValueError: if tracer file is not `xml` or `xtr`.
-            TimeoutError: if verification command times out.
 
         Returns:
-            str: terminal verify results for `.xml` model.
+            Tuple[str, List[str], str]: resolved `trace_path`, trace option such as `['-f', 'demo']`, and verify options.
         """
-
-        if not isinstance(model_path, str):
-            raise ValueError(f'List input is not supported anymore, please use for loop. mdel_path: {model_path}, verify_options: {verify_options}')
-
         if verify_options is None:
             verify_options = "-t 1"
 
         # 构造options然后让self.verify()处理任务
         if '-t ' not in verify_options:
             verify_options += ' -t 1'
-        # model_path existence will be checked in self.verity()
-        # check trace_path format
-        option = ''
 
         # check whether trace_path is None
         if Verifyta().__verifyta_version == 4:
@@ -277,37 +579,218 @@ class Verifyta:
                 trace_path = os.path.splitext(model_path)[0] + '.xtr'
 
             if trace_path.endswith('.xml'):
-                option = f"-X {trace_path.replace('.xml', '')} {verify_options}"
+                trace_option = ['-X', trace_path.replace('.xml', '')]
             elif trace_path.endswith('.xtr'):
-                option = f"-f {trace_path.replace('.xtr', '')} {verify_options}"
+                trace_option = ['-f', trace_path.replace('.xtr', '')]
             else:
                 error_info = f'trace_path should end with ".xml" or ".xtr", current trace_path = {trace_path}.'
                 raise ValueError(error_info)
         else:
             if trace_path is None:
                 trace_path = os.path.splitext(model_path)[0] + '_xtr'
-                option = f"-f {trace_path} {verify_options}"
+                trace_option = ['-f', trace_path]
             elif trace_path.endswith('.xml'):
-                option = f"-X {trace_path.replace('.xml', '_xtr')} {verify_options}"
+                trace_option = ['-X', trace_path.replace('.xml', '_xtr')]
             elif trace_path.endswith('.xtr'):
-                option = f"-f {trace_path.replace('.xtr', '_xtr')} {verify_options}"
+                trace_option = ['-f', trace_path.replace('.xtr', '_xtr')]
             elif trace_path.endswith("_xtr"):
-                option = f"-f {trace_path} {verify_options}"
+                trace_option = ['-f', trace_path]
             else:
                 error_info = f'trace_path should end with ".xml" or ".xtr", current trace_path = {trace_path}.'
                 raise ValueError(error_info)
+        return trace_path, trace_option, verify_options
+
+    def verify_many(self, jobs: Iterable[str | tuple], max_workers: int = None,
+                    return_exceptions: bool = False, parse_result: bool = False) -> Iterator[Tuple[int, str | VerificationResult | Exception]]:
+        """Verify many models concurrently, and yield `(job_index, verify_result)` in the order the jobs complete.
+
+        At most `max_workers` `verifyta` processes run at the same time. Each job is run like `Verifyta().verify`,
+        and its result is classified the same way as `Verifyta().cmd`.
+        If the generator is closed or an error is raised, the pending jobs are cancelled and the running `verifyta` processes are killed.
+
+        Examples:
+            >>> jobs = [('demo1.xml', None, '-t 1 -o 0', 10), ('demo2.xml', 'demo2.xtr'), 'demo3.xml']
+            >>> for i, res in Verifyta().verify_many(jobs, max_workers=8):
+            >>>     print(jobs[i], 'satisfied' in res)
+
+        Args:
+            jobs (Iterable[str | tuple]): `model_path` or tuples of `(model_path, trace_path, verify_options, timeout)`,
+                where the trailing items can be omitted and take the defaults of `Verifyta().verify`.
+            max_workers (int, optional): the maximum number of concurrent `verifyta` processes. Defaults to None, using `os.cpu_count()`.
+            return_exceptions (bool, optional): yield the exception of a failed job instead of raising it. Defaults to False.
+            parse_result (bool, optional): yield `VerificationResult` instead of the terminal output. Defaults to False.
+
+        Raises:
+            ValueError: if verifyta_path is not set, or a job is invalid, or a job got unexpected stderr.
+            FileNotFoundError: if `model_path` of a job is not found.
+            TimeoutError: if a job times out.
+
+        Yields:
+            Tuple[int, str | VerificationResult | Exception]: the index of the job in `jobs`, and its terminal verify result (or exception if `return_exceptions`).
+        """
+        self.__check_verifyta_path()
+
+        # resolve all jobs before starting any process, so that invalid jobs fail fast
+        cmds: List[Tuple[VerifytaCommand, float]] = []
+        for job in jobs:
+            if isinstance(job, str):
+                job = (job,)
+            model_path, trace_path, verify_options, timeout = tuple(job) + (None, None, None, None)[len(job):]
+            cmds.append((self.verify_command(model_path, trace_path, verify_options), timeout))
+
+        running = set()
+        lock = threading.Lock()
+        cancelled = threading.Event()
+
+        def run(cmd: VerifytaCommand, timeout: float) -> str:
+            cache, key, res = self.__cache_get(cmd)
+            if res is not None:
+                return VerificationResult(res) if parse_result else res
+            with lock:
+                if cancelled.is_set():
+                    raise CancelledError(str(cmd))
+                proc = subprocess.Popen(cmd.argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=cmd.env)
+                running.add(proc)
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                proc.kill()
+                proc.communicate()
+                raise TimeoutError(f"Command '{cmd}' timed out after {timeout} seconds") from e
+            finally:
+                with lock:
+                    running.discard(proc)
+            res = self.__check_cmd_res(str(cmd), stdout, stderr)
+            if cache is not None:
+                self.__cache_put(cache, key, res, cmd)
+            return VerificationResult(res) if parse_result else res
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {executor.submit(run, cmd, timeout): i for i, (cmd, timeout) in enumerate(cmds)}
+        try:
+            for future in as_completed(futures):
+                try:
+                    res = future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    res = e
+                yield futures[future], res
+        finally:
+            # cancel pending jobs and kill the running verifyta processes
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+            with lock:
+                for proc in running:
+                    proc.kill()
+            executor.shutdown(wait=True)
+
+    def verify_command(self, model_path: str, trace_path: str = None, verify_options: str = "-t 1") -> VerifytaCommand:
+        """Build the command of `verify`, which can be run by `Verifyta().cmd` without shell.
+
+        Examples:
+            >>> cmd = Verifyta().verify_command('demo.xml', verify_options='-t 1 -o 0')
+            >>> cmd.argv
+            ['path/to/verifyta', 'demo.xml', '-f', 'demo_xtr', '-t', '1', '-o', '0']
+            >>> res = Verifyta().cmd(cmd)
+
+        Args:
+            model_path (str): model path to be verified.
+            trace_path (str, optional): target trace path, both `.xtr` and `.xml`(DBM) are supported. Defaults to None.
+            verify_options (str, optional): verify options that are proveded by `verifyta`. Defaults to '-t 1'.
+
+        Raises:
+            ValueError: if tracer file is not `xml` or `xtr`.
+            FileNotFoundError: if `model_path` is not found.
+
+        Returns:
+            VerifytaCommand: the verify command.
+        """
+        return self.__verify_command(model_path, trace_path, verify_options)[1]
+
+    def __verify_command(self, model_path: str, trace_path: str | None, verify_options: str | None) -> Tuple[str, VerifytaCommand]:
+        """Build the command of `verify`, and return the resolved `trace_path` together with the command.
+        """
+        self.__check_verifyta_path()
+        trace_path, trace_option, verify_options = self.__trace_option(model_path, trace_path, verify_options)
 
         # check model_path exist
         if not os.path.exists(model_path):
             error_info = f'model_path {model_path} not found.'
             raise FileNotFoundError(error_info)
 
-        # set uppaal environment variables
-        cmd_env = 'set UPPAAL_COMPILE_ONLY=' if (self.__operating_system == "Windows") else "UPPAAL_COMPILE_ONLY="
+        argv = [self.__verifyta_path, model_path] + trace_option + self.__split_options(verify_options)
+        # verifyta should not run in compile only mode
+        env = {k: v for k, v in os.environ.items() if k != 'UPPAAL_COMPILE_ONLY'}
+        return trace_path, VerifytaCommand(argv, env=env)
+
+    def __split_options(self, options: str) -> List[str]:
+        """Split verify options such as `'-t 1 -o 0'` into argv items.
+        """
+        return shlex.split(options, posix=self.__operating_system != "Windows")
+
+    def verify(self, model_path: str, trace_path: str = None, verify_options: str = "-t 1", keep_tmp_file=True, timeout: float = None,
+               parse_result: bool = False) -> str | VerificationResult:
+        """
+        Verify model and return the verify result as list.
+        This is designed for advanced UPPAAL user.
+
+        Verify models and return the verify results as list.
+        For `trace_path` param, both `.xtr` and `.xml`(DBM) files are supported.
+        WARNING: Note that `-f xx.xtr` or `-X xx.xml` should be used together with `-t` options, otherwise you may fail to save the path files.
+        WARNING: `-t` option must be set for `verify_options`, which is set by default `verify_options = '-t 1'`(shortest), otherwise counter-example file may not be created.
+
+        Examples:
+            >>> Verifyta().set_verifyta_path(VERIFYTA_PATH)
+            >>> model_path = os.path.join(ROOT_DIR, 'demo1.xml')
+            >>> trace_path = os.path.join(ROOT_DIR, 't1.xtr')
+            >>> Verifyta().verify(model_path, trace_path=trace_path, verify_options='-t 1 -o 0')
+
+        Args:
+            model_path (str): model path to be verified.
+            trace_path (str, optional): target trace path, both `.xtr` and `.xml`(DBM) are supported. 
+                Defaults to None, which will create `.xtr` path.
+            verify_options (str, optional): verify options that are proveded by `verifyta`, and you can get details by run `verifyta -h` in your terminal.
+                Defaults to '-t 1', returning the shortest trace.
+            keep_tmp_file (bool, optional): whether to keep temporary trace files. Defaults to True.
+            timeout (float, optional): timeout in seconds for the verification command execution.
+            parse_result (bool, optional): return a `VerificationResult` with the verdict, trace path and statistics of each query,
+                instead of the terminal output. Statistics are reported with `-u` in `verify_options`. Defaults to False.
+
+        Raises:
+            ValueError: if tracer file is not `xml` or `xtr`.
+            TimeoutError: if verification command times out.
 
-        # 构造命令
-        cmd = f'{cmd_env}&&{self.__verifyta_path} {model_path} {option}'
-        res = self.cmd(cmd, timeout=timeout)
+        Returns:
+            str | VerificationResult: terminal verify results for `.xml` model, or the parsed result if `parse_result`.
+        """
+
+        if not isinstance(model_path, str):
+            raise ValueError(f'List input is not supported anymore, please use for loop. mdel_path: {model_path}, verify_options: {verify_options}')
+
+        trace_path, cmd = self.__verify_command(model_path, trace_path, verify_options)
+        cache, key, res = self.__cache_get(cmd)
+        if res is None:
+            res = self.cmd(cmd, timeout=timeout)
+            if cache is not None:
+                self.__cache_put(cache, key, res, cmd)
+        return self.__verify_result(res, trace_path, keep_tmp_file, parse_result)
+
+    @staticmethod
+    def __verify_result(res: str, trace_path: str, keep_tmp_file: bool, parse_result: bool) -> str | VerificationResult:
+        """Remove the temporary trace files if required, and parse the terminal output if required.
+        """
+        if parse_result:
+            res = VerificationResult(res)
+            if not keep_tmp_file:
+                for query in res.queries:
+                    if query.trace_path is not None and os.path.exists(query.trace_path):
+                        os.remove(query.trace_path)
+                    query.trace_path = None
+            return res
 
         # remove tmp file
         if not keep_tmp_file:
@@ -316,3 +799,245 @@ class Verifyta:
                 os.remove(trace_path)
 
         return res
+
+    # region cache
+    def enable_cache(self, cache_dir: str = None, max_size: int = 1 << 30) -> VerifyCache:
+        """Cache the results of `verify`, `averify` and `verify_many` on disk, including the trace files.
+
+        A result is reused if the canonical model (including its queries), the verify options and the version of `verifyta` are the same.
+        The cache can be shared by concurrent processes. Note that results of randomized search orders are cached as well.
+
+        Args:
+            cache_dir (str, optional): directory of the cache. Defaults to None, using `verify` in the pyuppaal cache directory.
+            max_size (int, optional): maximum size of the cache in bytes, least recently used results are evicted. Defaults to 1 GiB.
+
+        Returns:
+            VerifyCache: the cache.
+        """
+        self.__verify_cache = VerifyCache(cache_dir, max_size)
+        return self.__verify_cache
+
+    def disable_cache(self) -> None:
+        """Stop caching the results of `verify`, the cached results on disk are kept.
+        """
+        self.__verify_cache = None
+
+    @property
+    def cache(self) -> VerifyCache | None:
+        """Current cache of verification results, None if not enabled.
+        """
+        return self.__verify_cache
+
+    def __cache_get(self, cmd: VerifytaCommand) -> Tuple[VerifyCache | None, str | None, str | None]:
+        """Look up a verify command in the cache.
+
+        Returns:
+            Tuple[VerifyCache | None, str | None, str | None]: the cache, the key, and the cached terminal output (None if missing).
+        """
+        cache = self.__verify_cache
+        if cache is None:
+            return None, None, None
+        # argv: verifyta, model_path, -f/-X, trace_prefix, *options
+        key = cache.key(cmd.argv[1], [cmd.argv[2]] + cmd.argv[4:], self.capabilities.version)
+        res = cache.get(key, cmd.argv[3])
+        if res is None:
+            # the trace files of a previous run would be stored as the traces of this run
+            trace_dir, trace_name = os.path.split(cmd.argv[3])
+            trace_pattern = re.compile(re.escape(trace_name) + r'-\d+(\.xtr|\.xml)?')
+            for file_name in os.listdir(trace_dir or '.'):
+                if trace_pattern.fullmatch(file_name):
+                    os.remove(os.path.join(trace_dir, file_name))
+        return cache, key, res
+
+    def __cache_put(self, cache: VerifyCache, key: str, res: str, cmd: VerifytaCommand) -> None:
+        """Store the terminal output of a verify command and its trace files, which are found by the numbers of the verified queries,
+        since UPPAAL 4.x does not report the trace files in stdout.
+        """
+        # argv: verifyta, model_path, -f/-X, trace_prefix, *options
+        trace_prefix = cmd.argv[3]
+        trace_paths = []
+        for query in VerificationResult(res).queries:
+            if cmd.argv[2] == '-X':
+                trace_path = f'{trace_prefix}-{query.index}.xml'
+            else:
+                trace_path = self.capabilities.trace_file(trace_prefix, query.index)
+            if os.path.exists(trace_path):
+                trace_paths.append(trace_path)
+        cache.put(key, res, trace_prefix, trace_paths)
+
+    def set_compile_cache(self, max_entries: int = 64, cache_dir: str = None) -> None:
+        """Set the cache of the `.if` files compiled by `compile_to_if`, which is disabled by default.
+        If the cache directory is not writable, the models are compiled as without the cache.
+
+        Examples:
+            >>> Verifyta().set_compile_cache()
+            >>> umodel.find_all_patterns()
+            >>> Verifyta().set_compile_cache(0)
+
+        Args:
+            max_entries (int, optional): maximum number of cached `.if` files, `0` disables the cache. Defaults to 64.
+            cache_dir (str, optional): directory of the cache. Defaults to None, using `if` in the pyuppaal cache directory.
+        """
+        self.__compile_cache = CompileCache(cache_dir, max_entries) if max_entries > 0 else None
+
+    @property
+    def compile_cache(self) -> CompileCache | None:
+        """Current cache of `.if` files, None if disabled.
+        """
+        return self.__compile_cache
+
+    def __compile_cache_get(self, cmd: VerifytaCommand) -> Tuple[CompileCache | None, str | None, bool]:
+        """Look up a compile command in the cache, and copy the cached `.if` file to `cmd.stdout_path` on a hit.
+
+        Returns:
+            Tuple[CompileCache | None, str | None, bool]: the cache, the key, and whether it is a hit.
+        """
+        cache = self.__compile_cache
+        if cache is None:
+            return None, None, False
+        # argv: verifyta, model_path
+        key = cache.key(cmd.argv[1], self.capabilities.version)
+        return cache, key, cache.get(key, cmd.stdout_path)
+    # endregion cache
+
+    # region asyncio
+    def set_async_limit(self, max_concurrency: int) -> None:
+        """Set the maximum number of `verifyta` processes that run at the same time through the coroutines,
+        such as `averify` and `acompile_to_if`. Defaults to `os.cpu_count()`.
+
+        Args:
+            max_concurrency (int): the maximum number of concurrent `verifyta` processes in each event loop, must >= 1.
+
+        Raises:
+            ValueError: if `max_concurrency` < 1.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f'max_concurrency must >= 1, current max_concurrency = {max_concurrency}.')
+        self.__async_limit = max_concurrency
+        # semaphores will be re-created with the new limit
+        self.__async_semaphores = weakref.WeakKeyDictionary()
+
+    def __async_semaphore(self) -> asyncio.Semaphore:
+        """The semaphore of the running event loop that limits the concurrent `verifyta` processes.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self.__async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.__async_limit)
+            self.__async_semaphores[loop] = semaphore
+        return semaphore
+
+    async def __arun(self, cmd: VerifytaCommand, timeout: float = None) -> str:
+        """Run `cmd` as a child process without shell, and classify the outputs like `Verifyta().cmd`.
+        The child process is killed if the coroutine is cancelled or times out.
+
+        Args:
+            cmd (VerifytaCommand): the command to run.
+            timeout (float, optional): timeout in seconds for the command execution.
+
+        Raises:
+            ValueError: if cmd got stderr and not as expected.
+            TimeoutError: if command execution times out.
+
+        Returns:
+            str: the output of the command.
+        """
+        async with self.__async_semaphore():
+            stdout_file = open(cmd.stdout_path, 'wb') if cmd.stdout_path is not None else None
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd.argv, env=cmd.env, stderr=asyncio.subprocess.PIPE,
+                    stdout=stdout_file if stdout_file is not None else asyncio.subprocess.PIPE)
+                try:
+                    stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+                except asyncio.TimeoutError as e:
+                    await self.__akill(proc)
+                    raise TimeoutError(f"Command '{cmd}' timed out after {timeout} seconds") from e
+                except asyncio.CancelledError:
+                    await self.__akill(proc)
+                    raise
+            finally:
+                if stdout_file is not None:
+                    stdout_file.close()
+
+        stdout = stdout.decode('utf-8', errors='replace') if stdout is not None else ''
+        stderr = stderr.decode('utf-8', errors='replace') if stderr is not None else ''
+        return self.__check_cmd_res(str(cmd), stdout, stderr)
+
+    @staticmethod
+    async def __akill(proc: asyncio.subprocess.Process) -> None:
+        """Kill the child process and reap it.
+        """
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await proc.wait()
+
+    async def acompile_to_if(self, model_path: str, timeout: float = None) -> str:
+        """Coroutine version of `compile_to_if`, the `.if` content is written directly by the child process.
+
+        Args:
+            model_path (str): `.xml` model file.
+            timeout (float, optional): timeout in seconds for the compilation.
+
+        Raises:
+            FileNotFoundError: `model_path` not found.
+            ValueError: `model_path` is not a `.xml`.
+            TimeoutError: if compilation times out.
+
+        Returns:
+            str: path to `.if` file.
+        """
+        if not os.path.exists(model_path):
+            error_info = f'model_path {model_path} not found.'
+            raise FileNotFoundError(error_info)
+
+        cmd = self.compile_command(model_path)
+        cache, key, hit = self.__compile_cache_get(cmd)
+        if not hit:
+            await self.__arun(cmd, timeout=timeout)
+            if cache is not None:
+                cache.put(key, cmd.stdout_path)
+        return cmd.stdout_path
+
+    async def averify(self, model_path: str, trace_path: str = None, verify_options: str = "-t 1", keep_tmp_file=True, timeout: float = None,
+                      parse_result: bool = False) -> str | VerificationResult:
+        """Coroutine version of `verify`, which does not block the event loop.
+
+        The number of concurrent `verifyta` processes is limited by `set_async_limit`.
+        If the coroutine is cancelled or times out, the `verifyta` process is killed.
+
+        Examples:
+            >>> res = await Verifyta().averify(model_path, verify_options='-t 1 -o 0', timeout=10)
+            >>> res = await asyncio.gather(*[Verifyta().averify(p) for p in model_paths])
+
+        Args:
+            model_path (str): model path to be verified.
+            trace_path (str, optional): target trace path, both `.xtr` and `.xml`(DBM) are supported.
+                Defaults to None, which will create `.xtr` path.
+            verify_options (str, optional): verify options that are proveded by `verifyta`. Defaults to '-t 1', returning the shortest trace.
+            keep_tmp_file (bool, optional): whether to keep temporary trace files. Defaults to True.
+            timeout (float, optional): deadline in seconds for the verification.
+            parse_result (bool, optional): return a `VerificationResult` instead of the terminal output. Defaults to False.
+
+        Raises:
+            ValueError: if tracer file is not `xml` or `xtr`.
+            TimeoutError: if verification times out.
+
+        Returns:
+            str | VerificationResult: terminal verify results for `.xml` model, or the parsed result if `parse_result`.
+        """
+        self.__check_verifyta_path()
+        if not isinstance(model_path, str):
+            raise ValueError(f'List input is not supported, please use asyncio.gather. mdel_path: {model_path}, verify_options: {verify_options}')
+
+        trace_path, cmd = self.__verify_command(model_path, trace_path, verify_options)
+        cache, key, res = self.__cache_get(cmd)
+        if res is None:
+            res = await self.__arun(cmd, timeout=timeout)
+            if cache is not None:
+                self.__cache_put(cache, key, res, cmd)
+        return self.__verify_result(res, trace_path, keep_tmp_file, parse_result)
+    # endregion asyncio
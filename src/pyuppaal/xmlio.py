@@ -0,0 +1,293 @@
+"""xmlio
+Serialize UPPAAL models to `.xml` files, and parse them.
+
+`write_pretty` writes the indented xml in one pass over the element tree, which gives the same output as
+writing the tree to a file, parsing it with `xml.dom.minidom` and calling `toprettyxml`, without the temporary file and the DOM.
+`tostring_leaf` and `tostring_node` give the same output without building the element tree, used by `Location.tostring`,
+`Edge.tostring` and `Template.tostring`.
+
+Models are parsed by `fromstring` and `iter_children`, with lxml if it is installed and `xml.etree.ElementTree` otherwise.
+The backend is selected once at import time, and can be forced by the environment variable `PYUPPAAL_XML_BACKEND`
+(`lxml` or `stdlib`). The parsed elements are only read, so both backends give the same models.
+"""
+from __future__ import annotations
+import io
+import os
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterable, Iterator, List, TextIO, Tuple
+
+# region backend
+BACKEND = os.environ.get('PYUPPAAL_XML_BACKEND', 'lxml')
+if BACKEND not in ('lxml', 'stdlib'):
+    raise ValueError(f"PYUPPAAL_XML_BACKEND should be 'lxml' or 'stdlib', got '{BACKEND}'.")
+_lxml_etree = None
+if BACKEND == 'lxml':
+    try:
+        # lxml 是可选依赖, 安装后用于加速解析
+        from lxml import etree as _lxml_etree
+    except ImportError:
+        BACKEND = 'stdlib'
+
+if _lxml_etree is not None:
+    # same as `xml.etree.ElementTree`: no comments or processing instructions in the tree, no external entities,
+    # and no limit on the size of text, e.g., the declarations of generated models
+    _LXML_OPTIONS = dict(remove_comments=True, remove_pis=True, resolve_entities=False, huge_tree=True)
+    _LXML_PARSER = _lxml_etree.XMLParser(**_LXML_OPTIONS)
+
+
+def fromstring(text: str | bytes) -> ET.Element:
+    """Parse an element or a document from a string with the selected backend.
+
+    Args:
+        text (str | bytes): the xml.
+
+    Returns:
+        ET.Element: the root element, which is a `lxml.etree._Element` with the lxml backend.
+    """
+    if _lxml_etree is None:
+        return ET.fromstring(text)
+    if isinstance(text, str):
+        # lxml does not accept strings with an encoding declaration
+        text = text.encode('utf-8')
+    return _lxml_etree.fromstring(text, _LXML_PARSER)
+
+# endregion backend
+
+XML_DECLARATION = '<?xml version="1.0" ?>'
+# xml declaration of `ET.ElementTree.write(path, encoding='utf-8', xml_declaration=True)`, used for models without indentation
+COMPACT_XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>"
+
+
+def _escape(data: str) -> str:
+    """Escape text and attribute values in the same way as `xml.dom.minidom`.
+    """
+    if '&' in data:
+        data = data.replace('&', '&amp;')
+    if '<' in data:
+        data = data.replace('<', '&lt;')
+    if '"' in data:
+        data = data.replace('"', '&quot;')
+    if '>' in data:
+        data = data.replace('>', '&gt;')
+    return data
+
+
+def _normalize(text: str | None) -> str | None:
+    """Normalize the text like a xml parser does, empty text is regarded as no text.
+    """
+    if not text:
+        return None
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _write_element(f: TextIO, element: ET.Element, indent: str, addindent: str) -> None:
+    f.write(f'{indent}<{element.tag}')
+    for key, value in element.attrib.items():
+        f.write(f' {key}="{_escape(value)}"')
+
+    text = _normalize(element.text)
+    if len(element) == 0:
+        if text is None:
+            f.write('/>\n')
+        else:
+            f.write(f'>{_escape(text)}</{element.tag}>\n')
+        return
+
+    f.write('>\n')
+    child_indent = indent + addindent
+    if text is not None:
+        f.write(f'{_escape(child_indent + text)}\n')
+    for child in element:
+        _write_element(f, child, child_indent, addindent)
+        tail = _normalize(child.tail)
+        if tail is not None:
+            f.write(f'{_escape(child_indent + tail)}\n')
+    f.write(f'{indent}</{element.tag}>\n')
+
+
+def write_pretty(element: ET.Element, f: TextIO, indent: int = 4) -> None:
+    """Write `element` as an indented xml document to the text file `f`.
+
+    Args:
+        element (ET.Element): root element, e.g., `UModel().Element`.
+        f (TextIO): target text file.
+        indent (int, optional): number of spaces per indentation level. Defaults to 4.
+    """
+    f.write(XML_DECLARATION + '\n')
+    _write_element(f, element, '', indent * ' ')
+
+
+def tostring_pretty(element: ET.Element, indent: int = 4) -> str:
+    """Serialize `element` as an indented xml document.
+
+    Args:
+        element (ET.Element): root element.
+        indent (int, optional): number of spaces per indentation level. Defaults to 4.
+
+    Returns:
+        str: the xml document.
+    """
+    f = io.StringIO()
+    write_pretty(element, f, indent)
+    return f.getvalue()
+
+
+def tostring_element(element: ET.Element, indent: int = 0, level: int = 0) -> str:
+    """Serialize `element` without xml declaration.
+
+    Args:
+        element (ET.Element): the element.
+        indent (int, optional): number of spaces per indentation level, `0` for no indentation like `ET.tostring`. Defaults to 0.
+        level (int, optional): indentation level of `element` in the document. Defaults to 0.
+
+    Returns:
+        str: the serialized element.
+    """
+    if indent == 0:
+        return ET.tostring(element, encoding='unicode')
+    f = io.StringIO()
+    _write_element(f, element, level * indent * ' ', indent * ' ')
+    return f.getvalue()
+
+
+def tostring_leaf(start: str, tag: str, text: str | None, indent: str | None) -> str:
+    """Serialize an element without children directly, which gives the same output as `tostring_element` on the element.
+
+    Args:
+        start (str): the start tag without `>`, whose attributes are already escaped, e.g., `'<label kind="guard" x="0" y="0"'`.
+        tag (str): tag of the element.
+        text (str | None): text of the element.
+        indent (str | None): indentation of the element, `None` for no indentation like `ET.tostring`.
+
+    Returns:
+        str: the serialized element.
+    """
+    if indent is None:
+        if text:
+            return f'{start}>{text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")}</{tag}>'
+        return f'{start} />'
+    text = _normalize(text)
+    if text is None:
+        return f'{indent}{start}/>\n'
+    return f'{indent}{start}>{_escape(text)}</{tag}>\n'
+
+
+def tostring_node(start: str, tag: str, children: List[str], indent: str | None) -> str:
+    """Serialize an element without text from its serialized children, see `tostring_leaf`.
+
+    Args:
+        start (str): the start tag without `>`.
+        tag (str): tag of the element.
+        children (List[str]): the children serialized with the indentation of `indent` plus one level.
+        indent (str | None): indentation of the element, `None` for no indentation.
+
+    Returns:
+        str: the serialized element.
+    """
+    if not children:
+        return tostring_leaf(start, tag, None, indent)
+    if indent is None:
+        return f'{start}>{"".join(children)}</{tag}>'
+    return f'{indent}{start}>\n{"".join(children)}{indent}</{tag}>\n'
+
+
+def write_document(f: TextIO, tag: str, children: Iterable[str], indent: int = 0, text: str = None,
+                   xml_declaration: bool = True) -> None:
+    """Write a document whose root element `tag` contains the serialized `children`,
+    which gives the same output as `write_pretty` (or `ET.ElementTree.write` if `indent` is `0`) on the whole tree.
+
+    Args:
+        f (TextIO): target text file.
+        tag (str): tag of the root element.
+        children (Iterable[str]): children serialized by `tostring_element(child, indent, level=1)`.
+        indent (int, optional): number of spaces per indentation level. Defaults to 0.
+        text (str, optional): text of the root element before the children. Defaults to None.
+        xml_declaration (bool, optional): whether to write the xml declaration. Defaults to True.
+    """
+    if indent == 0:
+        if xml_declaration:
+            f.write(f'{COMPACT_XML_DECLARATION}\n')
+        f.write(f'<{tag}>')
+        if text:
+            f.write(text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;'))
+        for child in children:
+            f.write(child)
+        f.write(f'</{tag}>')
+        return
+
+    text = _normalize(text)
+    if xml_declaration:
+        f.write(f'{XML_DECLARATION}\n')
+    f.write(f'<{tag}>\n')
+    if text is not None:
+        f.write(f'{_escape(indent * " " + text)}\n')
+    for child in children:
+        f.write(child)
+    f.write(f'</{tag}>\n')
+
+
+def split_elements(data: bytes, tag: str) -> Tuple[bytes, List[bytes]]:
+    """Cut the elements `tag` out of the xml document `data` without parsing them, e.g., the templates of a large model.
+    The elements must not be nested, and `<tag` must not appear in comments.
+
+    Args:
+        data (bytes): the xml document.
+        tag (str): tag of the elements.
+
+    Returns:
+        Tuple[bytes, List[bytes]]: the document without the elements, and the elements in order.
+    """
+    start_tag = f'<{tag}'.encode()
+    end_tag = f'</{tag}>'.encode()
+    rest: List[bytes] = []
+    elements: List[bytes] = []
+    pos = 0
+    start = data.find(start_tag)
+    while start != -1:
+        after = data[start + len(start_tag):start + len(start_tag) + 1]
+        if after not in (b'>', b' ', b'\t', b'\n', b'\r'):
+            # another tag with the same prefix, e.g., <templates>
+            start = data.find(start_tag, start + 1)
+            continue
+        end = data.find(end_tag, start)
+        if end == -1:
+            raise ValueError(f'{start_tag.decode()}> at byte {start} is not closed.')
+        end += len(end_tag)
+        rest.append(data[pos:start])
+        elements.append(data[start:end])
+        pos = end
+        start = data.find(start_tag, pos)
+    rest.append(data[pos:])
+    return b''.join(rest), elements
+
+
+def iter_children(source: str | BinaryIO) -> Iterator[ET.Element]:
+    """Parse the xml document incrementally with the selected backend, and yield each child of the root element once it is parsed,
+    e.g., `<declaration>`, `<template>`, `<system>` and `<queries>` of a model.
+    A yielded element is removed from the root afterwards, so the memory is bounded by the largest child instead of the document.
+
+    Args:
+        source (str | BinaryIO): path or binary file of the xml document.
+
+    Yields:
+        ET.Element: the children of the root element, in order.
+    """
+    if _lxml_etree is None:
+        events = ET.iterparse(source, events=('start', 'end'))
+    else:
+        events = _lxml_etree.iterparse(source, events=('start', 'end'), **_LXML_OPTIONS)
+    root = None
+    depth = 0
+    for event, elem in events:
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield elem
+            # the finished child is the only child of root
+            root.remove(elem)
@@ -16,7 +16,9 @@ import os
 # from symbol import simple_stmt
 import pyuppaal
 from pyuppaal import UModel, Verifyta
+from pyuppaal.mytree import SuffixMemo
 from typing import List
+from itertools import product
 # import time
 
 pyuppaal.DeveloperTools.set_verifyta_path_dev()
@@ -149,6 +151,101 @@ def test_diagnosibility():  # This test is based on the toy model.
     assert res_diagosable[0] == True and res_not_diagnosable[0] == False
 
 
+def test_diagnosibility_parallel():
+    """checking the suffixes in parallel gives the same results and counterexample as checking them one by one.
+    """
+    sigma_o = ['a', 'b', 'c', 'action']
+    sigma_un = ['f']
+    n = 3
+    for model_name in ['toy_model_diagnosable.xml', 'toy_model_not_diagnosable.xml']:
+        u = UModel(bring_to_root(model_name))
+        serial = u.fault_diagnosability(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un, keep_tmp_file=keep_tmp_file)
+        parallel = u.fault_diagnosability(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un, keep_tmp_file=keep_tmp_file,
+                                          max_workers=4)
+        assert parallel[0] == serial[0]
+        assert str(parallel[1]) == str(serial[1])
+
+
+def test_diagnosibility_optimized():
+    """pruning the invalid prefixes gives the same results as checking all suffixes.
+    """
+    sigma_o = ['a', 'b', 'c', 'action']
+    sigma_un = ['f']
+    n = 3
+    for model_name, diagnosable in [('toy_model_diagnosable.xml', True), ('toy_model_not_diagnosable.xml', False)]:
+        u = UModel(bring_to_root(model_name))
+        serial = u.fault_diagnosability(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un, keep_tmp_file=keep_tmp_file)
+        optimized = u.fault_diagnosability_optimized(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un,
+                                                     keep_tmp_file=keep_tmp_file, return_stats=True)
+        assert serial[0] == diagnosable
+        assert optimized[0] == diagnosable
+        assert (optimized[1] is None) == diagnosable
+        assert optimized[2].verifier_calls > 0
+        if model_name == 'toy_model_diagnosable.xml':
+            # `c` is only observed before the fault and `action` is never sent, so their subtrees are pruned
+            assert optimized[2].pruned_prefixes > 0 and optimized[2].pruned_suffixes > 0
+
+
+def test_valid_suffixes():
+    """checking the suffixes in batches gives the same results as checking them one by one.
+    """
+    sigma_o = ['a', 'b', 'c', 'action']
+    sigma_un = ['f']
+    n = 3
+    # in both toy models, the observations after `f` are `a (a | b a)*`, `c` is only sent before `f`, and `action` is never sent
+    valid = [['a'], ['a', 'a'], ['a', 'b'], ['a', 'a', 'a'], ['a', 'a', 'b'], ['a', 'b', 'a']]
+    suffixes = [list(suffix) for length in range(1, n + 1) for suffix in product(sigma_o, repeat=length)]
+    for model_name in ['toy_model_diagnosable.xml', 'toy_model_not_diagnosable.xml']:
+        u = UModel(bring_to_root(model_name))
+        is_valid = u.valid_suffixes('f', suffixes, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file)
+        assert [suffix for suffix, v in zip(suffixes, is_valid) if v] == valid
+        assert is_valid.count(False) == len(suffixes) - len(valid)
+
+    for model_name in ['toy_model_diagnosable.xml', 'toy_model_not_diagnosable.xml']:
+        u = UModel(bring_to_root(model_name))
+        serial = u.fault_diagnosability(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un, keep_tmp_file=keep_tmp_file)
+        batched = u.fault_diagnosability(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un, keep_tmp_file=keep_tmp_file,
+                                         batch_size=100)
+        assert batched[0] == serial[0]
+        assert str(batched[1]) == str(serial[1])
+
+def test_diagnosibility_increasing():
+    """the smallest n reuses the verdicts of the smaller n, and agrees with checking each n.
+    """
+    sigma_o = ['a', 'b', 'c', 'action']
+    sigma_un = ['f']
+    u = UModel(bring_to_root('toy_model_diagnosable.xml'))
+    memo = SuffixMemo()
+    # the diagnosable toy model is 3 but not 2 diagnosable
+    assert u.fault_diagnosability_increasing('f', 3, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file, memo=memo) == (3, None)
+    assert not u.fault_diagnosability('f', 2, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file)[0]
+    assert u.fault_diagnosability('f', 3, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file)[0]
+    # all verdicts are in the memo
+    stats = u.fault_diagnosability_optimized('f', 3, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file, return_stats=True, memo=memo)[2]
+    assert stats.verifier_calls == 0
+
+    u = UModel(bring_to_root('toy_model_not_diagnosable.xml'))
+    res = u.fault_diagnosability_increasing('f', 3, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file, memo=memo)
+    assert res[0] is None and res[1] is not None
+    assert not u.fault_diagnosability('f', 3, sigma_o, sigma_un, keep_tmp_file=keep_tmp_file)[0]
+
+def test_diagnosibility_twin():
+    """one verification of the twin plant gives the same results as checking the suffixes,
+    on the toy models, which are accepted by both (untimed, without committed locations or variables).
+    """
+    sigma_o = ['a', 'b', 'c', 'action']
+    sigma_un = ['f']
+    # the diagnosable toy model is 3 but not 2 diagnosable
+    expected = {('toy_model_diagnosable.xml', 2): False, ('toy_model_diagnosable.xml', 3): True,
+                ('toy_model_not_diagnosable.xml', 2): False, ('toy_model_not_diagnosable.xml', 3): False}
+    for (model_name, n), diagnosable in expected.items():
+        u = UModel(bring_to_root(model_name))
+        serial = u.fault_diagnosability(fault='f', n=n, sigma_o=sigma_o, sigma_un=sigma_un, keep_tmp_file=keep_tmp_file)
+        twin = u.fault_diagnosability_twin(fault='f', n=n, sigma_o=sigma_o, keep_tmp_file=keep_tmp_file)
+        assert serial[0] == diagnosable
+        assert twin[0] == diagnosable
+        assert (twin[1] is None) == twin[0]
+
 def test_identification():  # This test is based on the EPS model.
     sigma_f: List[str] = ['fault_relay1_stuck_on', 'fault_relay1_stuck_off',
                           'fault_relay2_stuck_on', 'fault_relay2_stuck_off',
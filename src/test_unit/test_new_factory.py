@@ -231,3 +231,74 @@ def test_template():
     simplified_temp_txt = temp_from_xml.xml.replace("\n", "").replace(" ", "")
     simplified_txt = txt_temp.replace("\n", "").replace("\t", "").replace(" ", "")
     assert simplified_temp_txt == simplified_txt, f"simplified_txt=\n{simplified_txt}\nsimplified_temp_txt=\n{simplified_temp_txt}"
+
+
+def test_template_from_xml_order():
+    """labels may be in any order, unknown labels are ignored, and branchpoints are after locations.
+    """
+    txt_temp = """<template>
+            <declaration>clock x;</declaration>
+            <name x="5" y="5">T</name>
+            <branchpoint id="id2" x="10" y="10"/>
+            <location id="id0" x="0" y="0">
+                <urgent/>
+                <label kind="unknown">ignored</label>
+                <label kind="invariant" x="1" y="2">x &lt;= 1</label>
+                <name x="3" y="4">L0</name>
+            </location>
+            <location id="id1" x="100" y="0"/>
+            <init ref="id0"/>
+            <transition>
+                <nail x="5" y="6"/>
+                <label kind="guard" x="7" y="8">x &gt;= 1</label>
+                <target ref="id1"/>
+                <source ref="id0"/>
+            </transition>
+        </template>"""
+    template = Template.from_xml(txt_temp)
+    assert template.name == "T" and template.declaration == "clock x;" and template.init_ref == 0
+    assert [location.location_id for location in template.locations] == [0, 1, 2]
+    assert template.locations[2].is_branchpoint
+    location = template.locations[0]
+    assert (location.name, location.name_pos, location.invariant, location.invariant_pos) == ("L0", (3, 4), "x <= 1", (1, 2))
+    assert location.is_urgent and not location.is_committed
+    edge = template.edges[0]
+    assert (edge.source_location_id, edge.target_location_id, edge.guard, edge.guard_pos) == (0, 1, "x >= 1", (7, 8))
+    assert list(edge.nails) == [(5, 6)]
+
+
+def test_slots_copy():
+    """locations and edges have no `__dict__`, and still notify their template after copy and pickle.
+    """
+    import copy
+    import pickle
+
+    template = Template("T", [Location(0, (0, 0), name="L0")], 0,
+                        [Edge(0, 0, (0, 0), (0, 0), guard="x > 1", nails=[(1, 1)])])
+    assert not hasattr(template.locations[0], "__dict__") and not hasattr(template.edges[0], "__dict__")
+    for other in [template.copy(), copy.deepcopy(template), pickle.loads(pickle.dumps(template))]:
+        assert other.locations[0]._owner is other and other.edges[0]._owner is other
+        assert other.xml == template.xml
+        other.locations[0].name = "L1"
+        other.edges[0].nails.append((2, 2))
+        assert "L1" in other.xml and "L1" not in template.xml
+        assert other.xml.count("<nail") == 2 and template.xml.count("<nail") == 1
+
+
+def test_tostring_same_as_element():
+    """the xml written directly as text is the same as the xml of `Element`, with and without indentation.
+    """
+    from pyuppaal import xmlio
+
+    location = Location(1, (0, 0), name="a & b", invariant="x < 1", test_code_on_enter="", is_committed=True)
+    branch_point = Location(2, (10, 10), is_branchpoint=True)
+    edge = Edge(1, 2, (0, 0), (10, 10), guard='x > "1"', update="x = 0", nails=[(5, 5)])
+    template = Template("T", [location, branch_point], 1, [edge], params="int i", declaration="clock x;\r\n")
+    for indent in [0, 2, 4]:
+        for obj in [location, branch_point, edge]:
+            assert obj.tostring(indent, level=2) == xmlio.tostring_element(obj.Element, indent, level=2)
+        template._on_change()
+        assert template.tostring(indent) == xmlio.tostring_element(template.Element, indent, level=1)
+    # the default positions are only written to the xml
+    assert location.name_pos is None and edge.guard_pos is None
+    assert '<name x="-10" y="-34">' in location.xml and '<label kind="guard" x="23" y="-29">' in edge.xml
@@ -0,0 +1,90 @@
+"""This module contains the unit tests for VerificationResult, which parse the saved terminal output of verifyta,
+    so they do not need verifyta.
+"""
+from pyuppaal.results import VerificationResult
+
+# UPPAAL 4.x, `Writing example trace to` is written to stderr, which is printed before the queries
+UPPAAL4_OUTPUT = ('Writing example trace to demo-1.xtr\n'
+                  'Options for the verification:\n'
+                  '  Generating shortest trace\n'
+                  '  Search order is breadth first\n'
+                  '  Using conservative space optimisation\n'
+                  '  Seed is 1715059335\n'
+                  '  State space representation uses minimal constraint systems\n'
+                  '\x1b[2K\n'
+                  'Verifying formula 1 at /nta/queries/query[1]/formula\n'
+                  '\x1b[2K -- Formula is satisfied.\n')
+
+UPPAAL4_MULTI_OUTPUT = ('Writing example trace to demo-1.xtr\n'
+                        'Writing counter example to demo-3.xtr\n'
+                        'Options for the verification:\n'
+                        '  Generating shortest trace\n'
+                        '\x1b[2K\n'
+                        'Verifying formula 1 at /nta/queries/query[1]/formula\n'
+                        '\x1b[2K -- Formula is satisfied.\n'
+                        '\x1b[2K\n'
+                        'Verifying formula 2 at /nta/queries/query[2]/formula\n'
+                        '\x1b[2K -- Formula is satisfied.\n'
+                        '\x1b[2K\n'
+                        'Verifying formula 3 at /nta/queries/query[3]/formula\n'
+                        '\x1b[2K -- Formula is NOT satisfied.\n')
+
+UPPAAL5_OUTPUT = ('Options for the verification:\n'
+                  '  Generating shortest trace\n'
+                  '  Search order is breadth first\n'
+                  '  Using conservative space optimisation\n'
+                  '  Seed is 1715652637\n'
+                  '  State space representation uses minimal constraint systems with future testing\n'
+                  '  Using HashMap + Compress integers for discrete state storage\n'
+                  '\x1b[2K\n'
+                  'Verifying formula 1 at /nta/queries/query[1]/formula\n'
+                  ' -- Formula: E<> sender_count == 10\n'
+                  '\x1b[2K -- Formula is NOT satisfied.\n'
+                  '\x1b[2K\n'
+                  'Verifying formula 2 at /nta/queries/query[2]/formula\n'
+                  ' -- Formula: E<> count == 1\n'
+                  '\x1b[2K -- Formula is satisfied.\n'
+                  ' -- Writing witness trace to constructed_model1_xtr-2\n'
+                  '\x1b[2K\n'
+                  'Verifying formula 3 at /nta/queries/query[3]/formula\n'
+                  ' -- Formula: E<> rec.End1\n'
+                  '\x1b[2K -- Formula is satisfied.\n'
+                  ' -- Writing witness trace to constructed_model1_xtr-3\n'
+                  '\x1b[2K\n'
+                  'Verifying formula 4 at /nta/queries/query[4]/formula\n'
+                  ' -- Formula: E<> rec.t >= 10\n'
+                  '\x1b[2K -- Formula is satisfied.\n'
+                  ' -- Writing witness trace to constructed_model1_xtr-4\n'
+                  '\x1b[2K\n'
+                  'Verifying formula 5 at /nta/queries/query[5]/formula\n'
+                  ' -- Formula: A[] not deadlock\n'
+                  '\x1b[2K -- Formula is NOT satisfied.\n'
+                  ' -- Writing witness trace to constructed_model1_xtr-5\n')
+
+
+def test_parse_uppaal4():
+    """the ANSI escapes are removed, and the traces printed before the queries are assigned by their numbers
+    """
+    verify_res = VerificationResult(UPPAAL4_OUTPUT)
+    assert verify_res.verdicts == ['satisfied']
+    assert verify_res.trace_paths == ['demo-1.xtr']
+    assert verify_res.is_satisfied
+
+    verify_res = VerificationResult(UPPAAL4_MULTI_OUTPUT)
+    assert verify_res.verdicts == ['satisfied', 'satisfied', 'not satisfied']
+    assert verify_res.trace_paths == ['demo-1.xtr', None, 'demo-3.xtr']
+
+
+def test_parse_uppaal5():
+    """the formula printed by UPPAAL 5.x is not a verdict
+    """
+    verify_res = VerificationResult(UPPAAL5_OUTPUT)
+    assert verify_res.verdicts == ['not satisfied', 'satisfied', 'satisfied', 'satisfied', 'not satisfied']
+    assert verify_res.trace_paths == [None] + [f'constructed_model1_xtr-{i}' for i in range(2, 6)]
+    assert verify_res.queries[2].location == '/nta/queries/query[3]/formula'
+    assert not verify_res.is_satisfied
+
+
+if __name__ == '__main__':
+    test_parse_uppaal4()
+    test_parse_uppaal5()
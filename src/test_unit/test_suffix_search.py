@@ -0,0 +1,66 @@
+"""This module contains the unit tests for the SuffixSearch and SuffixMemo classes,
+    which search the observation suffixes of `UModel.fault_diagnosability_optimized` and keep their verdicts.
+"""
+import os
+from itertools import product
+
+import pytest
+from pyuppaal.mytree import SuffixMemo, SuffixSearch
+
+
+def test_dfs_order_and_pruning():
+    """suffixes are yielded in the order of `itertools.product`, and the extensions of invalid prefixes are never checked.
+    """
+    checked = []
+
+    def is_valid(prefix):
+        checked.append(prefix)
+        return prefix[0] != 'b'
+
+    search = SuffixSearch(['a', 'b', 'c'], 3, is_valid)
+    expected = [list(suffix) for suffix in product(['a', 'b', 'c'], repeat=3) if suffix[0] != 'b']
+    assert list(search) == expected
+    assert not any(prefix[0] == 'b' and len(prefix) > 1 for prefix in checked)
+    assert search.stats.verifier_calls == len(checked) == 3 + 2 * (3 + 9)
+    assert search.stats.pruned_prefixes == 1 and search.stats.pruned_suffixes == 9
+    assert search.stats.saved_calls == max(9 - search.stats.prefix_calls, 0)
+
+    # nothing is pruned, so the prefix calls are not saved by anything
+    search = SuffixSearch(['a', 'b'], 2, lambda prefix: True)
+    assert len(list(search)) == 4
+    assert search.stats.prefix_calls == 2 and search.stats.pruned_suffixes == 0
+    assert search.stats.saved_calls == 0
+
+
+def test_bfs_and_memo():
+    """bfs yields the same suffixes, and a shared memo avoids checking a prefix twice.
+    """
+    memo = {}
+    is_valid = lambda prefix: prefix[-1] != 'b'
+    dfs = SuffixSearch(['a', 'b'], 3, is_valid, memo=memo)
+    dfs_suffixes = list(dfs)
+    bfs = SuffixSearch(['a', 'b'], 3, is_valid, strategy='bfs', memo=memo)
+    assert sorted(bfs) == dfs_suffixes == [['a', 'a', 'a']]
+    assert bfs.stats.verifier_calls == 0 and bfs.stats.memo_hits == dfs.stats.verifier_calls
+
+    with pytest.raises(ValueError):
+        SuffixSearch(['a'], 1, is_valid, strategy='random')
+
+
+def test_suffix_memo(tmp_path):
+    """the verdicts are kept per model and fault, and are the same after saving and loading.
+    """
+    path = str(tmp_path / 'memo.json')
+    with SuffixMemo(path) as memo:
+        valid, identified = memo.tables('hash', 'f1', ['a', 'b'], ['u'])
+        search = SuffixSearch(['a', 'b'], 2, lambda prefix: prefix != ['b'], memo=valid)
+        assert list(search) == [['a', 'a'], ['a', 'b']]
+        identified[('a', 'b')] = True
+        assert memo.tables('hash', 'f2', ['a', 'b'], ['u']) == ({}, {})
+        assert memo.tables('other_hash', 'f1', ['a', 'b'], ['u']) == ({}, {})
+
+    assert os.listdir(tmp_path) == ['memo.json']
+    valid, identified = SuffixMemo(path).tables('hash', 'f1', ['a', 'b'], ['u'])
+    assert valid == search.memo and identified == {('a', 'b'): True}
+    search = SuffixSearch(['a', 'b'], 2, lambda prefix: prefix != ['b'], memo=valid)
+    assert len(list(search)) == 2 and search.stats.verifier_calls == 0
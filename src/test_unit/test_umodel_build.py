@@ -4,9 +4,11 @@ Returns:
     None
 """
 import os
+import pytest
 import pyuppaal
 
 from pyuppaal.nta import Template, Location, Edge
+from pyuppaal.monitors import Monitors
 
 pyuppaal.DeveloperTools.set_verifyta_path_dev()
 
@@ -192,5 +194,289 @@ system rec, sender;\n"""
     # print(umodel.verify())
 
 
+def test_batch_edit():
+    """edits in batch_edit are saved once when leaving the context
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml')).copy_as(bring_to_root('tmp_batch_edit.xml'))
+    with umodel.batch_edit():
+        umodel.declaration = umodel.declaration + "\nint batch_count = 0;"
+        umodel.queries = ["A[] not deadlock", "E<> batch_count == 0"]
+        assert umodel.is_dirty
+        assert "batch_count" not in pyuppaal.UModel(umodel.model_path, autosave=False).declaration
+    assert not umodel.is_dirty
+    saved_model = pyuppaal.UModel(umodel.model_path)
+    assert "batch_count" in saved_model.declaration
+    assert saved_model.queries == umodel.queries
+
+    # without autosave, the model is saved before verification
+    umodel.autosave = False
+    umodel.queries = "E<> batch_count == 1"
+    assert umodel.is_dirty
+    assert "Verifying formula" in umodel.verify()
+    assert not umodel.is_dirty
+
+    # in-place edits of the templates are saved as well
+    umodel.templates[0].locations[0].invariant = "t <= 1"
+    assert umodel.is_dirty
+    umodel.flush()
+    assert not umodel.is_dirty
+    assert pyuppaal.UModel(umodel.model_path).templates[0].locations[0].invariant == "t <= 1"
+    os.remove(umodel.model_path)
+
+    # parsing the templates of a lazy model is not an edit
+    lazy_model = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True, lazy=True)
+    assert lazy_model.get_template('Sender') is not None and len(lazy_model.templates) == 2
+    assert not lazy_model.is_dirty
+
+
+def test_read_only():
+    """loading a model read only never writes the file
+    """
+    model_path = bring_to_root('test_umodel_build.xml')
+    with open(model_path, 'rb') as f:
+        content = f.read()
+    umodel = pyuppaal.UModel(model_path, read_only=True)
+    assert len(umodel.templates) == 2
+    with open(model_path, 'rb') as f:
+        assert f.read() == content
+
+    umodel.queries = "A[] not deadlock"
+    with pytest.raises(ValueError):
+        umodel.save()
+    with open(model_path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_write_xml_tree():
+    """the one-pass pretty writer gives the same output as xml.dom.minidom
+    """
+    import xml.dom.minidom
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    expected = xml.dom.minidom.parseString(umodel.xml).toprettyxml(indent=4 * " ")
+    assert pyuppaal.xmlio.tostring_pretty(umodel.Element, 4) == expected
+
+
+def test_clone():
+    """a clone is written only when verified, and its templates are independent of the original model
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    cloned_model = umodel.clone(bring_to_root('tmp_clone.xml'))
+    assert not os.path.exists(cloned_model.model_path)
+    assert cloned_model.xml == umodel.xml
+
+    cloned_model.templates[0].name = "ClonedTemplate"
+    assert umodel.templates[0].name != "ClonedTemplate"
+
+    assert "Verifying formula" in cloned_model.verify()
+    assert os.path.exists(cloned_model.model_path)
+    assert pyuppaal.UModel(cloned_model.model_path, read_only=True).templates[0].name == "ClonedTemplate"
+    os.remove(cloned_model.model_path)
+
+
+def test_clone_held_template():
+    """a template held before an analysis call, which clones the model, is still a template of the model,
+    and the clones do not see its changes
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    template = umodel.templates[0]
+    umodel.valid_suffixes('c', [['a']], ['a', 'b'], [], keep_tmp_file=False)
+    cloned_model = umodel.clone(bring_to_root('tmp_clone.xml'))
+    template.name = 'Renamed'
+    assert umodel.templates[0] is template and umodel.get_template('Renamed') is template
+    assert cloned_model.get_template('Renamed') is None
+
+    cloned_model.templates[0].name = 'Cloned'
+    assert umodel.get_template('Cloned') is None and umodel.templates[0].name == 'Renamed'
+
+
+def test_template_xml_cache():
+    """modifying a location or an edge of a template invalidates the cached xml of the template
+    """
+    import xml.etree.ElementTree as ET
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    template = umodel.templates[0]
+    assert template.tostring() == ET.tostring(template.Element, encoding='unicode')
+
+    template.locations[0].name = "CachedLocation"
+    assert "CachedLocation" in template.tostring()
+    template.edges[0].nails.append((1234, 5678))
+    assert 'x="1234"' in template.tostring(4)
+    assert umodel.xml == ET.tostring(umodel.Element, encoding='unicode')
+
+
+def test_serialize_is_not_edit():
+    """the default label positions are only filled in the xml, so serializing does not modify the model or clear the cached xml
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml')).copy_as(bring_to_root('tmp_serialize.xml'))
+    umodel.autosave = False
+    location = umodel.templates[0].locations[0]
+    edge = umodel.templates[0].edges[0]
+    location.name, location.name_pos = "DefaultPos", None
+    edge.sync, edge.sync_pos = "a?", None
+    umodel.flush()
+    assert not umodel.is_dirty
+
+    xml = umodel.xml
+    template_xml = umodel.templates[0].tostring()
+    assert 'DefaultPos' in xml and location.Element.find('name').get('x') is not None
+    assert location.name_pos is None and edge.sync_pos is None
+    assert not umodel.is_dirty
+    assert umodel.templates[0].tostring() is template_xml
+    os.remove(umodel.model_path)
+
+def test_model_index():
+    """indexes of templates, locations and edges are consistent with the edits
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    template = umodel.templates[0]
+    assert umodel.get_template(template.name) is template
+    assert umodel.max_location_id == max(location.location_id for t in umodel.templates for location in t.locations)
+
+    edge = template.edges[0]
+    assert any(e is edge for e in template.out_edges(edge.source_location_id))
+    assert any(e is edge for e in template.in_edges(edge.target_location_id))
+    assert template.get_location(edge.target_location_id).location_id == edge.target_location_id
+
+    template.name = "IndexedTemplate"
+    assert umodel.get_template("IndexedTemplate") is template
+    template.locations.append(Location(location_id=100, location_pos=(0, 0)))
+    assert umodel.max_location_id == 100
+    assert template.get_location(100) is template.locations[-1]
+
+    first_id = umodel.allocate_location_ids(3)
+    assert first_id == 101 and umodel.allocate_location_ids() == 104
+    new_template = Template("NewTemplate", [Location(location_id=200, location_pos=(0, 0))], init_ref=200)
+    umodel.add_template(new_template)
+    assert umodel.get_template("NewTemplate") is new_template and umodel.max_location_id == 200
+    with pytest.raises(ValueError):
+        umodel.add_template(Template("NewTemplate", [Location(location_id=300, location_pos=(0, 0))], init_ref=300))
+
+    umodel.remove_template("IndexedTemplate")
+    assert umodel.get_template("IndexedTemplate") is None
+    assert umodel.get_template("NewTemplate") is new_template
+
+
+def test_lazy_load():
+    """templates of a lazy model are parsed when accessed, and written back as they are otherwise
+    """
+    eager_model = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    lazy_model = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True, lazy=True)
+    assert lazy_model.max_location_id == eager_model.max_location_id
+
+    lazy_model.save_as(bring_to_root('tmp_lazy.xml'))
+    assert pyuppaal.UModel(bring_to_root('tmp_lazy.xml'), read_only=True).xml == eager_model.xml
+
+    template = lazy_model.get_template(eager_model.templates[0].name)
+    assert isinstance(template, Template)
+    assert template.xml == eager_model.templates[0].xml
+    assert [t.name for t in lazy_model.templates] == [t.name for t in eager_model.templates]
+    os.remove(bring_to_root('tmp_lazy.xml'))
+
+
+def test_iter_children():
+    """the streaming parser yields the same children of <nta> as parsing the whole tree
+    """
+    import xml.etree.ElementTree as ET
+    model_path = bring_to_root('test_umodel_build.xml')
+    expected = [ET.tostring(elem) for elem in ET.parse(model_path).getroot()]
+    assert [ET.tostring(elem) for elem in pyuppaal.xmlio.iter_children(model_path)] == expected
+
+
+def test_xml_backend():
+    """models parsed with the selected xml backend (lxml if installed) are the same as with xml.etree.ElementTree
+    """
+    import xml.etree.ElementTree as ET
+    assert pyuppaal.xmlio.BACKEND in ('lxml', 'stdlib')
+    root = pyuppaal.xmlio.fromstring('<?xml version="1.0" encoding="utf-8"?><nta><!-- comment --><a>x &lt; 1</a></nta>')
+    assert [(elem.tag, elem.text) for elem in root] == [('a', 'x < 1')]
+
+    model_path = bring_to_root('test_umodel_build.xml')
+    expected = [Template.from_xml(elem).xml for elem in ET.parse(model_path).getroot().findall('template')]
+    assert [template.xml for template in pyuppaal.UModel(model_path, read_only=True).templates] == expected
+
+
+def test_twin_plant():
+    """the twin plant has a fault-free copy of each process with renamed channels, and the monitor `MTwin`
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    # the global variables would be shared by the faulty and the fault-free copy
+    with pytest.raises(ValueError):
+        umodel.twin_plant('c', 2, ['a'])
+
+    plant = umodel.clone(bring_to_root('tmp_clone.xml'))
+    plant.declaration = "broadcast chan a, b, c;\nchan d;\nconst int rec_end = 10;"
+    plant.system = plant.system.replace("sender = Sender(a, b);", "sender = Sender(a, c);")
+    twin_plant = plant.twin_plant('b', 2, ['a'], new_path=bring_to_root('tmp_twin_plant.xml'))
+    assert "broadcast chan a_twin, b_twin, c_twin;" in twin_plant.declaration
+    assert "sender_twin = Sender_twin(a_twin, c_twin);" in twin_plant.system
+    assert "system rec, sender, rec_twin, sender_twin, MTwin;" in twin_plant.system
+    assert twin_plant.queries == ["E<> MTwin.pass"]
+
+    # the edges of the copy are renumbered, and the fault `b` is only received by the parameter of `rec` here
+    sender, sender_twin = twin_plant.get_template('Sender'), twin_plant.get_template('Sender_twin')
+    assert [edge.sync for edge in sender_twin.edges] == [edge.sync for edge in sender.edges]
+    location_ids = [location.location_id for template in twin_plant.templates for location in template.locations]
+    assert len(location_ids) == len(set(location_ids))
+    assert plant.get_template('Sender_twin') is None and not os.path.exists(twin_plant.model_path)
+
+    # the fault `c` is sent by the parameter `param2`, which can not be removed from the copy
+    with pytest.raises(ValueError):
+        plant.twin_plant('c', 2, ['a'])
+    # the monitor does not receive every observation of a binary channel
+    with pytest.raises(ValueError):
+        plant.twin_plant('b', 2, ['d'])
+    with pytest.raises(ValueError):
+        plant.twin_plant('rec_end', 2, ['a'])
+    with pytest.raises(ValueError):
+        plant.twin_plant('b', 0, ['a'])
+
+
+def test_obs_after_fault_trie_monitor():
+    """the suffixes share the locations of their common prefixes, and each suffix has its own `pass_i`
+    """
+    suffixes = [['a', 'b'], ['a', 'c'], ['a'], []]
+    monitor = Monitors.obs_after_fault_trie_monitor('M', suffixes, ['a', 'b', 'c'], ['f'], 'f', init_ref=10)
+    # init, fail, and the trie nodes (), (a), (a, b), (a, c)
+    assert len(monitor.locations) == 6
+    names = {location.name: location.location_id for location in monitor.locations}
+    assert {'pass_0', 'pass_1', 'pass_2', 'pass_3', 'fail'} <= set(names)
+    assert [edge.sync for edge in monitor.out_edges(names['pass_2'])] == ['b?', 'c?', 'a?']
+    assert monitor.out_edges(names['pass_0']) == []
+
+    with pytest.raises(ValueError):
+        Monitors.obs_after_fault_trie_monitor('M', [['a'], ['a']], ['a'], ['f'], 'f', init_ref=10)
+
+
+def test_model_hash():
+    """the hash depends on the behavior of the model, but not on the queries or the path
+    """
+    umodel = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True)
+    cloned_model = umodel.clone(bring_to_root('tmp_clone.xml'))
+    cloned_model.queries = ["A[] not deadlock"]
+    assert cloned_model.model_hash == umodel.model_hash
+    cloned_model.templates[0].locations[0].invariant = "t <= 1"
+    assert cloned_model.model_hash != umodel.model_hash
+
+    # the same with the templates loaded lazily, before and after they are parsed
+    lazy_model = pyuppaal.UModel(bring_to_root('test_umodel_build.xml'), read_only=True, lazy=True)
+    assert lazy_model.model_hash == umodel.model_hash
+    assert lazy_model.templates[0].name == umodel.templates[0].name
+    assert lazy_model.model_hash == umodel.model_hash
+
+
 if __name__ == '__main__':
     test_construct_model()
+    test_batch_edit()
+    test_read_only()
+    test_write_xml_tree()
+    test_clone()
+    test_clone_held_template()
+    test_template_xml_cache()
+    test_serialize_is_not_edit()
+    test_model_index()
+    test_lazy_load()
+    test_iter_children()
+    test_xml_backend()
+    test_twin_plant()
+    test_obs_after_fault_trie_monitor()
+    test_model_hash()
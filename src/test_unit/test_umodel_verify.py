@@ -12,7 +12,45 @@ def bring_to_root(file_name: str):
 def test_umodel_verify():
     umodel = UModel(bring_to_root('pedestrian.xml'))
     print(umodel.easy_verify())
-    
+
+
+def test_verify_all_queries():
+    umodel = UModel(bring_to_root('pedestrian.xml')).copy_as(bring_to_root('tmp_verify_all_queries.xml'))
+    umodel.queries = ['A[] not (LV1Pedestrian2.Crossing and Cars.Crossing)', 'A[] not deadlock', 'E<> Cars.Crossing']
+    res = umodel.verify_all_queries()
+    os.remove(umodel.model_path)
+    assert len(res) == 3
+    for query_res, sim_trace in res:
+        assert query_res.verdict in ('satisfied', 'not satisfied')
+        # a query has a trace iff verifyta writes its trace file
+        assert (query_res.trace_path is None) == (sim_trace is None)
+    # a witness trace exists for the satisfied reachability query
+    assert res[2][0].is_satisfied and res[2][1] is not None
+    prefix = umodel.model_path.replace('.xml', '' if pyuppaal.Verifyta().get_uppaal_version() == 4 else '_xtr')
+    assert res[2][0].trace_path == pyuppaal.Verifyta().capabilities.trace_file(prefix, 3)
+    for query_res, _ in res:
+        if query_res.trace_path is not None:
+            assert os.path.exists(query_res.trace_path)
+            os.remove(query_res.trace_path)
+
+
+def test_verify_all_queries_stale_traces():
+    """the trace files left by a previous run are not returned as the traces of the queries
+    """
+    umodel = UModel(bring_to_root('pedestrian.xml')).copy_as(bring_to_root('tmp_verify_all_queries.xml'))
+    umodel.queries = ['A[] true', 'A[] true']
+    prefix = umodel.model_path.replace('.xml', '' if pyuppaal.Verifyta().get_uppaal_version() == 4 else '_xtr')
+    stale_trace_paths = [pyuppaal.Verifyta().capabilities.trace_file(prefix, index) for index in [1, 2]]
+    for stale_trace_path in stale_trace_paths:
+        with open(stale_trace_path, 'w') as f:
+            f.write('stale')
+    res = umodel.verify_all_queries(verify_options=None, keep_tmp_file=False)
+    os.remove(umodel.model_path)
+    assert [sim_trace for _, sim_trace in res] == [None, None]
+    assert not any(os.path.exists(stale_trace_path) for stale_trace_path in stale_trace_paths)
+
 if __name__ == '__main__':
     test_umodel_verify()
+    test_verify_all_queries()
+    test_verify_all_queries_stale_traces()
     
\ No newline at end of file
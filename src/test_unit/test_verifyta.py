@@ -95,9 +95,166 @@ def test_easy_verify2():
         os.remove(trace_path)
 
 
+def test_verify_many():
+    """verify many models concurrently
+    """
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    model_paths = [bring_to_root('demo1.xml'),
+                   bring_to_root('demo2.xml'),
+                   bring_to_root('demo3.xml')]
+    jobs = [(model_path, None, '-t 1 -o 0', 60) for model_path in model_paths]
+    res = dict(Verifyta().verify_many(jobs, max_workers=2))
+    assert sorted(res.keys()) == [0, 1, 2]
+    for verify_res in res.values():
+        assert 'satisfied' in verify_res
+
+
+def test_process_group():
+    """the running processes of a killed group are killed, and a killed group starts no process
+    """
+    import sys
+    import threading
+    import time
+    from concurrent.futures import CancelledError
+    from pyuppaal.verifyta import VerifytaCommand, VerifytaProcessGroup
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    group = VerifytaProcessGroup()
+    errors = []
+
+    def run():
+        with Verifyta().join_process_group(group):
+            try:
+                Verifyta().cmd(VerifytaCommand([sys.executable, '-c', 'import time; time.sleep(60)']))
+            except CancelledError as e:
+                errors.append(e)
+
+    t0 = time.time()
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(1)
+    group.kill()
+    thread.join(30)
+    assert len(errors) == 1 and time.time() - t0 < 30
+    with pytest.raises(CancelledError):
+        with Verifyta().join_process_group(group):
+            Verifyta().cmd(VerifytaCommand([sys.executable, '-c', 'pass']))
+    # other threads are not in the group
+    assert Verifyta().cmd(VerifytaCommand([sys.executable, '-c', 'print(1)'])).strip() == '1'
+
+
+def test_averify():
+    """verify models with asyncio, and the verifyta process is killed on timeout
+    """
+    import asyncio
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    model_paths = [bring_to_root('demo1.xml'),
+                   bring_to_root('demo2.xml'),
+                   bring_to_root('demo3.xml')]
+
+    async def verify_all():
+        Verifyta().set_async_limit(2)
+        return await asyncio.gather(*[Verifyta().averify(model_path, verify_options='-t 1 -o 0', timeout=60)
+                                      for model_path in model_paths])
+
+    for verify_res in asyncio.run(verify_all()):
+        assert 'satisfied' in verify_res
+
+
+def test_verify_parse_result():
+    """parse the verdict, trace path and statistics of each query
+    """
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    model_path = bring_to_root('demo1.xml')
+    verify_res = Verifyta().verify(model_path, verify_options='-t 1 -o 0 -u', parse_result=True)
+    assert 'satisfied' in verify_res
+    # `A[] not deadlock` does not hold, since `C` has no outgoing edge, so a counter example is written
+    assert verify_res.verdicts == ['not satisfied']
+    query = verify_res.queries[0]
+    assert query.states_explored is not None
+    assert query.trace_path is not None and os.path.exists(query.trace_path)
+    os.remove(query.trace_path)
+
+
+def test_verify_cache():
+    """the second verification of the same model is loaded from the cache, including the trace file
+    """
+    import tempfile
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    model_path = bring_to_root('demo1.xml')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = Verifyta().enable_cache(cache_dir)
+        try:
+            res1 = Verifyta().verify(model_path, verify_options='-t 1 -o 0', parse_result=True)
+            # `A[] not deadlock` does not hold, so a counter example is written
+            trace_path = res1.trace_paths[0]
+            assert trace_path is not None
+            with open(trace_path, 'r') as f:
+                trace = f.read()
+            os.remove(trace_path)
+            res2 = Verifyta().verify(model_path, verify_options='-t 1 -o 0', parse_result=True)
+        finally:
+            Verifyta().disable_cache()
+    assert cache.hits == 1
+    assert res1.verdicts == res2.verdicts
+    assert res2.trace_paths == [trace_path]
+    with open(trace_path, 'r') as f:
+        assert f.read() == trace
+    os.remove(trace_path)
+
+
+def test_compile_cache():
+    """the `.if` file of an unchanged model is compiled only once
+    """
+    import tempfile
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    model_path = bring_to_root('demo1.xml')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        Verifyta().set_compile_cache(cache_dir=cache_dir)
+        try:
+            if_contents = []
+            for _ in range(2):
+                if_path = Verifyta().compile_to_if(model_path)
+                with open(if_path, 'r') as f:
+                    if_contents.append(f.read())
+                os.remove(if_path)
+            hits = Verifyta().compile_cache.hits
+        finally:
+            Verifyta().set_compile_cache(0)
+    assert hits == 1
+    assert if_contents[0] == if_contents[1]
+
+
+def test_compile_cache_not_writable():
+    """the cache is disabled by default, and a cache directory that is not writable falls back to compiling every time
+    """
+    import tempfile
+    Verifyta().set_verifyta_path(VERIFYTA_PATH)
+    assert Verifyta().compile_cache is None
+    model_path = bring_to_root('demo1.xml')
+    with tempfile.NamedTemporaryFile() as not_dir:
+        # a directory can not be created under a file
+        Verifyta().set_compile_cache(cache_dir=os.path.join(not_dir.name, 'if'))
+        try:
+            for _ in range(2):
+                if_path = Verifyta().compile_to_if(model_path)
+                assert os.path.exists(if_path)
+                os.remove(if_path)
+            hits = Verifyta().compile_cache.hits
+        finally:
+            Verifyta().set_compile_cache(0)
+    assert hits == 0
+
+
 if __name__ == '__main__':
     test_set_verifyta_path()
     test_verify()
     test_easy_verify1()
     test_easy_verify2()
+    test_verify_many()
+    test_process_group()
+    test_averify()
+    test_verify_parse_result()
+    test_verify_cache()
+    test_compile_cache()
+    test_compile_cache_not_writable()
 